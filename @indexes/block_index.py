@@ -0,0 +1,349 @@
+"""
+Block Index
+
+Splits a JSONL file into blocks (newline aligned byte ranges of about
+`block_size` bytes) and records, for each column of each block, a zone map - the
+number of nulls and the minimum and maximum of the numbers and of the strings in
+the block - and a Bloom filter of the values in the block.
+
+Lookups use the zone maps and Bloom filters to rule blocks out, only the blocks
+which may hold matching rows need to be read:
+
+    index = BlockIndex.build("logs.jsonl")
+    index.save()
+    ...
+    index = BlockIndex.load("logs.jsonl")
+    for batch in index.read_blocks(index.find_blocks("user", "==", "alice")):
+        ...
+
+The index is saved alongside the data file (as `<data file>.index`) with the
+identity of the file it indexed; if the file has been appended to since, the
+appended bytes are an unindexed block which every lookup returns.
+
+The index is laid out as:
+
+    header     magic number, format version and the length of the metadata
+    metadata   JSON - the file identity, and the offsets, row counts and zone
+               maps of each block
+    filters    the bytes of each Bloom filter
+"""
+import os
+import struct
+import sys
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "@profiler"))
+import paths  # noqa: F401 - makes the sketches importable
+from bloom_filter import BloomFilter
+from readers import compression, iter_ranges, read_jsonl_batches
+from state import file_identity, is_prefix
+
+MAGIC = b"CRYIX"
+VERSION = 1
+HEADER = struct.Struct("<5sHI")
+BLOCK_SIZE = 4 * 1024 * 1024
+FP_RATE = 0.01
+
+OPERATORS = ("==", "<", "<=", ">", ">=", "in")
+NUMBERS = (int, float)
+
+
+def _term(value) -> Any:
+    # 1 and 1.0 are equal, so they must be added to the filters as the same term
+    if type(value) is float and value.is_integer():
+        return int(value)
+    return value
+
+
+def _kind(value) -> Optional[str]:
+    # bool is an int, but isn't ordered with the numbers in a zone map
+    if type(value) in NUMBERS:
+        return "numbers"
+    if type(value) is str:
+        return "strings"
+    return None
+
+
+class Zone:
+    """
+    What is known about one column in one block
+    """
+
+    __slots__ = ("nulls", "numbers", "strings", "bloom")
+
+    def __init__(self, nulls: int, numbers=None, strings=None, bloom=None):
+        self.nulls = nulls
+        self.numbers: Optional[Tuple[float, float]] = numbers
+        self.strings: Optional[Tuple[str, str]] = strings
+        self.bloom: Optional[BloomFilter] = bloom
+
+    @classmethod
+    def of(cls, values: List[Any], fp_rate: float = FP_RATE) -> "Zone":
+        present = [value for value in values if value is not None]
+        numbers = [value for value in present if type(value) in NUMBERS]
+        strings = [value for value in present if type(value) is str]
+        zone = cls(len(values) - len(present))
+        if numbers:
+            zone.numbers = (min(numbers), max(numbers))
+        if strings:
+            zone.strings = (min(strings), max(strings))
+        if present:
+            # the distinct values are found before they're formatted as terms, by
+            # kind so True (== 1) isn't folded into 1
+            others = [value for value in present if type(value) not in (int, float, str)]
+            terms = list(dict.fromkeys(strings))
+            terms.extend(dict.fromkeys(map(str, map(_term, dict.fromkeys(numbers)))))
+            terms.extend(dict.fromkeys(map(str, others)))
+            zone.bloom = BloomFilter(len(terms), fp_rate)
+            zone.bloom.add_many(terms)
+        return zone
+
+    def may_match(self, op: str, value) -> bool:
+        """
+        False if no row of the block can match `column <op> value`
+        """
+        if op == "in":
+            return any(self.may_match("==", item) for item in value)
+        if value is None:
+            return op == "==" and self.nulls > 0
+        if op == "==" and (self.bloom is None or str(_term(value)) not in self.bloom):
+            return False
+        kind = _kind(value)
+        if kind is None:
+            return op == "=="
+        bounds = getattr(self, kind)
+        if bounds is None:
+            return False
+        low, high = bounds
+        if op == "==":
+            return low <= value <= high
+        if op == "<":
+            return low < value
+        if op == "<=":
+            return low <= value
+        if op == ">":
+            return high > value
+        return high >= value
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "nulls": self.nulls,
+            "numbers": self.numbers,
+            "strings": self.strings,
+            "bloom": None if self.bloom is None else self.bloom.to_bytes(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "Zone":
+        zone = cls(state["nulls"])
+        if state["numbers"] is not None:
+            zone.numbers = tuple(state["numbers"])
+        if state["strings"] is not None:
+            zone.strings = tuple(state["strings"])
+        if state["bloom"] is not None:
+            zone.bloom = BloomFilter.from_bytes(state["bloom"])
+        return zone
+
+
+class Block:
+
+    __slots__ = ("start", "end", "rows", "columns")
+
+    def __init__(
+        self, start: int, end: int, rows: Optional[int], columns: Optional[Dict[str, Zone]]
+    ):
+        """
+        Parameters:
+            start, end: integer
+                The byte range of the block in the file
+            rows: integer or None
+                The number of rows in the block, None if it isn't indexed
+            columns: dictionary or None
+                The zone of each column in the block, None if the block isn't
+                indexed (it has been appended since the file was indexed)
+        """
+        self.start = start
+        self.end = end
+        self.rows = rows
+        self.columns = columns
+
+    def may_match(self, column: str, op: str, value) -> bool:
+        if self.columns is None:
+            return True
+        zone = self.columns.get(column)
+        if zone is None:
+            # the column isn't in any row of the block, it's null in all of them
+            return value is None and op == "==" or (op == "in" and None in value)
+        return zone.may_match(op, value)
+
+
+class BlockIndex:
+    def __init__(
+        self,
+        filename: str,
+        blocks: List[Block],
+        identity: Dict[str, Any],
+        columns: Optional[List[str]] = None,
+    ):
+        """
+        Parameters:
+            filename: string
+                The indexed file
+            blocks: list of Blocks
+                The blocks of the file, in order
+            identity: dictionary
+                The identity of the file when it was indexed (see state.file_identity)
+            columns: list of strings (optional)
+                The indexed columns, None when every column is indexed
+        """
+        self.filename = filename
+        self.blocks = blocks
+        self.identity = identity
+        self.columns = columns
+
+    @classmethod
+    def build(
+        cls,
+        filename: str,
+        columns: Optional[Iterable[str]] = None,
+        block_size: int = BLOCK_SIZE,
+        fp_rate: float = FP_RATE,
+    ) -> "BlockIndex":
+        """
+        Index a JSONL file
+
+        Parameters:
+            filename: string
+                The file to index, it can't be compressed
+            columns: iterable of strings (optional)
+                The columns to index, by default every column found
+            block_size: integer (optional)
+                The approximate size of each block in bytes, blocks end at the
+                end of a line
+            fp_rate: float (optional)
+                The false positive rate of the Bloom filters
+        """
+        if compression(filename):
+            raise ValueError("Compressed files can't be indexed, blocks are byte ranges")
+        if columns is not None:
+            columns = list(columns)
+        size = os.path.getsize(filename)
+        blocks = []
+        for start, end in iter_ranges(filename, max(1, -(-size // block_size))):
+            batches = read_jsonl_batches(filename, start=start, end=end)
+            rows = [row for batch in batches for row in batch]
+            names = columns
+            if names is None:
+                names = dict.fromkeys(key for row in rows for key in row)
+            zones = {
+                name: Zone.of(list(map(dict.get, rows, repeat(name))), fp_rate)
+                for name in names
+            }
+            blocks.append(Block(start, end, len(rows), zones))
+        return cls(filename, blocks, file_identity(filename, size), columns)
+
+    def find_blocks(self, column: str, op: str, value) -> List[Tuple[int, int]]:
+        """
+        The byte ranges of the blocks which may have rows where `column <op> value`
+
+        Parameters:
+            column: string
+                The column to filter on
+            op: string
+                One of '==', '<', '<=', '>', '>=' or 'in' (value is then a list),
+                '==' None finds the blocks with nulls
+            value:
+                The value to compare to, numbers are compared with numbers and
+                strings with strings
+        """
+        if op == "=":
+            op = "=="
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{op}', expected one of {OPERATORS}")
+        if self.columns is not None and column not in self.columns:
+            raise ValueError(f"Column '{column}' isn't indexed")
+        return [
+            (block.start, block.end)
+            for block in self.blocks
+            if block.may_match(column, op, value)
+        ]
+
+    def read_blocks(self, blocks: Iterable[Tuple[int, int]], batch_size: int = 10000):
+        """
+        Read the rows of the blocks from find_blocks, in batches
+        """
+        for start, end in blocks:
+            yield from read_jsonl_batches(self.filename, batch_size, start=start, end=end)
+
+    def to_bytes(self) -> bytes:
+        filters = []
+        size = 0
+        blocks = []
+        for block in self.blocks:
+            if block.columns is None:
+                continue
+            columns = {}
+            for name, zone in block.columns.items():
+                state = zone.to_state()
+                if state["bloom"] is not None:
+                    filters.append(state["bloom"])
+                    state["bloom"] = [size, len(state["bloom"])]
+                    size += state["bloom"][1]
+                columns[name] = state
+            blocks.append([block.start, block.end, block.rows, columns])
+        metadata = orjson.dumps(
+            {"source": self.identity, "columns": self.columns, "blocks": blocks}
+        )
+        return b"".join([HEADER.pack(MAGIC, VERSION, len(metadata)), metadata] + filters)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, filename: Optional[str] = None) -> "BlockIndex":
+        if bytes(data[: len(MAGIC)]) != MAGIC:
+            raise ValueError("Data is not a block index")
+        _, version, length = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"Block index is version {version}, version {VERSION} is supported")
+        metadata = orjson.loads(data[HEADER.size : HEADER.size + length])
+        filters = memoryview(data)[HEADER.size + length :]
+
+        blocks = []
+        for start, end, rows, columns in metadata["blocks"]:
+            for state in columns.values():
+                if state["bloom"] is not None:
+                    offset, size = state["bloom"]
+                    state["bloom"] = filters[offset : offset + size]
+            zones = {name: Zone.from_state(state) for name, state in columns.items()}
+            blocks.append(Block(start, end, rows, zones))
+        source = metadata["source"]
+        return cls(filename or source["path"], blocks, source, metadata["columns"])
+
+    def save(self, path: Optional[str] = None):
+        path = path or index_path(self.filename)
+        # write then rename, so readers never see a partly written index
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, filename: str, path: Optional[str] = None) -> "BlockIndex":
+        """
+        Load the index of a file, bytes appended to the file since it was indexed
+        are added as an unindexed block. Raises ValueError if the file has been
+        rewritten since it was indexed.
+        """
+        with open(path or index_path(filename), "rb") as f:
+            index = cls.from_bytes(f.read(), filename)
+        if not is_prefix(index.identity, filename):
+            raise ValueError(f"'{filename}' has changed since it was indexed")
+        indexed, size = index.identity["offset"], os.path.getsize(filename)
+        if size > indexed:
+            index.blocks.append(Block(indexed, size, None, None))
+        return index
+
+
+def index_path(filename: str) -> str:
+    return filename + ".index"
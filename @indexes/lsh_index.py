@@ -0,0 +1,202 @@
+"""
+LSH Index
+
+Finds the columns, across saved profiles, which share values with a column; by
+Jaccard similarity (|A ∩ B| / |A ∪ B|, for duplicated fields) or by containment
+(|A ∩ B| / |A|, for join keys - a foreign key column is contained in its primary
+key column, though their Jaccard similarity is small when the primary key column
+has many more values).
+
+    index = index_profiles(["orders.cryno", "customers.cryno"])
+    index.similar(("orders.cryno", "customer_id"), 0.8, measure="containment")
+
+String columns have MinHash signatures (see @sketches/minhash.py). Signatures are
+cut into bands of rows and the columns whose signatures are equal in any band are
+candidates (locality sensitive hashing), which are then checked against their
+signatures; a query looks in a few buckets rather than comparing with every
+column.
+
+The band width which separates similarities either side of a threshold best
+depends on the threshold, so buckets are kept for several band widths and the
+width is chosen per query (as LSH Forest does). For containment, the columns are
+also partitioned by their number of distinct values, the Jaccard similarity a
+containment implies depends on the sizes of both columns (LSH Ensemble, Zhu et
+al).
+"""
+import os
+import sys
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "@profiler"))
+import paths  # noqa: F401 - makes the sketches importable
+from columns import StringProfile
+from minhash import SEED, SIGNATURE_SIZE, MinHash
+from state import load
+
+# the widths of the bands buckets are kept for
+BAND_ROWS = (1, 2, 4, 8, 16)
+MEASURES = ("jaccard", "containment")
+
+
+@lru_cache(maxsize=None)
+def band_rows(threshold: float, size: int = SIGNATURE_SIZE) -> int:
+    """
+    The band width whose chance of making a column a candidate is furthest below
+    the threshold for less similar columns and furthest above it for more similar
+    ones (the width which minimizes false positives plus false negatives)
+    """
+    similarities = numpy.linspace(0, 1, 1001)
+    best, best_error = BAND_ROWS[0], None
+    for rows in BAND_ROWS:
+        candidate = 1 - (1 - similarities**rows) ** (size // rows)
+        below = similarities < threshold
+        error = candidate[below].sum() + (1 - candidate[~below]).sum()
+        if best_error is None or error < best_error:
+            best, best_error = rows, error
+    return best
+
+
+def _partition(cardinality: float) -> int:
+    # columns are partitioned by the power of two above their distinct values
+    return max(int(cardinality), 1).bit_length()
+
+
+class LSHIndex:
+    def __init__(self, size: int = SIGNATURE_SIZE, seed: int = SEED):
+        """
+        Parameters:
+            size, seed: integer (optional)
+                Of the MinHash signatures to be indexed
+        """
+        self.size = size
+        self.seed = seed
+        self.signatures: Dict[Hashable, numpy.ndarray] = {}
+        self.cardinalities: Dict[Hashable, float] = {}
+        self.partitions: Set[int] = set()
+        # (partition, band rows, band, band bytes) -> keys
+        self.buckets: Dict[Tuple[int, int, int, bytes], List[Hashable]] = defaultdict(list)
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def add(self, key: Hashable, signature: MinHash, cardinality: Optional[float] = None):
+        """
+        Index the signature of a column
+
+        Parameters:
+            key: hashable
+                What the column is reported as, e.g. (profile, column)
+            signature: MinHash
+                The signature of the column's values
+            cardinality: float (optional)
+                The number of distinct values in the column, estimated from the
+                signature if not given
+        """
+        if (signature.size, signature.seed) != (self.size, self.seed):
+            raise ValueError("Signature doesn't have the size and seed of the index")
+        if key in self.signatures:
+            raise ValueError(f"{key} is already indexed")
+        if signature.is_empty():
+            return
+        values = signature.signature()
+        cardinality = cardinality or signature.cardinality()
+        partition = _partition(cardinality)
+        self.signatures[key] = values
+        self.cardinalities[key] = cardinality
+        self.partitions.add(partition)
+        for rows in BAND_ROWS:
+            for band in range(self.size // rows):
+                band_bytes = values[band * rows : (band + 1) * rows].tobytes()
+                self.buckets[(partition, rows, band, band_bytes)].append(key)
+
+    def _candidates(self, values, cardinality, threshold, measure) -> Set[Hashable]:
+        candidates: Set[Hashable] = set()
+        for partition in self.partitions:
+            # the most distinct values a column of the partition has
+            largest = 2**partition
+            if measure == "jaccard":
+                if min(largest, cardinality) / max(largest / 2, cardinality) < threshold:
+                    continue
+                jaccard = threshold
+            else:
+                if largest / cardinality < threshold:
+                    continue
+                # the least Jaccard similarity with a column of the partition that
+                # contains threshold of the query's values
+                jaccard = threshold * cardinality / (cardinality + largest - threshold * cardinality)
+            rows = band_rows(round(jaccard, 2), self.size)
+            for band in range(self.size // rows):
+                band_bytes = values[band * rows : (band + 1) * rows].tobytes()
+                candidates.update(self.buckets.get((partition, rows, band, band_bytes), ()))
+        return candidates
+
+    def _query(self, values, cardinality, threshold, measure) -> List[Tuple[Any, float]]:
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure '{measure}', expected one of {MEASURES}")
+        matches = []
+        for key in self._candidates(values, cardinality, threshold, measure):
+            jaccard = float(numpy.mean(values == self.signatures[key]))
+            score = jaccard
+            if measure == "containment":
+                # |A ∩ B| = J (|A| + |B|) / (1 + J)
+                other = self.cardinalities[key]
+                score = min(1.0, jaccard * (cardinality + other) / ((1 + jaccard) * cardinality))
+            if score >= threshold:
+                matches.append((key, score))
+        return sorted(matches, key=lambda match: -match[1])
+
+    def query(
+        self,
+        signature: MinHash,
+        threshold: float = 0.5,
+        measure: str = "jaccard",
+        cardinality: Optional[float] = None,
+    ) -> List[Tuple[Any, float]]:
+        """
+        The indexed columns with an estimated Jaccard similarity with (or that
+        contain, for containment) at least threshold of the values of the
+        signature's column, most similar first, as (key, similarity) pairs
+
+        Parameters:
+            signature: MinHash
+                The signature of the column to find similar columns to
+            threshold: float (optional)
+                The least similarity (0 to 1) of the columns to return
+            measure: string (optional)
+                'jaccard' or 'containment'
+            cardinality: float (optional)
+                The number of distinct values in the column
+        """
+        if signature.is_empty():
+            return []
+        cardinality = cardinality or signature.cardinality()
+        return self._query(signature.signature(), cardinality, threshold, measure)
+
+    def similar(
+        self, key: Hashable, threshold: float = 0.5, measure: str = "jaccard"
+    ) -> List[Tuple[Any, float]]:
+        """
+        As query, for an indexed column, which isn't included in the results
+        """
+        matches = self._query(self.signatures[key], self.cardinalities[key], threshold, measure)
+        return [match for match in matches if match[0] != key]
+
+
+def index_profiles(
+    profile_paths: Iterable[str], size: int = SIGNATURE_SIZE, seed: int = SEED
+) -> LSHIndex:
+    """
+    Index the string columns of profiles saved with state.save, the columns are
+    keyed by (profile path, column name)
+    """
+    index = LSHIndex(size, seed)
+    for path in profile_paths:
+        profiler, _ = load(path)
+        for field, column in profiler.columns.items():
+            if isinstance(column, StringProfile):
+                index.add((path, field), column.signature, column.unique_values)
+    return index
@@ -0,0 +1,142 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import orjson
+import pytest
+from block_index import BlockIndex, index_path
+
+
+def write(filename, rows, mode="wb"):
+    with open(filename, mode) as f:
+        f.write(b"".join(orjson.dumps(row) + b"\n" for row in rows))
+
+
+def matching(index, column, op, value):
+    batches = index.read_blocks(index.find_blocks(column, op, value))
+    return [row for batch in batches for row in batch]
+
+
+@pytest.fixture
+def data(tmp_path):
+    filename = str(tmp_path / "data.jsonl")
+    # ids ascend so the zone maps of each block cover a narrow range
+    write(
+        filename,
+        [
+            {"id": i, "user": f"user{i % 97}", "ts": f"2021-{i // 1000 + 1:02}", "x": None}
+            for i in range(10000)
+        ],
+    )
+    return filename
+
+
+def test_blocks_cover_the_file(data):
+    index = BlockIndex.build(data, block_size=20000)
+
+    assert len(index.blocks) > 10
+    assert index.blocks[0].start == 0
+    assert index.blocks[-1].end == os.path.getsize(data)
+    assert all(a.end == b.start for a, b in zip(index.blocks, index.blocks[1:]))
+    assert sum(block.rows for block in index.blocks) == 10000
+
+
+def test_zone_maps_skip_blocks(data):
+    index = BlockIndex.build(data, block_size=20000)
+
+    blocks = index.find_blocks("id", "==", 5000)
+    assert len(blocks) == 1
+    assert any(row["id"] == 5000 for row in matching(index, "id", "==", 5000))
+
+    rows = matching(index, "id", ">=", 9500)
+    assert len(index.find_blocks("id", ">=", 9500)) < len(index.blocks) // 5
+    assert {row["id"] for row in rows} >= set(range(9500, 10000))
+    assert index.find_blocks("id", "<", 0) == []
+    assert len(index.find_blocks("ts", "<", "2021-02")) < len(index.blocks) // 5
+    # numbers aren't compared with strings
+    assert index.find_blocks("ts", ">", 0) == []
+
+
+def test_bloom_filters_skip_blocks(tmp_path):
+    filename = str(tmp_path / "data.jsonl")
+    write(filename, [{"user": f"user{i}"} for i in range(10000)] + [{"user": "alice"}])
+    index = BlockIndex.build(filename, block_size=20000)
+
+    blocks = index.find_blocks("user", "==", "alice")
+    assert blocks[-1] == (index.blocks[-1].start, index.blocks[-1].end)
+    # the zone maps don't rule out 'bob', the filters rule out most blocks
+    assert len(index.find_blocks("user", "==", "bob")) <= 2
+    assert len(index.find_blocks("user", "in", ["alice", "bob"])) <= 3
+
+
+def test_equal_numbers_match(tmp_path):
+    filename = str(tmp_path / "data.jsonl")
+    write(filename, [{"n": 1.0}, {"n": 2}])
+    index = BlockIndex.build(filename)
+
+    assert index.find_blocks("n", "==", 1) and index.find_blocks("n", "==", 2.0)
+
+
+def test_nulls(data):
+    index = BlockIndex.build(data, block_size=20000)
+
+    assert len(index.find_blocks("x", "==", None)) == len(index.blocks)
+    assert index.find_blocks("x", "==", 1) == []
+    assert index.find_blocks("id", "==", None) == []
+    assert len(index.find_blocks("missing", "==", None)) == len(index.blocks)
+    assert index.find_blocks("missing", ">", 1) == []
+
+
+def test_bad_lookups(data):
+    index = BlockIndex.build(data, columns=["id"])
+    with pytest.raises(ValueError):
+        index.find_blocks("id", "like", 1)
+    with pytest.raises(ValueError):
+        index.find_blocks("user", "==", "user1")
+
+
+def test_save_and_load(data):
+    index = BlockIndex.build(data, block_size=20000)
+    index.save()
+    assert os.path.exists(index_path(data))
+
+    loaded = BlockIndex.load(data)
+    assert len(loaded.blocks) == len(index.blocks)
+    for op, value in (("==", 5000), ("<", 100), ("==", "user5"), ("==", None)):
+        assert loaded.find_blocks("id", op, value) == index.find_blocks("id", op, value)
+        assert loaded.find_blocks("user", op, value) == index.find_blocks("user", op, value)
+
+
+def test_load_after_append(data):
+    BlockIndex.build(data, block_size=20000).save()
+    size = os.path.getsize(data)
+    write(data, [{"id": 5000}], "ab")
+
+    index = BlockIndex.load(data)
+    assert index.find_blocks("id", "==", -1) == [(size, os.path.getsize(data))]
+    assert sum(len(batch) for batch in index.read_blocks(index.find_blocks("id", "==", 5000))) >= 2
+    # the unindexed block isn't saved, the index still covers the indexed bytes
+    index.save()
+    assert BlockIndex.load(data).identity["offset"] == size
+
+
+def test_load_rewritten_file(data):
+    BlockIndex.build(data).save()
+    write(data, [{"id": 1}])
+    with pytest.raises(ValueError):
+        BlockIndex.load(data)
+    with open(index_path(data), "wb") as f:
+        f.write(b"NOTANINDEX")
+    with pytest.raises(ValueError):
+        BlockIndex.load(data)
+
+
+def test_compressed_files_are_rejected(tmp_path):
+    import gzip
+
+    filename = str(tmp_path / "data.jsonl.gz")
+    with gzip.open(filename, "wb") as f:
+        f.write(b'{"a": 1}\n')
+    with pytest.raises(ValueError):
+        BlockIndex.build(filename)
@@ -0,0 +1,86 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import pytest
+from lsh_index import LSHIndex, band_rows, index_profiles
+from minhash import MinHash
+from profiler import Profiler
+import state
+
+
+def signature(values):
+    minhash = MinHash()
+    minhash.bulk_add(values)
+    return minhash
+
+
+@pytest.fixture
+def index():
+    index = LSHIndex()
+    index.add("customers.id", signature(f"c{i}" for i in range(10000)), 10000)
+    # a copy of most of customers.id
+    index.add("accounts.customer", signature(f"c{i}" for i in range(500, 10000)), 9500)
+    # a foreign key, 200 of the customers
+    index.add("orders.customer", signature(f"c{i}" for i in range(0, 10000, 50)), 200)
+    for table in range(50):
+        index.add(f"other{table}.id", signature(f"t{table}-{i}" for i in range(1000)), 1000)
+    return index
+
+
+def test_jaccard(index):
+    matches = index.similar("customers.id", 0.7)
+    assert [key for key, _ in matches] == ["accounts.customer"]
+    assert matches[0][1] == pytest.approx(0.95, abs=0.1)
+    assert index.similar("other1.id", 0.5) == []
+
+
+def test_containment(index):
+    # orders.customer shares few values with customers.id, but all of its values
+    # are customers
+    assert index.similar("orders.customer", 0.5) == []
+    keys = [key for key, _ in index.similar("orders.customer", 0.8, measure="containment")]
+    assert "customers.id" in keys
+    assert not any(key.startswith("other") for key in keys)
+
+
+def test_query_looks_in_few_buckets(index):
+    query = signature(f"c{i}" for i in range(10000)).signature()
+    candidates = index._candidates(query, 10000, 0.7, "jaccard")
+    assert "accounts.customer" in candidates
+    assert len(candidates) < 5
+
+
+def test_band_rows():
+    assert band_rows(0.9) > band_rows(0.5) > band_rows(0.1)
+
+
+def test_bad_signatures(index):
+    with pytest.raises(ValueError):
+        index.add("small", MinHash(64))
+    with pytest.raises(ValueError):
+        index.add("customers.id", signature(["x"]))
+    with pytest.raises(ValueError):
+        index.query(signature(["c1"]), measure="cosine")
+    index.add("empty", MinHash())
+    assert "empty" not in index.signatures
+    assert index.query(MinHash()) == []
+
+
+def test_index_profiles(tmp_path):
+    paths = []
+    for name, rows in (
+        ("customers", [{"id": f"c{i}", "name": f"n{i}"} for i in range(2000)]),
+        ("orders", [{"customer": f"c{i % 100}", "amount": i} for i in range(5000)]),
+    ):
+        profiler = Profiler({"id": "string", "name": "string", "customer": "string", "amount": "numeric"})
+        profiler.profile(rows)
+        paths.append(str(tmp_path / f"{name}.cryno"))
+        state.save(paths[-1], profiler, {})
+
+    index = index_profiles(paths)
+    # numeric and empty columns aren't indexed
+    assert len(index) == 3
+    keys = [key for key, _ in index.similar((paths[1], "customer"), 0.8, measure="containment")]
+    assert keys == [(paths[0], "id")]
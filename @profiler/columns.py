@@ -0,0 +1,397 @@
+"""
+Column Profiles
+
+Each column profile summarizes a single field of the dataset. Rather than being
+given values one at a time, profiles are given a batch of values for their column
+(a list, as extracted from the rows) and summarize the batch with NumPy kernels
+or C-implemented builtins, so the Python interpreter is not in the inner loop.
+
+Profiles of the same kind can be merged, so parts of a dataset can be profiled
+separately (e.g. in different processes) and combined.
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import paths  # noqa: F401 - makes the vendored sketches importable
+
+# NumPy, cityhash and the sketches (all built on NumPy) are most of the time it
+# takes to import the profiler, they're imported when the first profile is made
+numpy = CityHash64 = distogram = DateParser = None
+HyperLogLog = MinHash = SpaceSaving = TDigest = None
+
+HISTOGRAM_BINS = 100
+# distinct values are counted exactly until there are more than this many
+EXACT_DISTINCT_LIMIT = 1000
+DISTINCT_ERROR_RATE = 0.01
+TOP_VALUES_TRACKED = 100
+REPORTED_PERCENTILES = (50, 95, 99)
+
+
+def _import_sketches():
+    global numpy, CityHash64, distogram, DateParser
+    global HyperLogLog, MinHash, SpaceSaving, TDigest
+    if numpy is not None:
+        return
+    import numpy
+    from cityhash import CityHash64
+
+    import distogram
+    from dates import DateParser
+    from hyperloglog import HyperLogLog
+    from minhash import MinHash
+    from space_saving import SpaceSaving
+    from tdigest import TDigest
+
+
+def _to_object_array(values: List[Any]) -> "numpy.ndarray":
+    # numpy.array would try to build a nested array from list values
+    return numpy.fromiter(values, dtype=object, count=len(values))
+
+
+def _histogram_bars(h: "distogram.NumpyDistogram", bar_count: int = 10) -> List[int]:
+    """
+    The distribution in bar_count equal width bars between the min and max.
+
+    Each centroid is taken as having half of its count either side of it, the
+    cumulative counts are interpolated at the bar edges.
+    """
+    centroids, counts = h.values, h.counts
+    if counts.size == 0:
+        return []
+    if h.min == h.max:
+        return [int(counts.sum())] + [0] * (bar_count - 1)
+    positions = numpy.concatenate(([h.min], centroids, [h.max]))
+    cumulative = numpy.concatenate(([0], numpy.cumsum(counts) - counts / 2, [counts.sum()]))
+    edges = numpy.linspace(h.min, h.max, bar_count + 1)
+    cumulative = numpy.interp(edges, positions, cumulative)
+    # centroids at the min or max have all of their count inside the range
+    cumulative[0], cumulative[-1] = 0, counts.sum()
+    return [int(bar) for bar in numpy.diff(numpy.round(cumulative))]
+
+
+class ColumnProfile:
+    """
+    Base column profile, counts items and nulls.
+    """
+
+    kind = "other"
+
+    def __init__(self):
+        _import_sketches()
+        self.items = 0
+        self.nulls = 0
+
+    def update(self, values: List[Any]):
+        """
+        Profile a batch of values; profiles which summarize the values return them
+        as they were added (see sampling), numbers and dates as an array and
+        strings as the hashes of the distinct values and how often each was seen
+        """
+        self.items += len(values)
+        self.nulls += values.count(None)
+
+    def merge(self, other: "ColumnProfile"):
+        if type(other) != type(self):
+            raise TypeError(f"Cannot merge {other.kind} profile into {self.kind} profile")
+        self.items += other.items
+        self.nulls += other.nulls
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        return {"type": self.kind, "items": self.items, "nulls": self.nulls}
+
+    def to_state(self) -> Dict[str, Any]:
+        """
+        The complete state of the profile, JSON values and sketches serialized to
+        bytes (see from_state)
+        """
+        return {"type": self.kind, "items": self.items, "nulls": self.nulls}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ColumnProfile":
+        profile = cls()
+        profile.items = state["items"]
+        profile.nulls = state["nulls"]
+        return profile
+
+
+class NumericProfile(ColumnProfile):
+
+    kind = "numeric"
+
+    def __init__(self):
+        super().__init__()
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.cumsum = 0.0
+        self.histogram = distogram.NumpyDistogram(bin_count=HISTOGRAM_BINS)
+        self.quantiles = TDigest()
+
+    def _accumulate(self, values: "numpy.ndarray"):
+        if values.size == 0:
+            return
+        low, high = values.min(), values.max()
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        distogram.bulk_update(self.histogram, values)
+        self.quantiles.batch_update(values)
+
+    def update(self, values: List[Any]):
+        self.items += len(values)
+        values = _to_object_array(values)
+        present = values[values != None]  # noqa: E711 - elementwise comparison
+        self.nulls += len(values) - len(present)
+        present = present.astype(numpy.float64)
+        self.cumsum += float(present.sum())
+        self._accumulate(present)
+        return present
+
+    def merge(self, other: "NumericProfile"):
+        super().merge(other)
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        self.cumsum += other.cumsum
+        self.histogram = distogram.merge(self.histogram, other.histogram)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    def to_state(self):
+        return {
+            **super().to_state(),
+            "min": None if self.min is None else float(self.min),
+            "max": None if self.max is None else float(self.max),
+            "cumsum": self.cumsum,
+            "histogram": distogram.to_bytes(self.histogram),
+            "quantiles": self.quantiles.to_bytes(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        profile = super().from_state(state)
+        profile.min = state["min"]
+        profile.max = state["max"]
+        profile.cumsum = state["cumsum"]
+        profile.histogram = distogram.from_bytes(state["histogram"])
+        profile.quantiles = TDigest.from_bytes(state["quantiles"])
+        return profile
+
+    @property
+    def mean(self) -> Optional[float]:
+        values = self.items - self.nulls
+        return self.cumsum / values if values else None
+
+    def summary(self):
+        return {
+            **super().summary(),
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "bins": _histogram_bars(self.histogram),
+            "percentiles": {
+                p: self.quantiles.percentile(p) for p in REPORTED_PERCENTILES
+            } if self.quantiles.n else {},
+        }
+
+
+class DateProfile(NumericProfile):
+    """
+    Dates are profiled as epoch seconds.
+    """
+
+    kind = "date"
+
+    def __init__(self):
+        super().__init__()
+        self.parser = DateParser()
+
+    def update(self, values: List[Any]):
+        self.items += len(values)
+        present = [
+            value
+            for value in values
+            if value is not None and (not isinstance(value, str) or value.strip())
+        ]
+        self.nulls += len(values) - len(present)
+        present = self.parser.parse(present)
+        self._accumulate(present)
+        return present
+
+    def to_state(self):
+        return {**super().to_state(), "format": self.parser.format, "inferred": self.parser.inferred}
+
+    @classmethod
+    def from_state(cls, state):
+        profile = super().from_state(state)
+        profile.parser.format = state["format"]
+        profile.parser.inferred = state["inferred"]
+        return profile
+
+
+class StringProfile(ColumnProfile):
+    """
+    Distinct values are counted with a HyperLogLog, so memory is fixed however
+    many values there are; while there are only a few distinct values their
+    hashes are also kept so the count is exact. The most frequent values are
+    tracked with a Space-Saving sketch.
+
+    A MinHash signature of the distinct values is kept so columns which share
+    values (e.g. join keys) can be found across profiles, see @indexes/lsh_index.py
+    """
+
+    kind = "string"
+
+    def __init__(self):
+        super().__init__()
+        self.max_length = 0
+        self.distinct = HyperLogLog(DISTINCT_ERROR_RATE)
+        self.exact_hashes: Optional[set] = set()
+        self.top_values = SpaceSaving(TOP_VALUES_TRACKED)
+        self.signature = MinHash()
+
+    def _add_hashes(self, hashes: "numpy.ndarray"):
+        self.distinct.add_hashes(hashes)
+        self.signature.add_hashes(hashes)
+        if self.exact_hashes is not None:
+            self.exact_hashes.update(hashes.tolist())
+            if len(self.exact_hashes) > EXACT_DISTINCT_LIMIT:
+                self.exact_hashes = None
+
+    def update(self, values: List[Any]):
+        self.items += len(values)
+        present = [value for value in values if value is not None]
+        present = numpy.fromiter(map(str, present), dtype=object, count=len(present))
+        stripped = numpy.fromiter(
+            map(len, map(str.strip, present)), dtype=numpy.int64, count=len(present)
+        )
+        present = present[stripped > 0]
+        self.nulls += len(values) - len(present)
+        if present.size == 0:
+            return numpy.empty(0, dtype=numpy.uint64), numpy.empty(0, dtype=numpy.int64)
+        lengths = numpy.fromiter(map(len, present), dtype=numpy.int64, count=len(present))
+        self.max_length = max(self.max_length, int(lengths.max()))
+        counts = Counter(present)
+        self.top_values.add_many(counts)
+        # hash() is seeded per interpreter, a fixed hash lets profiles merge
+        hashes = numpy.fromiter(map(CityHash64, counts), dtype=numpy.uint64, count=len(counts))
+        self._add_hashes(hashes)
+        return hashes, numpy.fromiter(counts.values(), dtype=numpy.int64, count=len(counts))
+
+    def merge(self, other: "StringProfile"):
+        super().merge(other)
+        self.max_length = max(self.max_length, other.max_length)
+        self.distinct.update(other.distinct)
+        self.top_values.merge(other.top_values)
+        self.signature.merge(other.signature)
+        if self.exact_hashes is not None and other.exact_hashes is not None:
+            self.exact_hashes.update(other.exact_hashes)
+            if len(self.exact_hashes) > EXACT_DISTINCT_LIMIT:
+                self.exact_hashes = None
+        else:
+            self.exact_hashes = None
+        return self
+
+    def to_state(self):
+        exact_hashes = None
+        if self.exact_hashes is not None:
+            exact_hashes = numpy.array(sorted(self.exact_hashes), dtype="<u8").tobytes()
+        return {
+            **super().to_state(),
+            "max_length": self.max_length,
+            "distinct": self.distinct.to_bytes(),
+            "exact_hashes": exact_hashes,
+            "top_values": self.top_values.to_bytes(),
+            "signature": self.signature.to_bytes(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        profile = super().from_state(state)
+        profile.signature = MinHash.from_bytes(state["signature"])
+        profile.max_length = state["max_length"]
+        profile.distinct = HyperLogLog.from_bytes(state["distinct"])
+        if state["exact_hashes"] is None:
+            profile.exact_hashes = None
+        else:
+            profile.exact_hashes = set(numpy.frombuffer(state["exact_hashes"], dtype="<u8").tolist())
+        profile.top_values = SpaceSaving.from_bytes(state["top_values"])
+        return profile
+
+    @property
+    def unique_values(self) -> int:
+        if self.exact_hashes is not None:
+            return len(self.exact_hashes)
+        return round(self.distinct.card())
+
+    @property
+    def unique_error(self) -> float:
+        """
+        The standard error of unique_values relative to it, zero when it is exact
+        """
+        return 0.0 if self.exact_hashes is not None else self.distinct.error_rate
+
+    def summary(self):
+        return {
+            **super().summary(),
+            "max_length": self.max_length,
+            "unique_values": self.unique_values,
+            "unique_error": self.unique_error,
+            "top_values": self.top_values.top(),
+        }
+
+
+class EnumProfile(ColumnProfile):
+    """
+    The frequency of values is tracked with a Space-Saving sketch, so a column
+    with more distinct values than expected still uses bounded memory.
+    """
+
+    kind = "enum"
+
+    def __init__(self):
+        super().__init__()
+        self.top_values = SpaceSaving(TOP_VALUES_TRACKED)
+
+    def update(self, values: List[Any]):
+        super().update(values)
+        counts = Counter(values)
+        counts.pop(None, None)
+        self.top_values.add_many(counts)
+
+    def merge(self, other: "EnumProfile"):
+        super().merge(other)
+        self.top_values.merge(other.top_values)
+        return self
+
+    def summary(self):
+        return {**super().summary(), "top_values": self.top_values.top()}
+
+    def to_state(self):
+        return {**super().to_state(), "top_values": self.top_values.to_bytes()}
+
+    @classmethod
+    def from_state(cls, state):
+        profile = super().from_state(state)
+        profile.top_values = SpaceSaving.from_bytes(state["top_values"])
+        return profile
+
+
+COLUMN_PROFILES = {
+    profile.kind: profile
+    for profile in (
+        ColumnProfile,
+        NumericProfile,
+        DateProfile,
+        StringProfile,
+        EnumProfile,
+    )
+}
+
+
+def create_profile(kind: str) -> ColumnProfile:
+    return COLUMN_PROFILES.get(kind, ColumnProfile)()
+
+
+def profile_from_state(state: Dict[str, Any]) -> ColumnProfile:
+    return COLUMN_PROFILES[state["type"]].from_state(state)
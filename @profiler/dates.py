@@ -0,0 +1,144 @@
+"""
+Date Parsing
+
+dateutil can parse almost anything, but slowly. The values in a date column are
+almost always in one format, so the format is inferred from a sample of the
+column and values are converted with that format: ISO-8601 dates as a batch with
+NumPy's datetime64, others with strptime. dateutil is only used for the values
+the format doesn't fit.
+
+Date columns tend to repeat the same dates, so each column keeps a memo of the
+values it has converted and only converts each distinct value once.
+
+Dates are converted to epoch seconds, dates without a timezone are taken to be
+UTC.
+"""
+import datetime
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy
+
+ISO = "iso"
+EPOCH = "epoch"
+# tried in this order, the first of the formats which fit the most of the sample
+# is used
+FORMATS = (
+    ISO,
+    EPOCH,
+    "%B %d, %Y",
+    "%b %d, %Y",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%Y/%m/%d",
+    "%d-%m-%Y",
+    "%a, %d %b %Y %H:%M:%S",
+)
+SAMPLE_SIZE = 100
+MEMO_SIZE = 100000
+# epoch numbers this large are milliseconds, in seconds they'd be after 5000 AD
+MILLISECONDS = 10**11
+
+# datetime64 parses these, timezone offsets are left to dateutil
+ISO_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$")
+EPOCH_PATTERN = re.compile(r"-?\d+(\.\d+)?$")
+
+
+def _fits(value: Any, form: str) -> bool:
+    if not isinstance(value, str):
+        return form == EPOCH
+    value = value.strip()
+    if form == ISO:
+        return ISO_PATTERN.match(value) is not None
+    if form == EPOCH:
+        return EPOCH_PATTERN.match(value) is not None
+    try:
+        datetime.datetime.strptime(value, form)
+        return True
+    except ValueError:
+        return False
+
+
+def infer_format(sample: List[Any]) -> Optional[str]:
+    """
+    The format which fits the most of the sample, None if none fit any of it
+    """
+    best, best_fits = None, 0
+    for form in FORMATS:
+        fits = sum(_fits(value, form) for value in sample)
+        if fits > best_fits:
+            best, best_fits = form, fits
+    return best
+
+
+def _from_epoch(value) -> int:
+    value = float(value)
+    if abs(value) >= MILLISECONDS:
+        value /= 1000
+    return int(value)
+
+
+def _with_dateutil(value) -> int:
+    from dateutil import parser
+
+    parsed = parser.parse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp())
+
+
+def to_epoch(value, form: Optional[str] = None) -> int:
+    """
+    Convert one date to epoch seconds, with the format if it fits and dateutil if
+    it doesn't
+    """
+    if not isinstance(value, str):
+        return _from_epoch(value)
+    value = value.strip()
+    try:
+        if form == ISO and ISO_PATTERN.match(value):
+            return int(numpy.datetime64(value, "s").astype(numpy.int64))
+        if form == EPOCH:
+            return _from_epoch(value)
+        if form is not None:
+            parsed = datetime.datetime.strptime(value, form)
+            return int(parsed.replace(tzinfo=datetime.timezone.utc).timestamp())
+    except ValueError:
+        pass
+    return _with_dateutil(value)
+
+
+class DateParser:
+    """
+    Converts the dates of one column to epoch seconds, the format is inferred from
+    the first batch of dates.
+    """
+
+    def __init__(self):
+        self.format: Optional[str] = None
+        self.inferred = False
+        self.memo: Dict[Any, int] = {}
+
+    def _convert(self, values: List[Any]) -> List[int]:
+        if self.format == ISO and all(
+            isinstance(value, str) and ISO_PATTERN.match(value) for value in values
+        ):
+            return numpy.array(values, dtype="datetime64[s]").astype(numpy.int64).tolist()
+        return [to_epoch(value, self.format) for value in values]
+
+    def parse(self, values: List[Any]) -> numpy.ndarray:
+        """
+        Convert a batch of dates (strings or epoch numbers, no nulls) to an array
+        of epoch seconds
+        """
+        if not self.inferred and values:
+            self.format = infer_format(values[:SAMPLE_SIZE])
+            self.inferred = True
+        if len(self.memo) > MEMO_SIZE:
+            self.memo.clear()
+        memo = self.memo
+        unseen = [value for value in dict.fromkeys(values) if value not in memo]
+        memo.update(zip(unseen, self._convert(unseen)))
+        return numpy.fromiter(map(memo.__getitem__, values), dtype=numpy.int64, count=len(values))
@@ -0,0 +1,74 @@
+"""
+Parallel Profiling
+
+Profiles parts of a dataset in a pool of worker processes and merges the partial
+profiles. The parts are either a list of shard files, or newline aligned byte
+ranges of a single file so each worker reads only its own part of the file.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
+
+from profiler import BATCH_SIZE, Profiler
+from readers import iter_ranges, read_jsonl_batches
+
+# more parts than workers evens out the work when parts are uneven
+PARTS_PER_WORKER = 4
+
+
+def _profile_part(types, filename, start, end, batch_size):
+    return Profiler(types).profile_batches(
+        read_jsonl_batches(filename, batch_size, start=start, end=end)
+    )
+
+
+def profile_parallel(
+    types: Dict[str, str],
+    files: Union[str, List[str]],
+    workers: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Profiler:
+    """
+    Profile one or more JSONL files across a pool of processes.
+
+    Parameters:
+        types: dictionary
+            The name of each field mapped to its type
+        files: string or list of strings
+            A file to split into byte ranges, or a list of shard files
+        workers: integer (optional)
+            The number of worker processes, defaults to the number of CPUs
+        start, end: integers (optional)
+            The newline aligned byte range of a single file to profile, e.g. the
+            lines appended since it was last profiled
+
+    Returns:
+        Profiler
+    """
+    workers = workers or os.cpu_count() or 1
+    if isinstance(files, str):
+        files = [files]
+    if (start or end is not None) and len(files) > 1:
+        raise ValueError("A byte range can only be profiled in a single file")
+
+    parts = []
+    for filename in files:
+        # a single file is split, shards are split only if there are too few;
+        # compressed files can't be split
+        splits = max(1, (workers * PARTS_PER_WORKER) // len(files))
+        ranges = iter_ranges(filename, splits, start, end)
+        parts.extend((filename, part_start, part_end) for part_start, part_end in ranges)
+
+    profile = Profiler(types)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_profile_part, types, filename, part_start, part_end, batch_size)
+            for filename, part_start, part_end in parts
+        ]
+        # merged in the order of the parts, so ties between the top values of the
+        # parts are broken the same way on every run
+        for future in futures:
+            profile.merge(future.result())
+    return profile
@@ -0,0 +1,13 @@
+"""
+Puts @sketches on the path, then the vendored sketches (see @sketches/vendored.py)
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SKETCHES = os.path.join(ROOT, "@sketches")
+if SKETCHES not in sys.path:
+    sys.path.append(SKETCHES)
+
+import vendored  # noqa: E402,F401
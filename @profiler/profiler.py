@@ -0,0 +1,68 @@
+"""
+Profiler
+
+Profiles a dataset a batch of rows at a time; each batch is pivoted into a list of
+values per column and each column profile summarizes its list in one call.
+"""
+from itertools import islice, repeat
+from typing import Dict, Iterable, List
+
+from columns import ColumnProfile, create_profile
+from report import format_report
+
+BATCH_SIZE = 10000
+
+
+class Profiler:
+    def __init__(self, types: Dict[str, str]):
+        """
+        Parameters:
+            types: dictionary
+                The name of each field mapped to its type, one of 'numeric',
+                'date', 'string', 'enum' or 'other'
+        """
+        self.columns: Dict[str, ColumnProfile] = {
+            field: create_profile(kind) for field, kind in types.items()
+        }
+
+    def update(self, rows: List[dict]):
+        """
+        Profile a batch of rows
+        """
+        for field, column in self.columns.items():
+            # map over dict.get keeps the pivot out of the interpreter loop
+            column.update(list(map(dict.get, rows, repeat(field))))
+
+    def profile(self, rows: Iterable[dict], batch_size: int = BATCH_SIZE):
+        """
+        Profile an iterable of rows, batch_size rows at a time
+        """
+        rows = iter(rows)
+        batch = list(islice(rows, batch_size))
+        while batch:
+            self.update(batch)
+            batch = list(islice(rows, batch_size))
+        return self
+
+    def profile_batches(self, batches: Iterable[List[dict]]):
+        """
+        Profile an iterable of batches of rows (e.g. from read_jsonl_batches)
+        """
+        for batch in batches:
+            self.update(batch)
+        return self
+
+    def merge(self, other: "Profiler"):
+        """
+        Fold another profile of the same fields into this one
+        """
+        for field, column in self.columns.items():
+            if field in other.columns:
+                column.merge(other.columns[field])
+        return self
+
+    def summary(self) -> Dict[str, Dict]:
+        return {field: column.summary() for field, column in self.columns.items()}
+
+    def report(self) -> Iterable[str]:
+        return format_report(self.summary())
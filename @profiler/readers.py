@@ -0,0 +1,263 @@
+"""
+Readers yield the rows of a dataset, they never hold more than a chunk of the file
+in memory so datasets larger than memory can be profiled.
+
+JSON lines are read as bytes and handed to orjson without being decoded to str;
+files are memory mapped and each line is passed to orjson as a memoryview of the
+map, so lines aren't copied either. Newlines are found a chunk at a time with
+NumPy. gzip and zstd compressed files (zstd needs the zstandard package) are
+decompressed as they are read.
+
+A filename of "-" reads from stdin so the profiler can be at the end of a pipe.
+"""
+import gzip
+import mmap
+import sys
+from contextlib import contextmanager
+
+import orjson as json
+
+STDIN = "-"
+# the rows of a chunk are held until they're batched, small chunks keep them in
+# cache (32MB chunks read about a third slower)
+CHUNK_SIZE = 256 * 1024
+BATCH_SIZE = 10000
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def compression(filename):
+    """
+    The compression of a file, "gzip", "zstd" or None, from its magic number
+    """
+    with open(filename, "rb") as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return "gzip"
+    if magic == ZSTD_MAGIC:
+        return "zstd"
+    return None
+
+
+def _size(filename):
+    if filename == STDIN or hasattr(filename, "read"):
+        return None
+    with open(filename, "rb") as f:
+        return f.seek(0, 2)
+
+
+@contextmanager
+def open_stream(filename):
+    """
+    Open a file (or stdin, or a file object) as a stream of bytes, compressed
+    files are decompressed as they are read
+    """
+    if filename == STDIN:
+        yield getattr(sys.stdin, "buffer", sys.stdin)
+        return
+    if hasattr(filename, "read"):
+        yield filename
+        return
+    kind = compression(filename)
+    if kind == "gzip":
+        with gzip.open(filename, "rb") as f:
+            yield f
+    elif kind == "zstd":
+        try:
+            import zstandard
+        except ImportError:  # pragma: no cover
+            raise ImportError("zstandard must be installed to read zstd compressed files")
+        with open(filename, "rb") as raw:
+            with zstandard.ZstdDecompressor().stream_reader(raw) as f:
+                yield f
+    else:
+        with open(filename, "rb") as f:
+            yield f
+
+
+def _parse_lines(buffer, start, end, delimiter):
+    """
+    Parse the JSON lines in buffer[start:end], blank lines are skipped
+    """
+    # imported when data is first read, so the CLI can start without NumPy
+    import numpy
+
+    view = numpy.frombuffer(buffer, dtype=numpy.uint8, count=end - start, offset=start)
+    breaks = numpy.flatnonzero(view == delimiter) + start
+    starts = [start] + (breaks + 1).tolist()
+    ends = breaks.tolist() + [end]
+    with memoryview(buffer) as lines:
+        try:
+            return [json.loads(lines[s:e]) for s, e in zip(starts, ends) if e > s]
+        except json.JSONDecodeError:
+            # lines of only whitespace are blank too, but rare enough not to
+            # check for up front
+            return [
+                json.loads(lines[s:e])
+                for s, e in zip(starts, ends)
+                if bytes(lines[s:e]).strip()
+            ]
+
+
+def _mapped_chunks(filename, start, end, chunk_size, delimiter):
+    with open(filename, "rb") as f:
+        size = f.seek(0, 2)
+        end = size if end is None else min(end, size)
+        if end <= start:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = start
+            while position < end:
+                # chunks end just after a newline, a line longer than the chunk
+                # makes the chunk longer
+                limit = min(position + chunk_size, end)
+                if limit < end:
+                    newline = mapped.rfind(delimiter, position, limit)
+                    if newline < 0:
+                        newline = mapped.find(delimiter, limit, end)
+                    limit = end if newline < 0 else newline + 1
+                yield _parse_lines(mapped, position, limit, delimiter[0])
+                position = limit
+
+
+def _streamed_chunks(filename, chunk_size, delimiter):
+    with open_stream(filename) as f:
+        carry_forward = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            buffer = carry_forward + chunk
+            newline = buffer.rfind(delimiter)
+            if newline < 0:
+                carry_forward = buffer
+                continue
+            carry_forward = buffer[newline + 1 :]
+            yield _parse_lines(buffer, 0, newline + 1, delimiter[0])
+        if carry_forward:
+            yield _parse_lines(carry_forward, 0, len(carry_forward), delimiter[0])
+
+
+def read_jsonl_chunks(filename, start=0, end=None, chunk_size=CHUNK_SIZE, delimiter=b"\n"):
+    """
+    Reads a file of JSON lines, yielding a list of the rows in each chunk of the
+    file. Uncompressed files can be read from the byte range [start, end), which
+    should be newline aligned (see iter_ranges).
+    """
+    if isinstance(delimiter, str):
+        delimiter = delimiter.encode()
+    if filename == STDIN or hasattr(filename, "read") or compression(filename):
+        # a stream's size isn't known, any end is a byte range
+        size = _size(filename)
+        if start != 0 or (end is not None and (size is None or end < size)):
+            raise ValueError("streamed and compressed files can only be read whole")
+        yield from _streamed_chunks(filename, chunk_size, delimiter)
+    else:
+        yield from _mapped_chunks(filename, start, end, chunk_size, delimiter)
+
+
+def read_jsonl_batches(
+    filename, batch_size=BATCH_SIZE, start=0, end=None, chunk_size=CHUNK_SIZE, delimiter=b"\n"
+):
+    """
+    Reads a file of JSON lines, yielding lists of up to batch_size rows
+    """
+    batch = []
+    for rows in read_jsonl_chunks(filename, start, end, chunk_size, delimiter):
+        batch.extend(rows)
+        if len(batch) >= batch_size:
+            full = len(batch) - len(batch) % batch_size
+            for i in range(0, full, batch_size):
+                yield batch[i : i + batch_size]
+            batch = batch[full:]
+    if batch:
+        yield batch
+
+
+def read_jsonl(filename, limit=-1, chunk_size=CHUNK_SIZE, delimiter=b"\n"):
+    """
+    Reads a file of JSON lines, yielding each line as a dictionary, blank lines
+    are skipped.
+    """
+    for rows in read_jsonl_chunks(filename, chunk_size=chunk_size, delimiter=delimiter):
+        for row in rows:
+            yield row
+            limit -= 1
+            if limit == 0:
+                return
+
+
+def complete_lines_end(filename, start=0):
+    """
+    The offset just after the last newline in the file (at or after start), a
+    line without a newline may still be being written
+    """
+    size = _size(filename)
+    if size <= start:
+        return start
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped.rfind(b"\n", start) + 1 or start
+
+
+def iter_ranges(filename, parts, start=0, end=None):
+    """
+    Split a file (or the newline aligned byte range [start, end) of it) into up to
+    `parts` (start, end) byte ranges, each range starts at the beginning of a line
+    and ends just after a newline (or at the end of the file), so each range can
+    be read independently. Compressed files can't be split, they are one range.
+    """
+    size = _size(filename)
+    end = size if end is None else min(end, size)
+    if compression(filename):
+        parts = 1
+    if end <= start:
+        return
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            first, length = start, end - start
+            for part in range(1, parts):
+                position = first + length * part // parts
+                if position >= end:
+                    break
+                if position <= start:
+                    continue
+                # a boundary which lands mid-line moves to the start of the next line
+                newline = mapped.find(b"\n", position - 1, end)
+                position = end if newline < 0 else newline + 1
+                if position > start:
+                    yield start, position
+                    start = position
+            if end > start:
+                yield start, end
+
+
+def iter_blocks(filename, block_size, blocks):
+    """
+    The (block, start, end) byte ranges of the numbered blocks of a file, in the
+    order given; block n is the lines which start in [n * block_size, (n + 1) *
+    block_size), so the blocks of a file don't overlap and cover every line (a
+    block can be empty when a line is longer than the block size).
+    """
+    if compression(filename):
+        raise ValueError("compressed files can't be read a block at a time")
+    size = _size(filename)
+    if size == 0:
+        return
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+
+            def line_start(position):
+                # the start of the first line at or after position
+                if position <= 0:
+                    return 0
+                if position >= size:
+                    return size
+                newline = mapped.find(b"\n", position - 1)
+                return size if newline < 0 else newline + 1
+
+            for block in blocks:
+                yield block, line_start(block * block_size), line_start((block + 1) * block_size)
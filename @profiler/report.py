@@ -0,0 +1,164 @@
+"""
+Formats column profiles as the one-line-per-field report.
+"""
+import datetime
+import math
+from typing import Dict, Iterable, List, Tuple
+
+
+def draw_histogram(bins: List[int]) -> str:
+    BAR_CHARS = (" ", "▁", "▂", "▃", "▄", "▅", "▆", "▇", "█")
+
+    if not bins:
+        return ""
+    mx = max(bins)
+    if mx == 0:
+        return " " * len(bins)
+
+    bar_height = mx / 7
+    bars = []
+    for v in bins:
+        if v == 0:
+            bars.append(" ")
+            continue
+        height = int(v / bar_height) + 1
+        bars.append(BAR_CHARS[height])
+
+    return "[hist] >" + "".join(bars) + "<"
+
+
+def date_from_epoch(seconds, form="%Y-%m-%d %H:%M:%S"):
+    # dates without a timezone are parsed as UTC
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime(form)
+
+
+def _share(count, error, total):
+    # approximate counts are marked, the count is an upper bound
+    return f"{'~' if error else ''}{(count / total):.0%}"
+
+
+def enum_summary(top_values: List[Tuple], total: int) -> str:
+    if total == 0:
+        return ""
+    eliminated = 0
+    result = "[vals] "
+    for item, count, error in top_values[:2]:
+        result += f"`{item}`: {_share(count, error, total)} "
+        eliminated += count
+    if eliminated < total:
+        result += f"`other` ({total - eliminated}): {(total - eliminated) / total:.0%}"
+    return result
+
+
+def top_summary(top_values: List[Tuple], total: int) -> str:
+    # only values which are certainly common are worth showing
+    repeated = [
+        (item, count, error)
+        for item, count, error in top_values[:2]
+        if count - error > 1 and (count - error) / total >= 0.01
+    ]
+    if not repeated:
+        return ""
+    return " [top] " + " ".join(
+        f"`{item}`: {_share(count, error, total)}" for item, count, error in repeated
+    )
+
+
+def human_format(num):
+    display = float("{:.2g}".format(num))
+    magnitude = 0
+    while abs(display) >= 1000:
+        magnitude += 1
+        display /= 1000.0
+    if magnitude < 2:
+        return str(num)
+    return "{}{}".format(
+        "{:1f}".format(display).rstrip("0").rstrip("."),
+        ["", "K", "M", "B", "T", "P", "E", "Z", "Y", "Br"][magnitude],
+    )
+
+
+def empty_summary(nulls, items):
+    if nulls > 0:
+        return f" [empty] {(nulls / items):.1%}"
+    else:
+        return ""
+
+
+def unique_summary(unique, error):
+    if error:
+        return f"~{unique} (±{error:.1%})"
+    return str(unique)
+
+
+def percentile_summary(percentiles: Dict[int, float]) -> str:
+    return "".join(f" [p{p}] {value:.3g}" for p, value in percentiles.items())
+
+
+def format_field(field: str, summary: Dict) -> str:
+    kind = summary["type"]
+    common = f"{field:20} [count] {summary['items']}{empty_summary(summary['nulls'], summary['items'])}"
+
+    if kind == "numeric":
+        if summary["min"] is None:
+            return f"[num] {common}"
+        return (
+            f"[num] {common} [range] {human_format(summary['min'])} to {human_format(summary['max'])}"
+            f" [mean] {summary['mean']:.2}{percentile_summary(summary['percentiles'])}"
+            f" {draw_histogram(summary['bins'])}"
+        )
+    if kind == "date":
+        if summary["min"] is None:
+            return f"[num] {common}"
+        return (
+            f"[num] {common} [range] {date_from_epoch(summary['min'])} to {date_from_epoch(summary['max'])}"
+            f" {draw_histogram(summary['bins'])}"
+        )
+    values = summary["items"] - summary["nulls"]
+    if kind == "string":
+        return (
+            f"[str] {common} [unique] {unique_summary(summary['unique_values'], summary['unique_error'])}"
+            f"{top_summary(summary['top_values'], values)}"
+        )
+    if kind == "enum":
+        return f"[enm] {common} {enum_summary(summary['top_values'], values)}"
+    return f"[oth] {common}"
+
+
+def format_report(summaries: Dict[str, Dict]) -> Iterable[str]:
+    for field, summary in summaries.items():
+        yield format_field(field, summary)
+
+
+def bounds_summary(kind: str, bounds: Dict[str, Tuple]) -> str:
+    def value(number):
+        if kind == "date" and math.isfinite(number):
+            return date_from_epoch(number)
+        return f"{number:.3g}"
+
+    parts = []
+    for name, (estimate, lower, upper) in bounds.items():
+        if name == "nulls":
+            parts.append(f"[empty] {estimate:.1%} ({lower:.1%} to {upper:.1%})")
+        elif name == "unique":
+            # not bounds at the confidence, see sampling
+            parts.append(f"[unique] ~{estimate:.0f} ({lower:.0f} to {upper:.0f}, no confidence)")
+        else:
+            parts.append(f"[{name}] {value(estimate)} ({value(lower)} to {value(upper)})")
+    return " ".join(parts)
+
+
+def format_sample(summary: Dict) -> Iterable[str]:
+    """
+    The bounds of a sampled profile's estimates, the counts in the report are of
+    the sampled rows
+    """
+    rows, lower, upper = summary["rows"]
+    yield (
+        f"[smp] {summary['sampled']} of {summary['blocks']} blocks ({summary['fraction']:.1%})"
+        f" [rows] ~{rows:.0f} ({lower:.0f} to {upper:.0f})"
+        f" at {summary['confidence']:.0%} confidence"
+        f"{'' if summary['converged'] else ' (not converged)'}"
+    )
+    for field, bounds in summary["bounds"].items():
+        yield f"[bnd] {field:20} {bounds_summary(summary['types'][field], bounds)}"
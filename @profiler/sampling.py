@@ -0,0 +1,427 @@
+"""
+Sampling
+
+Profiles a random sample of a file's blocks rather than every line, for a quick
+look at a large file. The head of a file (read_jsonl's limit) is a biased sample
+of e.g. time ordered logs; here blocks are read from across the file in a random
+order, the estimates are updated as blocks are read and reading stops once they
+are within the tolerance at the confidence asked for. (@pyudorandom's
+permutations step through the blocks a fixed stride at a time, so with a small
+stride the first blocks read would all be near the head of the file.)
+
+    sample = profile_sample(types, "huge.jsonl", confidence=0.95, tolerance=0.01)
+    for line in sample.report():
+        print(line)
+
+The lines of a block aren't independent of each other (nearby log lines have
+similar times), so blocks are the sampled units (cluster sampling, Cochran,
+Sampling Techniques, ch. 9). Null rates, means and the ranks of percentiles are
+ratios of per block totals, the variance of each is estimated from how much the
+blocks differ, with the finite population correction for the share of the file
+read. A percentile's bounds are the values at its rank, plus and minus the half
+width of the interval of the rank of the estimated value.
+
+Distinct values of string columns are estimated from how often each sampled value
+was seen (Shlosser's estimator), kept between the values seen and the most there
+could be if each value seen once stood for 1 / (share of the rows read) values
+(as GEE does, Charikar et al, Towards Estimation Error Guarantees for Distinct
+Values). The bounds are the estimates at either end of the interval of the share
+of the rows read; they don't allow for the chance of which values were seen, so
+aren't at the confidence asked for. The estimate has converged when it has stayed
+within the tolerance for the last few blocks.
+
+The tolerance is of proportions for null rates and ranks, of standard deviations
+of the values for means, and relative for distinct values.
+"""
+import math
+import os
+from collections import Counter
+from itertools import repeat
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy
+
+from columns import REPORTED_PERCENTILES, ColumnProfile
+from profiler import Profiler
+from readers import STDIN, compression, iter_blocks, read_jsonl_chunks
+from report import format_sample
+
+BLOCK_SIZE = 1024 * 1024
+# bounds from fewer blocks than this, or than this share of a small file's
+# blocks, aren't trusted to have converged
+MIN_BLOCKS = 30
+MIN_SHARE = 0.05
+# distinct value estimates have converged when the estimates after this many
+# blocks are all within the tolerance of the latest
+STABLE_BLOCKS = 5
+# the most distinct values of a string column counted for the estimate
+DISTINCT_SAMPLE_SIZE = 1 << 16
+# the estimates are checked again once this share more blocks have been read, so
+# reading stops within that share of the blocks read after they converge
+CHECK_SHARE = 0.05
+# each block's values are kept as this many evenly spaced percentiles, to find
+# the share of the block's values below a value
+BLOCK_PERCENTILES = (numpy.arange(128) + 0.5) * 100 / 128
+
+# estimate, lower bound and upper bound
+Bounds = Tuple[float, float, float]
+
+
+def _ratio(totals: numpy.ndarray, sizes: numpy.ndarray, z: float, unread: float):
+    """
+    The ratio of the sum of the per block totals to the sum of their sizes, and
+    the half width of its interval (unread is the share of blocks not sampled)
+    """
+    size = sizes.sum()
+    if size == 0:
+        return None, 0.0
+    ratio = totals.sum() / size
+    blocks = len(sizes)
+    if unread <= 0:
+        return ratio, 0.0
+    if blocks < 2:
+        return ratio, math.inf
+    residuals = totals - ratio * sizes
+    variance = unread * (residuals @ residuals) / (blocks - 1) / blocks / (size / blocks) ** 2
+    return ratio, z * math.sqrt(variance)
+
+
+class ColumnSample:
+    """
+    The per block counts of items and nulls of a column
+    """
+
+    kind = "other"
+
+    def __init__(self):
+        self.items: List[int] = []
+        self.nulls: List[int] = []
+        # the profile's counts after the last block
+        self.profiled = (0, 0)
+
+    def add(self, profile: ColumnProfile, added: Any, share: float):
+        """
+        Record a block; the profile of the column with the block added, what the
+        profile's update returned for it and the block's share of the file
+        """
+        items, nulls = self.profiled
+        self.items.append(profile.items - items)
+        self.nulls.append(profile.nulls - nulls)
+        self.profiled = (profile.items, profile.nulls)
+
+    def estimate(
+        self, profile: ColumnProfile, z: float, unread: float
+    ) -> Tuple[Dict[str, Bounds], Dict[str, float]]:
+        """
+        The bounds of each estimate given the profile of all the sampled blocks,
+        and how far each is from having converged (in the units of the tolerance)
+        """
+        items = numpy.array(self.items, dtype=numpy.float64)
+        rate, half = _ratio(numpy.array(self.nulls, dtype=numpy.float64), items, z, unread)
+        if rate is None:
+            return {}, {}
+        return {"nulls": (rate, max(0.0, rate - half), min(1.0, rate + half))}, {"nulls": half}
+
+
+class NumericSample(ColumnSample):
+
+    kind = "numeric"
+    reports_mean = True
+
+    def __init__(self):
+        super().__init__()
+        self.sums: List[float] = []
+        self.percentiles: List[numpy.ndarray] = []
+
+    def add(self, profile, added, share):
+        super().add(profile, added, share)
+        self.sums.append(float(added.sum()))
+        # NaN for a block without values, which is below and above nothing
+        self.percentiles.append(
+            numpy.percentile(added, BLOCK_PERCENTILES)
+            if added.size
+            else numpy.full(len(BLOCK_PERCENTILES), numpy.nan)
+        )
+
+    def estimate(self, profile, z, unread):
+        bounds, errors = super().estimate(profile, z, unread)
+        counts = numpy.array(self.items, dtype=numpy.float64) - self.nulls
+        if counts.sum() == 0:
+            return bounds, errors
+        percentiles = numpy.array(self.percentiles)
+
+        if self.reports_mean:
+            present = counts > 0
+            weights = counts[present] / counts.sum()
+            values = percentiles[present]
+            centre = values.mean(axis=1) @ weights
+            deviation = math.sqrt(((values - centre) ** 2).mean(axis=1) @ weights)
+            mean, half = _ratio(numpy.array(self.sums), counts, z, unread)
+            bounds["mean"] = (mean, mean - half, mean + half)
+            errors["mean"] = half / deviation if deviation else (math.inf if half else 0.0)
+
+        digest = profile.quantiles
+        for p, value in zip(REPORTED_PERCENTILES, digest.percentiles(REPORTED_PERCENTILES)):
+            below = (percentiles <= value).mean(axis=1)
+            _, half = _ratio(below * counts, counts, z, unread)
+            lower, upper = digest.percentiles([max(0.0, p - 100 * half), min(100.0, p + 100 * half)])
+            bounds[f"p{p}"] = (value, lower, upper)
+            errors[f"p{p}"] = half
+        return bounds, errors
+
+
+class DateSample(NumericSample):
+    """
+    Dates are epoch seconds, their mean isn't reported
+    """
+
+    kind = "date"
+    reports_mean = False
+
+
+class StringSample(ColumnSample):
+    """
+    Also counts how often each value was seen (by its hash), for the distinct
+    value estimate. Only the values whose hashes are at most a threshold are
+    counted; it's halved each time more than DISTINCT_SAMPLE_SIZE values are,
+    so the counts are of a random share of the distinct values (Gibbons,
+    Distinct Sampling for Highly-Accurate Answers to Distinct Values Queries)
+    """
+
+    kind = "string"
+
+    def __init__(self):
+        super().__init__()
+        # how often each hash at most the threshold was seen, and how many were
+        # seen each number of times
+        self.counts: Dict[int, int] = {}
+        self.frequencies: Dict[int, int] = {}
+        self.threshold = 2**64 - 1
+        self.shares: List[float] = []
+        self.fraction = 0.0
+        self.history: List[float] = []
+
+    def _tally(self, counts: numpy.ndarray, sign: int):
+        times, number = numpy.unique(counts, return_counts=True)
+        frequencies = self.frequencies
+        for seen, count in zip(times.tolist(), (sign * number).tolist()):
+            frequencies[seen] = frequencies.get(seen, 0) + count
+            if frequencies[seen] == 0:
+                del frequencies[seen]
+
+    def add(self, profile, added, share):
+        super().add(profile, added, share)
+        hashes, seen = added
+        kept = hashes <= numpy.uint64(self.threshold)
+        hashes, seen = hashes[kept].tolist(), seen[kept]
+        before = numpy.fromiter(
+            map(self.counts.get, hashes, repeat(0)), dtype=numpy.int64, count=len(hashes)
+        )
+        after = before + seen
+        self.counts.update(zip(hashes, after.tolist()))
+        self._tally(before[before > 0], -1)
+        self._tally(after, 1)
+        while len(self.counts) > DISTINCT_SAMPLE_SIZE:
+            self.threshold >>= 1
+            self.counts = {
+                value: count for value, count in self.counts.items() if value <= self.threshold
+            }
+            self.frequencies = dict(Counter(self.counts.values()))
+
+        self.shares.append(share)
+        self.fraction += share
+        self.history.append(self._shlosser(self.fraction))
+
+    def _shlosser(self, q: float) -> float:
+        """
+        The estimate when q of the rows have been read, between GEE's bounds
+        """
+        # the counts are of this share of the distinct values
+        share = (self.threshold + 1) / 2**64
+        seen = len(self.counts) / share
+        once = self.frequencies.get(1, 0) / share
+        if q >= 1 or once == 0:
+            return seen
+        if q <= 0:
+            return math.inf
+        times = numpy.fromiter(self.frequencies, dtype=numpy.float64, count=len(self.frequencies))
+        frequencies = numpy.fromiter(
+            self.frequencies.values(), dtype=numpy.float64, count=len(self.frequencies)
+        )
+        unseen = ((1 - q) ** times) @ frequencies
+        seen_again = (times * q * (1 - q) ** (times - 1.0)) @ frequencies
+        return min(max(seen + once * unseen / seen_again, seen), seen + once * (1 / q - 1))
+
+    def distinct(self, z: float = 0.0) -> Bounds:
+        """
+        The estimate, and the estimates at either end of the interval (at z) of
+        the share of the rows read
+        """
+        sampled = sum(self.items)
+        rows, half = _ratio(
+            numpy.array(self.items, dtype=numpy.float64),
+            numpy.array(self.shares),
+            z,
+            1 - self.fraction,
+        )
+        lowest = sampled / (rows + half) if rows else 0.0
+        highest = sampled / (rows - half) if rows and rows - half > sampled else 1.0
+        return self._shlosser(self.fraction), self._shlosser(highest), self._shlosser(lowest)
+
+    def estimate(self, profile, z, unread):
+        bounds, errors = super().estimate(profile, z, unread)
+        if self.counts:
+            bounds["unique"] = self.distinct(z)
+            latest = self.history[-1]
+            recent = self.history[-STABLE_BLOCKS:]
+            errors["unique"] = (
+                max(abs(estimate - latest) for estimate in recent) / latest
+                if len(recent) == STABLE_BLOCKS
+                else math.inf
+            )
+        return bounds, errors
+
+
+COLUMN_SAMPLES = {
+    sample.kind: sample for sample in (ColumnSample, NumericSample, DateSample, StringSample)
+}
+
+
+class Sample:
+    def __init__(
+        self,
+        types: Dict[str, str],
+        filename: str,
+        confidence: float = 0.95,
+        tolerance: float = 0.01,
+        block_size: int = BLOCK_SIZE,
+        seed: Optional[int] = None,
+    ):
+        """
+        Parameters:
+            types: dictionary
+                The name of each field mapped to its type, as for Profiler
+            filename: string
+                An uncompressed JSONL file
+            confidence: float (optional)
+                Of the bounds (0 to 1)
+            tolerance: float (optional)
+                The half width of the bounds at which the estimates have converged
+            block_size: integer (optional)
+                The size of the blocks, in bytes
+            seed: integer (optional)
+                Of the order the blocks are read in
+        """
+        if filename == STDIN or compression(filename):
+            raise ValueError("only uncompressed files can be sampled")
+        self.types = types
+        self.filename = filename
+        self.confidence = confidence
+        self.tolerance = tolerance
+        self.block_size = block_size
+        self.seed = seed
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.size = os.path.getsize(filename)
+        self.blocks = -(-self.size // block_size)
+        self.profiler = Profiler(types)
+        self.columns = {
+            field: COLUMN_SAMPLES.get(kind, ColumnSample)() for field, kind in types.items()
+        }
+        # the rows and (nominal) bytes of each sampled block
+        self.rows: List[int] = []
+        self.bytes: List[int] = []
+
+    @property
+    def fraction(self) -> float:
+        """
+        The share of the file sampled
+        """
+        return sum(self.bytes) / self.size if self.size else 1.0
+
+    def add_block(self, block: int, start: int, end: int):
+        rows = [row for chunk in read_jsonl_chunks(self.filename, start, end) for row in chunk]
+        self.rows.append(len(rows))
+        self.bytes.append(min(self.block_size, self.size - block * self.block_size))
+        share = self.bytes[-1] / self.size
+        # as Profiler.update, but keeping what each column's update returns
+        for field, column in self.profiler.columns.items():
+            added = column.update(list(map(dict.get, rows, repeat(field))))
+            self.columns[field].add(column, added, share)
+
+    def _estimates(self):
+        unread = 1 - self.fraction
+        return {
+            field: column.estimate(self.profiler.columns[field], self.z, unread)
+            for field, column in self.columns.items()
+        }
+
+    def converged(self) -> bool:
+        minimum = min(MIN_BLOCKS, max(STABLE_BLOCKS, math.ceil(MIN_SHARE * self.blocks)))
+        if len(self.rows) < min(minimum, self.blocks):
+            return False
+        return all(
+            error <= self.tolerance
+            for _, errors in self._estimates().values()
+            for error in errors.values()
+        )
+
+    def run(self, max_blocks: Optional[int] = None):
+        """
+        Sample blocks until the estimates converge, every block has been read or
+        max_blocks have been read
+        """
+        order = numpy.random.default_rng(self.seed).permutation(self.blocks).tolist()
+        check = 0
+        for block, start, end in iter_blocks(self.filename, self.block_size, order):
+            self.add_block(block, start, end)
+            read = len(self.rows)
+            if read == max_blocks:
+                break
+            if read >= check:
+                if self.converged():
+                    break
+                check = read + max(1, int(read * CHECK_SHARE))
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        rows, half = _ratio(
+            numpy.array(self.rows, dtype=numpy.float64),
+            numpy.array(self.bytes, dtype=numpy.float64),
+            self.z,
+            1 - self.fraction,
+        )
+        rows = (rows or 0.0) * self.size
+        half *= self.size
+        return {
+            "blocks": self.blocks,
+            "sampled": len(self.rows),
+            "fraction": self.fraction,
+            "confidence": self.confidence,
+            "converged": len(self.rows) == self.blocks or self.converged(),
+            # rows is an estimate of the whole file's, the sampled rows are the
+            # profile's counts
+            "rows": (rows, max(sum(self.rows), rows - half), rows + half),
+            "types": self.types,
+            "bounds": {field: bounds for field, (bounds, _) in self._estimates().items()},
+        }
+
+    def report(self):
+        yield from self.profiler.report()
+        yield from format_sample(self.summary())
+
+
+def profile_sample(
+    types: Dict[str, str],
+    filename: str,
+    confidence: float = 0.95,
+    tolerance: float = 0.01,
+    block_size: int = BLOCK_SIZE,
+    max_blocks: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> Sample:
+    """
+    Profile random blocks of a file until the estimates are within the tolerance
+    at the confidence (see Sample)
+    """
+    return Sample(types, filename, confidence, tolerance, block_size, seed).run(max_blocks)
@@ -0,0 +1,137 @@
+"""
+Profile State
+
+A profile can be saved along with the identity of the file it profiled and the
+byte offset it got to, so files which are only appended to (such as logs) can be
+profiled incrementally; a later run loads the profile and profiles only the lines
+appended since.
+
+The state is laid out as:
+
+    header     magic number, format version and the length of the metadata
+    metadata   JSON - the file identity and the state of each column, with each
+               serialized sketch replaced by a reference to its bytes
+    sketches   the bytes of each serialized sketch
+"""
+import os
+import struct
+import zlib
+from typing import Any, Dict, Tuple
+
+import orjson
+
+from columns import profile_from_state
+from profiler import Profiler
+
+MAGIC = b"CRYNO"
+# 2 - string columns have MinHash signatures
+VERSION = 2
+HEADER = struct.Struct("<5sHI")
+# the bytes at the start of the file and just before the offset are checksummed
+FINGERPRINT_SIZE = 4096
+
+
+def file_identity(filename: str, offset: int) -> Dict[str, Any]:
+    """
+    Identifies the first `offset` bytes of a file by checksums of the bytes at the
+    start of the file and of the bytes just before the offset, which change if the
+    file is replaced or rewritten rather than appended to
+    """
+    with open(filename, "rb") as f:
+        head = f.read(min(offset, FINGERPRINT_SIZE))
+        f.seek(max(0, offset - FINGERPRINT_SIZE))
+        tail = f.read(offset - f.tell())
+    return {
+        "path": os.path.abspath(filename),
+        "offset": offset,
+        "head": zlib.crc32(head),
+        "tail": zlib.crc32(tail),
+    }
+
+
+def is_prefix(identity: Dict[str, Any], filename: str) -> bool:
+    """
+    Whether the file still starts with the bytes the identity was taken of
+    """
+    if not os.path.exists(filename) or os.path.getsize(filename) < identity["offset"]:
+        return False
+    current = file_identity(filename, identity["offset"])
+    return (current["head"], current["tail"]) == (identity["head"], identity["tail"])
+
+
+def dumps(profiler: Profiler, identity: Dict[str, Any]) -> bytes:
+    """
+    Serialize a profile and the identity of the file it profiled
+    """
+    sketches = []
+    size = 0
+    columns = {}
+    for field, column in profiler.columns.items():
+        state = column.to_state()
+        for key, value in state.items():
+            if isinstance(value, bytes):
+                state[key] = {"$bytes": [size, len(value)]}
+                sketches.append(value)
+                size += len(value)
+        columns[field] = state
+    metadata = orjson.dumps({"source": identity, "columns": columns})
+    return b"".join([HEADER.pack(MAGIC, VERSION, len(metadata)), metadata] + sketches)
+
+
+def loads(data: bytes) -> Tuple[Profiler, Dict[str, Any]]:
+    """
+    Load a profile saved with dumps, returns the profile and the identity of the
+    file it profiled
+    """
+    magic, version, length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Data is not a saved profile")
+    if version != VERSION:
+        raise ValueError(f"Saved profile is version {version}, version {VERSION} is supported")
+    metadata = orjson.loads(data[HEADER.size : HEADER.size + length])
+    sketches = memoryview(data)[HEADER.size + length :]
+
+    profiler = Profiler({})
+    for field, state in metadata["columns"].items():
+        for key, value in state.items():
+            if isinstance(value, dict):
+                start, size = value["$bytes"]
+                state[key] = sketches[start : start + size]
+        profiler.columns[field] = profile_from_state(state)
+    return profiler, metadata["source"]
+
+
+def save(path: str, profiler: Profiler, identity: Dict[str, Any]):
+    # write then rename, so an interrupted save doesn't lose the previous state
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(dumps(profiler, identity))
+    os.replace(temporary, path)
+
+
+def load(path: str) -> Tuple[Profiler, Dict[str, Any]]:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def resume(path: str, filename: str, types: Dict[str, str]) -> Tuple[Profiler, int]:
+    """
+    The profile saved at path and the offset to continue profiling the file from,
+    or a new profile and 0 when there's no saved profile of this file (or the file
+    has been rewritten, the types have changed or it was saved by another version)
+    """
+    fresh = Profiler(types)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, _ = HEADER.unpack_from(data)
+        if magic == MAGIC and version != VERSION:
+            return fresh, 0
+        profiler, identity = loads(data)
+        if _kinds(profiler) == _kinds(fresh) and is_prefix(identity, filename):
+            return profiler, identity["offset"]
+    return fresh, 0
+
+
+def _kinds(profiler: Profiler) -> Dict[str, str]:
+    return {field: column.kind for field, column in profiler.columns.items()}
@@ -0,0 +1,156 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import numpy as np
+from pytest import approx
+from columns import (
+    create_profile,
+    NumericProfile,
+    DateProfile,
+    StringProfile,
+    EnumProfile,
+    ColumnProfile,
+)
+
+
+def test_numeric_profile():
+    p = NumericProfile()
+    p.update([1, "2", None, 3.5])
+    p.update([None, -1])
+
+    assert p.items == 6
+    assert p.nulls == 2
+    assert p.min == -1
+    assert p.max == 3.5
+    assert p.mean == approx(5.5 / 4)
+
+
+def test_string_profile():
+    p = StringProfile()
+    p.update(["a", "bb", "  ", None, "a"])
+    p.update(["ccc", ""])
+
+    assert p.items == 7
+    assert p.nulls == 3
+    assert p.max_length == 3
+    assert p.unique_values == 3
+
+
+def test_enum_profile():
+    p = EnumProfile()
+    p.update(["x", "y", None, "x"])
+
+    assert p.nulls == 1
+    assert p.top_values.top() == [("x", 2, 0), ("y", 1, 0)]
+
+
+def test_enum_profile_is_bounded():
+    p = EnumProfile()
+    for i in range(10):
+        p.update(["x"] * 100 + [f"v{j}" for j in range(i * 1000, (i + 1) * 1000)])
+
+    assert len(p.top_values) <= p.top_values.capacity
+    item, count, error = p.top_values.top(1)[0]
+    assert item == "x"
+    assert count - error <= 1000 <= count
+
+
+def test_unknown_type_is_other():
+    p = create_profile("is_cve")
+    assert type(p) == ColumnProfile
+
+
+def test_histogram_bars():
+    p = NumericProfile()
+    p.update(list(range(1000)))
+
+    bars = p.summary()["bins"]
+    assert len(bars) == 10
+    assert sum(bars) == 1000
+
+
+def test_histogram_bars_with_few_values():
+    p = NumericProfile()
+    p.update([1, 1, 1, 2, 3])
+
+    bars = p.summary()["bins"]
+    assert len(bars) == 10
+    assert sum(bars) == 5
+    assert bars[0] > bars[-1]
+
+
+def test_histogram_is_bounded():
+    p = NumericProfile()
+    rng = np.random.default_rng(1)
+    for i in range(20):
+        p.update(list(rng.normal(0, 1, 1000)))
+
+    assert len(p.histogram.bins) <= p.histogram.bin_count
+
+
+def test_merge_numeric_profiles():
+    a, b = NumericProfile(), NumericProfile()
+    a.update([1, 2, 3])
+    b.update([-5, None, 10])
+    a.merge(b)
+
+    assert (a.items, a.nulls, a.min, a.max) == (6, 1, -5, 10)
+    assert a.histogram.min == -5
+    assert a.histogram.max == 10
+    assert sum(f for _, f in a.histogram.bins) == 5
+    assert a.quantiles.n == 5
+    assert a.summary()["percentiles"][50] == 2
+
+
+def test_numeric_percentiles():
+    p = NumericProfile()
+    for i in range(10):
+        p.update(list(range(i * 1000, (i + 1) * 1000)))
+
+    percentiles = p.summary()["percentiles"]
+    assert list(percentiles) == [50, 95, 99]
+    assert percentiles[50] == approx(5000, rel=0.01)
+    assert percentiles[99] == approx(9900, rel=0.01)
+    assert NumericProfile().summary()["percentiles"] == {}
+
+
+def test_string_distinct_switches_to_estimate():
+    p = StringProfile()
+    p.update([f"v{i % 500}" for i in range(2000)])
+    assert p.unique_values == 500
+    assert p.unique_error == 0
+
+    p.update([f"w{i}" for i in range(50000)])
+    assert p.exact_hashes is None
+    assert p.unique_values == approx(50500, rel=3 * p.unique_error)
+    assert p.unique_error == p.distinct.error_rate
+
+
+def test_merge_string_profiles():
+    a, b = StringProfile(), StringProfile()
+    a.update(["x", "y"])
+    b.update(["y", "z", "   "])
+    a.merge(b)
+
+    assert (a.items, a.nulls, a.unique_values, a.unique_error) == (5, 1, 3, 0)
+
+    c = StringProfile()
+    c.update([str(i) for i in range(5000)])
+    a.merge(c)
+    assert a.exact_hashes is None
+    assert a.unique_values == approx(5003, rel=3 * a.unique_error)
+
+    whole = StringProfile()
+    whole.update(["x", "y", "z"] + [str(i) for i in range(5000)])
+    assert a.signature.jaccard(whole.signature) == 1
+
+
+def test_date_profile():
+    p = DateProfile()
+    p.update(["September 25, 2021", " ", None, "June 1, 2019", 1632528000])
+
+    assert (p.items, p.nulls) == (5, 2)
+    assert p.min == 1559347200
+    assert p.max == 1632528000
@@ -0,0 +1,54 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import datetime
+
+import pytest
+from dates import EPOCH, ISO, DateParser, infer_format, to_epoch
+
+
+def epoch(*args):
+    return int(datetime.datetime(*args, tzinfo=datetime.timezone.utc).timestamp())
+
+
+@pytest.mark.parametrize(
+    "sample, expected",
+    [
+        (["2021-09-25", "2020-01-01T10:30:00"], ISO),
+        (["1632528000", 1632528000], EPOCH),
+        (["September 25, 2021", "June 1, 2019", "2021-09-25"], "%B %d, %Y"),
+        (["25/12/2021", "01/02/2021"], "%d/%m/%Y"),
+        (["not a date"], None),
+    ],
+)
+def test_infer_format(sample, expected):
+    assert infer_format(sample) == expected
+
+
+def test_to_epoch():
+    assert to_epoch("September 25, 2021", "%B %d, %Y") == epoch(2021, 9, 25)
+    assert to_epoch(" 2021-09-25T10:00:00 ", ISO) == epoch(2021, 9, 25, 10)
+    assert to_epoch(1632528000) == epoch(2021, 9, 25)
+    # milliseconds are recognized by their size
+    assert to_epoch("1632528000000", EPOCH) == epoch(2021, 9, 25)
+    # values which don't fit the format fall back to dateutil
+    assert to_epoch("2021-09-25T10:00:00+01:00", ISO) == epoch(2021, 9, 25, 9)
+    assert to_epoch("25th of September 2021", "%B %d, %Y") == epoch(2021, 9, 25)
+
+
+def test_parser_converts_batches():
+    parser = DateParser()
+    epochs = parser.parse(["September 25, 2021", "June 1, 2019", "September 25, 2021"])
+
+    assert parser.format == "%B %d, %Y"
+    assert epochs.tolist() == [epoch(2021, 9, 25), epoch(2019, 6, 1), epoch(2021, 9, 25)]
+    # distinct values are converted once
+    assert len(parser.memo) == 2
+
+    parser = DateParser()
+    epochs = parser.parse(["2021-09-25", "2021-09-25 10:00", "2021-09-25T10:00:00.5"])
+    assert parser.format == ISO
+    assert epochs.tolist() == [epoch(2021, 9, 25)] + [epoch(2021, 9, 25, 10)] * 2
+    assert parser.parse([]).tolist() == []
@@ -0,0 +1,65 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import orjson
+from parallel import profile_parallel
+from profiler import Profiler
+from readers import iter_ranges, read_jsonl, read_jsonl_batches
+
+TYPES = {"name": "string", "kind": "enum", "value": "numeric"}
+
+
+def _write(path, count, offset=0):
+    with open(path, "wb") as f:
+        for i in range(count):
+            row = {"name": f"n{i + offset}", "kind": "xyz"[i % 3], "value": i + offset}
+            f.write(orjson.dumps(row) + b"\n")
+    return str(path)
+
+
+def test_ranges_are_newline_aligned(tmp_path):
+    filename = _write(tmp_path / "data.jsonl", 1000)
+
+    ranges = list(iter_ranges(filename, 7))
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == os.path.getsize(filename)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+
+    rows = [
+        row
+        for start, end in ranges
+        for batch in read_jsonl_batches(filename, 100, start=start, end=end, chunk_size=50)
+        for row in batch
+    ]
+    assert rows == list(read_jsonl(filename))
+
+
+def test_more_ranges_than_lines(tmp_path):
+    filename = _write(tmp_path / "data.jsonl", 2)
+
+    ranges = list(iter_ranges(filename, 10))
+    assert len(ranges) == 2
+
+
+def test_profile_parallel_matches_single_process(tmp_path):
+    filename = _write(tmp_path / "data.jsonl", 5000)
+
+    single = Profiler(TYPES).profile(read_jsonl(filename)).summary()
+    parallel = profile_parallel(TYPES, filename, workers=3, batch_size=100).summary()
+
+    for field in TYPES:
+        for key in ("items", "nulls", "min", "max", "mean", "unique_values"):
+            assert single[field].get(key) == parallel[field].get(key)
+    assert single["kind"]["top_values"] == parallel["kind"]["top_values"]
+    assert sum(parallel["value"]["bins"]) == 5000
+
+
+def test_profile_parallel_shards(tmp_path):
+    shards = [_write(tmp_path / f"{i}.jsonl", 100, offset=i * 100) for i in range(3)]
+
+    summary = profile_parallel(TYPES, shards, workers=2).summary()
+    assert summary["name"]["items"] == 300
+    assert summary["name"]["unique_values"] == 300
+    assert summary["value"]["max"] == 299
@@ -0,0 +1,34 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+from profiler import Profiler
+
+ROWS = [
+    {"name": "a", "kind": "x", "value": 1},
+    {"name": "b", "kind": "y", "value": 3},
+    {"name": "  ", "kind": "x"},
+]
+
+TYPES = {"name": "string", "kind": "enum", "value": "numeric", "other": "other"}
+
+
+def test_profile_in_batches():
+    summary = Profiler(TYPES).profile(iter(ROWS * 5), batch_size=4).summary()
+
+    assert summary["name"]["items"] == 15
+    assert summary["name"]["nulls"] == 5
+    assert summary["name"]["unique_values"] == 2
+    assert summary["kind"]["top_values"] == [("x", 10, 0), ("y", 5, 0)]
+    assert summary["value"]["mean"] == 2
+    assert summary["other"]["nulls"] == 15
+
+
+def test_report():
+    lines = list(Profiler(TYPES).profile(ROWS).report())
+
+    assert lines[0].startswith("[str] name ")
+    assert lines[1].startswith("[enm] kind ")
+    assert lines[2].startswith("[num] value ")
+    assert lines[3].startswith("[oth] other ")
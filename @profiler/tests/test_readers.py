@@ -0,0 +1,96 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import gzip
+import io
+
+import pytest
+from readers import iter_blocks, iter_ranges, read_jsonl, read_jsonl_batches
+
+LINES = '{"a": 1}\n{"a": 2}\n\n{"a": 3}\n'
+
+
+def test_read_jsonl_skips_blank_lines(tmp_path):
+    path = tmp_path / "data.jsonl"
+    path.write_text(LINES)
+
+    assert list(read_jsonl(str(path))) == [{"a": 1}, {"a": 2}, {"a": 3}]
+    assert list(read_jsonl(str(path), limit=2)) == [{"a": 1}, {"a": 2}]
+
+
+def test_read_jsonl_from_stdin(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO(LINES))
+
+    assert list(read_jsonl("-", chunk_size=3)) == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+
+def test_stdin_cant_be_read_in_ranges(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO(LINES))
+
+    for start, end in ((0, 10), (1, None)):
+        with pytest.raises(ValueError):
+            list(read_jsonl_batches("-", start=start, end=end))
+
+
+def test_read_jsonl_is_lazy():
+    stream = io.StringIO(LINES)
+    rows = read_jsonl(stream, chunk_size=9)
+
+    assert next(rows) == {"a": 1}
+    assert stream.tell() < len(LINES)
+
+
+def test_read_jsonl_batches(tmp_path):
+    path = tmp_path / "data.jsonl"
+    path.write_text("".join(f'{{"a": {i}}}\n' for i in range(25)))
+
+    batches = list(read_jsonl_batches(str(path), batch_size=10, chunk_size=16))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert [row["a"] for batch in batches for row in batch] == list(range(25))
+
+
+def test_read_jsonl_bytes_edge_cases(tmp_path):
+    path = tmp_path / "data.jsonl"
+    # whitespace only lines, crlf line ends, a line longer than the chunk and
+    # no newline at the end of the file
+    path.write_bytes(b'{"a": 1}\r\n  \n{"a": "' + b"x" * 100 + b'"}\n{"a": "\xc3\xa9"}')
+
+    rows = list(read_jsonl(str(path), chunk_size=8))
+    assert rows == [{"a": 1}, {"a": "x" * 100}, {"a": "\u00e9"}]
+
+
+def test_read_compressed(tmp_path):
+    path = tmp_path / "data.jsonl.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(LINES.encode())
+
+    assert list(read_jsonl(str(path), chunk_size=4)) == [{"a": 1}, {"a": 2}, {"a": 3}]
+    # compressed files can't be split
+    assert list(iter_ranges(str(path), 4)) == [(0, path.stat().st_size)]
+    with pytest.raises(ValueError):
+        list(read_jsonl_batches(str(path), start=1))
+    with pytest.raises(ValueError):
+        list(iter_blocks(str(path), 4, [0]))
+
+    zstandard = pytest.importorskip("zstandard")
+    path = tmp_path / "data.jsonl.zst"
+    path.write_bytes(zstandard.ZstdCompressor().compress(LINES.encode()))
+
+    assert list(read_jsonl(str(path))) == [{"a": 1}, {"a": 2}, {"a": 3}]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 9, 10, 64])
+def test_blocks_cover_every_line_once(tmp_path, block_size):
+    path = tmp_path / "data.jsonl"
+    path.write_text('{"a": 1}\n{"a": 22}\n\n{"a": 333}\n{"a": 4}')
+    blocks = -(-path.stat().st_size // block_size)
+
+    ranges = list(iter_blocks(str(path), block_size, reversed(range(blocks))))
+    assert [block for block, _, _ in ranges] == list(reversed(range(blocks)))
+    rows = []
+    for _, start, end in sorted(ranges):
+        for batch in read_jsonl_batches(str(path), start=start, end=end):
+            rows.extend(batch)
+    assert rows == [{"a": 1}, {"a": 22}, {"a": 333}, {"a": 4}]
@@ -0,0 +1,131 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import gzip
+
+import numpy
+import orjson
+import pytest
+from profiler import Profiler
+from readers import read_jsonl_batches
+import sampling
+from sampling import Sample, profile_sample
+
+TYPES = {"n": "numeric", "d": "date", "s": "string", "k": "string", "e": "enum"}
+
+
+def write_rows(path, count, seed=1):
+    rng = numpy.random.default_rng(seed)
+    numbers = rng.normal(10, 2, count)
+    with open(path, "wb") as f:
+        for i in range(count):
+            row = {
+                "n": None if rng.random() < 0.1 else float(numbers[i]),
+                "d": f"2021-01-{int(rng.integers(1, 29)):02}",
+                "s": f"id{i}",
+                "k": f"k{int(rng.integers(0, 20))}",
+                "e": f"e{i % 3}",
+            }
+            f.write(orjson.dumps(row) + b"\n")
+    return str(path)
+
+
+def test_every_block_is_the_whole_file(tmp_path):
+    path = write_rows(tmp_path / "data.jsonl", 2000)
+    whole = Profiler(TYPES).profile_batches(read_jsonl_batches(path))
+
+    # a tolerance of zero is never met, so every block is read
+    sample = profile_sample(TYPES, path, tolerance=0, block_size=4096)
+    summary = sample.summary()
+    assert summary["sampled"] == summary["blocks"] == -(-os.path.getsize(path) // 4096)
+    assert summary["converged"]
+    assert summary["rows"] == (2000, 2000, 2000)
+
+    bounds = summary["bounds"]
+    assert bounds["n"]["nulls"][0] == whole.columns["n"].nulls / 2000
+    for name in ("nulls", "mean", "p50"):
+        estimate, lower, upper = bounds["n"][name]
+        assert lower == estimate == upper
+    assert bounds["n"]["mean"][0] == pytest.approx(whole.columns["n"].mean)
+    assert bounds["s"]["unique"] == (2000, 2000, 2000)
+    assert bounds["k"]["unique"] == (20, 20, 20)
+    assert "mean" not in bounds["d"] and "p50" in bounds["d"]
+    assert set(bounds["e"]) == {"nulls"}
+    for field in TYPES:
+        assert sample.profiler.columns[field].items == 2000
+
+
+def test_sampling_stops_early_within_bounds(tmp_path):
+    path = write_rows(tmp_path / "data.jsonl", 50000)
+    whole = Profiler(TYPES).profile_batches(read_jsonl_batches(path))
+    numbers = whole.columns["n"]
+
+    sample = Sample(TYPES, path, confidence=0.999, tolerance=0.05, block_size=8192, seed=3).run()
+    summary = sample.summary()
+    assert summary["converged"]
+    assert summary["sampled"] < summary["blocks"] / 4
+
+    bounds = summary["bounds"]
+    rows, lower, upper = summary["rows"]
+    assert lower <= 50000 <= upper
+    _, lower, upper = bounds["n"]["nulls"]
+    assert lower <= numbers.nulls / numbers.items <= upper
+    _, lower, upper = bounds["n"]["mean"]
+    assert lower <= numbers.mean <= upper
+    _, lower, upper = bounds["n"]["p50"]
+    assert lower <= numbers.quantiles.percentile(50) <= upper
+
+    # every value of k has been seen, the values of s are each seen once so the
+    # estimate is at GEE's upper bound, the interval is of the share of rows read
+    assert bounds["k"]["unique"] == (20, 20, 20)
+    estimate, lower, upper = bounds["s"]["unique"]
+    assert lower < estimate < upper
+    assert lower <= 50000 <= upper
+    assert estimate == pytest.approx(50000, rel=0.05)
+    assert (upper - lower) / 2 == pytest.approx(summary["rows"][2] - rows, rel=0.01)
+
+
+def test_loose_tolerance_stops_early(tmp_path):
+    path = write_rows(tmp_path / "data.jsonl", 20000)
+
+    sample = Sample(TYPES, path, tolerance=0.2, block_size=4096, seed=1).run()
+    summary = sample.summary()
+    assert summary["converged"]
+    assert summary["blocks"] > 300
+    assert summary["sampled"] < sampling.MIN_BLOCKS
+
+
+def test_distinct_counts_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(sampling, "DISTINCT_SAMPLE_SIZE", 1000)
+    path = write_rows(tmp_path / "data.jsonl", 20000)
+
+    sample = profile_sample(TYPES, path, tolerance=0, block_size=65536)
+    column = sample.columns["s"]
+    assert len(column.counts) <= 1000
+    assert column.threshold < 2**64 - 1
+    estimate, lower, upper = column.distinct()
+    assert estimate == lower == upper == pytest.approx(20000, rel=0.1)
+    # k has fewer values than are counted, so they're all counted exactly
+    assert sample.columns["k"].distinct() == (20, 20, 20)
+
+
+def test_report_includes_bounds(tmp_path):
+    path = write_rows(tmp_path / "data.jsonl", 500)
+    lines = list(profile_sample(TYPES, path, block_size=4096, max_blocks=3).report())
+
+    assert lines[len(TYPES)].startswith("[smp] 3 of")
+    assert lines[len(TYPES)].endswith("(not converged)")
+    assert [line.split()[1] for line in lines[len(TYPES) + 1 :]] == list(TYPES)
+    assert "[unique]" in lines[-2] and "[p50]" in lines[len(TYPES) + 1]
+    assert lines[-2].endswith("no confidence)")
+
+
+def test_compressed_files_cant_be_sampled(tmp_path):
+    path = tmp_path / "data.jsonl.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(b'{"n": 1}\n')
+
+    with pytest.raises(ValueError):
+        Sample(TYPES, str(path))
@@ -0,0 +1,119 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import orjson
+import pytest
+from profiler import Profiler
+from readers import complete_lines_end, iter_ranges, read_jsonl_batches
+import state
+
+TYPES = {"n": "numeric", "d": "date", "s": "string", "e": "enum", "o": "other"}
+
+
+def rows(start, end):
+    return [
+        {"n": i, "d": f"2021-01-{i % 28 + 1:02}", "s": f"s{i % 50}", "e": f"e{i % 3}", "o": i}
+        for i in range(start, end)
+    ]
+
+
+def write(filename, rows, mode="wb"):
+    with open(filename, mode) as f:
+        f.write(b"".join(orjson.dumps(row) + b"\n" for row in rows))
+
+
+def test_round_trip():
+    profiler = Profiler(TYPES).profile(rows(0, 1000) + [{"n": None}])
+    loaded, source = state.loads(state.dumps(profiler, {"offset": 7}))
+
+    assert source == {"offset": 7}
+    assert loaded.summary() == profiler.summary()
+
+
+def test_round_trip_with_estimated_distinct():
+    profiler = Profiler({"s": "string"}).profile({"s": str(i)} for i in range(20000))
+    loaded, _ = state.loads(state.dumps(profiler, {}))
+
+    assert loaded.columns["s"].exact_hashes is None
+    assert loaded.columns["s"].signature.jaccard(profiler.columns["s"].signature) == 1
+    assert loaded.summary() == profiler.summary()
+
+
+def test_resume_profiles_appended_lines(tmp_path):
+    data, saved = str(tmp_path / "data.jsonl"), str(tmp_path / "profile.cryno")
+    write(data, rows(0, 500))
+
+    profiler, offset = state.resume(saved, data, TYPES)
+    assert offset == 0
+    end = complete_lines_end(data)
+    profiler.profile_batches(read_jsonl_batches(data, start=offset, end=end))
+    state.save(saved, profiler, state.file_identity(data, end))
+
+    write(data, rows(500, 800), "ab")
+    with open(data, "ab") as f:
+        f.write(b'{"n": 1')  # still being written
+
+    profiler, offset = state.resume(saved, data, TYPES)
+    assert offset == end
+    end = complete_lines_end(data, offset)
+    profiler.profile_batches(read_jsonl_batches(data, start=offset, end=end))
+
+    assert profiler.summary() == Profiler(TYPES).profile(rows(0, 800)).summary()
+
+
+def test_resume_starts_over(tmp_path):
+    data, saved = str(tmp_path / "data.jsonl"), str(tmp_path / "profile.cryno")
+    write(data, rows(0, 100))
+    profiler = Profiler(TYPES).profile(rows(0, 100))
+    state.save(saved, profiler, state.file_identity(data, os.path.getsize(data)))
+
+    assert state.resume(saved, data, TYPES)[1] == os.path.getsize(data)
+    # the types have changed
+    assert state.resume(saved, data, {**TYPES, "n": "string"})[1] == 0
+    # the file has been rewritten
+    write(data, rows(1, 101))
+    fresh, offset = state.resume(saved, data, TYPES)
+    assert offset == 0
+    assert fresh.columns["n"].items == 0
+    # the file has been truncated
+    write(data, rows(0, 10))
+    assert state.resume(saved, data, TYPES)[1] == 0
+    # the profile was saved by another version
+    write(data, rows(0, 100))
+    with open(saved, "r+b") as f:
+        f.write(state.HEADER.pack(state.MAGIC, state.VERSION - 1, 0)[:7])
+    assert state.resume(saved, data, TYPES)[1] == 0
+
+
+def test_loads_rejects_other_data():
+    data = state.dumps(Profiler(TYPES), {})
+    with pytest.raises(ValueError):
+        state.loads(b"NOTIT" + data[5:])
+    with pytest.raises(ValueError):
+        state.loads(state.HEADER.pack(state.MAGIC, state.VERSION + 1, 0))
+
+
+def test_ranges_within_offsets(tmp_path):
+    filename = tmp_path / "data.jsonl"
+    filename.write_bytes(b"a\nbb\nccc\ndddd\n")
+
+    assert complete_lines_end(filename) == 14
+    assert complete_lines_end(filename, 14) == 14
+    filename.write_bytes(b"a\nbb\nccc\ndddd\nee")
+    assert complete_lines_end(filename) == 14
+    assert complete_lines_end(filename, 15) == 15
+
+    ranges = list(iter_ranges(filename, 3, start=2, end=14))
+    assert ranges[0][0] == 2 and ranges[-1][1] == 14
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_ranges_are_even(tmp_path):
+    filename = tmp_path / "data.jsonl"
+    filename.write_bytes(b"".join(b'{"a": %d}\n' % (i % 10) for i in range(10000)))
+
+    sizes = [end - start for start, end in iter_ranges(filename, 10, start=10000)]
+    assert len(sizes) == 10
+    assert max(sizes) - min(sizes) < 20
@@ -0,0 +1,138 @@
+"""
+Adapters
+
+The vendored sketches keep their upstream APIs (HyperLogLog counts with `card`,
+Distogram is a set of functions over a histogram, TDigest adds with `update` and
+`batch_update`); these adapters present each of them as a BaseSketch.
+
+    hll = HyperLogLogSketch(error_rate=0.01)
+    hll.bulk_add(values)
+    hll.result()  # estimated distinct values
+"""
+import sys
+
+import numpy
+
+import vendored  # noqa: F401 - makes the vendored sketches importable
+from base_sketch import BaseSketch
+
+import distogram  # noqa: E402
+from hyperloglog import HyperLogLog  # noqa: E402
+from tdigest import TDigest  # noqa: E402
+
+
+class HyperLogLogSketch(BaseSketch):
+    """
+    Estimates the number of distinct values
+    """
+
+    __slots__ = ("sketch",)
+
+    def __init__(self, error_rate: float = 0.05):
+        self.sketch = HyperLogLog(error_rate)
+
+    def add(self, val):
+        self.sketch.add(val)
+
+    def bulk_add(self, vals):
+        self.sketch.add_many(vals)
+
+    def result(self) -> float:
+        return self.sketch.card()
+
+    def merge(self, other: "HyperLogLogSketch"):
+        self.sketch.update(other.sketch)
+        return self
+
+    def to_bytes(self) -> bytes:
+        return self.sketch.to_bytes()
+
+    @classmethod
+    def from_bytes(cls, data) -> "HyperLogLogSketch":
+        adapter = cls.__new__(cls)
+        adapter.sketch = HyperLogLog.from_bytes(data)
+        return adapter
+
+    def memory_usage(self) -> int:
+        return len(self.sketch.M)
+
+
+class DistogramSketch(BaseSketch):
+    """
+    Estimates quantiles of numbers from a histogram of bin_count bins
+    """
+
+    __slots__ = ("sketch",)
+
+    def __init__(self, bin_count: int = 100):
+        self.sketch = distogram.NumpyDistogram(bin_count)
+
+    def add(self, val: float):
+        self.sketch = distogram.update(self.sketch, val)
+
+    def bulk_add(self, vals):
+        self.sketch = distogram.bulk_update(self.sketch, numpy.asarray(vals, dtype=numpy.float64))
+
+    def result(self, q: float = 0.5):
+        """
+        The estimated value at quantile q (0 to 1)
+        """
+        return distogram.quantile(self.sketch, q)
+
+    def merge(self, other: "DistogramSketch"):
+        self.sketch = distogram.merge(self.sketch, other.sketch)
+        return self
+
+    def to_bytes(self) -> bytes:
+        return distogram.to_bytes(self.sketch)
+
+    @classmethod
+    def from_bytes(cls, data) -> "DistogramSketch":
+        adapter = cls.__new__(cls)
+        adapter.sketch = distogram.from_bytes(data)
+        return adapter
+
+    def memory_usage(self) -> int:
+        return self.sketch.values.nbytes + self.sketch.counts.nbytes
+
+
+class TDigestSketch(BaseSketch):
+    """
+    Estimates quantiles of numbers, most accurately near the tails
+    """
+
+    __slots__ = ("sketch",)
+
+    def __init__(self, delta: float = 0.01, K: int = 25):
+        self.sketch = TDigest(delta, K)
+
+    def add(self, val: float):
+        self.sketch.update(val)
+
+    def bulk_add(self, vals):
+        self.sketch.batch_update(vals)
+
+    def result(self, q: float = 0.5):
+        """
+        The estimated value at quantile q (0 to 1)
+        """
+        return self.sketch.percentile(q * 100)
+
+    def merge(self, other: "TDigestSketch"):
+        self.sketch.merge(other.sketch)
+        return self
+
+    def to_bytes(self) -> bytes:
+        return self.sketch.to_bytes()
+
+    @classmethod
+    def from_bytes(cls, data) -> "TDigestSketch":
+        adapter = cls.__new__(cls)
+        adapter.sketch = TDigest.from_bytes(data)
+        return adapter
+
+    def memory_usage(self) -> int:
+        digest = self.sketch
+        # values added one at a time are buffered as (value, weight) tuples
+        buffered = sys.getsizeof(digest._buffer) + len(digest._buffer) * sys.getsizeof((0.0, 1))
+        return digest._means.nbytes + digest._counts.nbytes + buffered
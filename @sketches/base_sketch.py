@@ -1,16 +1,64 @@
+"""
+Base Sketch
+
+The interface shared by the sketches, so they can be benchmarked against each
+other and swapped for each other without knowing which sketch is which.
+
+The vendored sketches (HyperLogLog, Distogram and TDigest) keep their own APIs,
+adapters.py presents them with this interface.
+"""
 import abc
 from typing import Any, Iterable
 
 
 class BaseSketch(abc.ABC):
-    def __init__(self):
-        pass
 
+    __slots__ = ()
+
+    @abc.abstractmethod
     def add(self, val: Any, **kwargs):
-        pass
+        """
+        Add a value to the sketch
+        """
 
     def bulk_add(self, vals: Iterable, **kwargs):
-        pass
+        """
+        Add a batch of values to the sketch, sketches override this with an
+        update of the whole batch at once
+        """
+        for val in vals:
+            self.add(val, **kwargs)
 
+    @abc.abstractmethod
     def result(self, **kwargs):
-        pass
+        """
+        The answer the sketch gives, e.g. a count of distinct values, the most
+        frequent values or a quantile
+        """
+
+    @abc.abstractmethod
+    def merge(self, other: "BaseSketch") -> "BaseSketch":
+        """
+        Fold a sketch of the same type and parameters into this one, returns
+        this sketch
+        """
+
+    @abc.abstractmethod
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the sketch, from_bytes deserializes it
+        """
+
+    @classmethod
+    @abc.abstractmethod
+    def from_bytes(cls, data) -> "BaseSketch":
+        """
+        Deserialize a sketch created with to_bytes
+        """
+
+    def memory_usage(self) -> int:
+        """
+        The approximate number of bytes the state of the sketch takes, by default
+        the size of the serialized sketch
+        """
+        return len(self.to_bytes())
@@ -24,24 +24,26 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import math
+import struct
+
+import numpy
 from bitarray import bitarray  # type:ignore
+from cityhash import CityHash64
+
+from base_sketch import BaseSketch
+
+# filter size and hash count, ahead of the bits in the serialized filter
+HEADER = struct.Struct("<QI")
 
-HASH_SEEDS = [
-    "ANTHROPOMORPHISM",
-    "BLOODYMINDEDNESS",
-    "CONTEMPTUOUSNESS",
-    "DISINGENUOUSNESS",
-    "INCOMPREHENSIBLE",
-    "NONRECIPROCATING",
-    "PRESUMPTUOUSNESS",
-    "UNCOMPREHENSIBLE",
-    "DISFRANCHISEMENT",
-    "UNDIPLOMATICALLY",
-    "UNUNDERSTANDABLY",
-]
 
+def _probe_pair(term):
+    # one 64 bit hash is split into the two hashes the probes are derived from
+    h = CityHash64(str(term))
+    return h & 0xFFFFFFFF, h >> 32
 
-class BloomFilter:
+
+class BloomFilter(BaseSketch):
 
     __slots__ = ("filter_size", "hash_count", "bits")
 
@@ -57,6 +59,10 @@ class BloomFilter:
         This is used in the profiler to track unique string values without
         having to store the values or hashes of the values (minor errors
         with this count is not expected to be a problem)
+
+        Each term is hashed once, the hash_count probe positions are derived
+        from the two halves of that hash by double hashing (Kirsch and
+        Mitzenmacher, Less Hashing, Same Performance).
         """
         self.filter_size = BloomFilter.get_size(number_of_elements, fp_rate)
         self.hash_count = BloomFilter.get_hash_count(
@@ -107,30 +113,133 @@ class BloomFilter:
         k = (filter_size / number_of_elements) * BloomFilter._log(2)
         return max(int(k), 2)
 
+    def _probes(self, term):
+        h1, h2 = _probe_pair(term)
+        return [(h1 + i * h2) % self.filter_size for i in range(self.hash_count)]
+
+    def _probes_many(self, terms):
+        """
+        The probe positions for a batch of terms, one row per term
+        """
+        hashes = numpy.fromiter(map(CityHash64, map(str, terms)), dtype=numpy.uint64)
+        h1 = hashes & numpy.uint64(0xFFFFFFFF)
+        h2 = hashes >> numpy.uint64(32)
+        i = numpy.arange(self.hash_count, dtype=numpy.uint64)
+        return (h1[:, None] + i * h2[:, None]) % numpy.uint64(self.filter_size)
+
+    def _bytes(self):
+        # the bits as bytes, bitarray is big-endian so bit n is (7 - n % 8) in byte n // 8
+        return numpy.frombuffer(self.bits, dtype=numpy.uint8)
+
     def add(self, term):
         """
         Add a value to the index, returns true if the item is new, false if seen before
         """
-        from cityhash import CityHash32
-
         collision = True
 
-        for i in range(self.hash_count):
-            h = CityHash32(f"{HASH_SEEDS[i]}{term}") % self.filter_size
+        for h in self._probes(term):
             if not self.bits[h]:
                 self.bits[h] = 1
                 collision = False
 
         return not collision
 
-    def __contains__(self, term):
-        from cityhash import CityHash32
+    def add_many(self, terms):
+        """
+        Add a batch of values to the index, the probe positions for the whole
+        batch are calculated and set at once
+        """
+        probes = self._probes_many(terms).ravel()
+        numpy.bitwise_or.at(
+            self._bytes(),
+            (probes >> numpy.uint64(3)).astype(numpy.intp),
+            (numpy.uint8(0x80) >> (probes & numpy.uint64(7)).astype(numpy.uint8)),
+        )
+
+    bulk_add = add_many
 
-        for i in range(self.hash_count):
-            h = CityHash32(f"{HASH_SEEDS[i]}{term}") % self.filter_size
+    def __contains__(self, term):
+        for h in self._probes(term):
             if self.bits[h] == 0:
                 return False
         return True
 
+    def contains_many(self, terms):
+        """
+        Test a batch of values, returns a boolean array which is true where the
+        value may have been added and false where it has certainly not
+        """
+        probes = self._probes_many(terms)
+        bits = self._bytes()[(probes >> numpy.uint64(3)).astype(numpy.intp)]
+        bits = (bits << (probes & numpy.uint64(7)).astype(numpy.uint8)) & numpy.uint8(0x80)
+        return bits.all(axis=1)
+
+    def _check_compatible(self, other):
+        if (self.filter_size, self.hash_count) != (other.filter_size, other.hash_count):
+            raise ValueError("Bloom Filters must have the same size and hash count")
+
+    def union(self, other):
+        """
+        A filter containing the values of both filters
+        """
+        self._check_compatible(other)
+        return BloomFilter._from_bits(self.filter_size, self.hash_count, self.bits | other.bits)
+
+    def intersection(self, other):
+        """
+        A filter containing the values in both filters, values may test as
+        present which were not in both filters more often than in either filter
+        """
+        self._check_compatible(other)
+        return BloomFilter._from_bits(self.filter_size, self.hash_count, self.bits & other.bits)
+
+    __or__ = union
+    __and__ = intersection
+
+    def merge(self, other):
+        """
+        Add the values of another filter to this one
+        """
+        self._check_compatible(other)
+        self.bits |= other.bits
+        return self
+
+    def result(self):
+        """
+        Estimate the number of distinct values added from the number of bits set
+        (Swamidass and Baldi)
+        """
+        bits_set = min(self.bits.count(), self.filter_size - 1)
+        return -self.filter_size / self.hash_count * math.log1p(-bits_set / self.filter_size)
+
+    def memory_usage(self):
+        return self.bits.nbytes
+
+    @classmethod
+    def _from_bits(cls, filter_size, hash_count, bits):
+        bloom_filter = cls.__new__(cls)
+        bloom_filter.filter_size = filter_size
+        bloom_filter.hash_count = hash_count
+        bloom_filter.bits = bits
+        return bloom_filter
+
+    def to_bytes(self):
+        """
+        Serialize the filter, its size and hash count followed by the bits
+        """
+        return HEADER.pack(self.filter_size, self.hash_count) + self.bits.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Deserialize a filter created with to_bytes
+        """
+        filter_size, hash_count = HEADER.unpack_from(data)
+        bits = bitarray()
+        bits.frombytes(bytes(data[HEADER.size :]))
+        if len(bits) < filter_size:
+            raise ValueError("Data is not a serialized BloomFilter")
+        return cls._from_bits(filter_size, hash_count, bits[:filter_size])
+
     def __repr__(self):  # pragma: no cover
         return f"BloomFilter <bits:{self.filter_size}, hashes:{self.hash_count}>"
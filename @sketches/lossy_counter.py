@@ -11,12 +11,17 @@ This entirely new code but is based on LossyCounter by Manku and Motwani.
 This works by dividing a bag into buckets, the number of times each item appears
 in each bucket is used to removed rare items (items which have only appeared once)
 """
-from typing import Any, Dict, List
+import heapq
+from typing import Any, Dict, Iterable, List
+
+import orjson
+
+from base_sketch import BaseSketch
 
 TRACKED_ITEM_COUNT = 100
 
 
-class LossyCounter:
+class LossyCounter(BaseSketch):
     def __init__(self, items: int = TRACKED_ITEM_COUNT):
         self.max_items = items
         self.tracked_items: Dict[Any, int] = {}
@@ -33,6 +38,21 @@ class LossyCounter:
             self.bucket.append(str(item))
             self.empty_bucket()
 
+    def bulk_add(self, items: Iterable):
+        """
+        Add a batch of items, the bucket is filled a slice at a time rather than
+        an item at a time
+        """
+        items = list(map(str, items))
+        position = 0
+        while position < len(items):
+            # as with add, a bucket is emptied when it's one over max_items
+            space = self.max_items + 1 - len(self.bucket)
+            self.bucket.extend(items[position : position + space])
+            position += space
+            if len(self.bucket) > self.max_items:
+                self.empty_bucket()
+
     def empty_bucket(self):
 
         for i in self.bucket:
@@ -57,3 +77,34 @@ class LossyCounter:
         if self.tracked_items:
             return max(self.tracked_items, key=self.tracked_items.get)
         return None
+
+    def result(self):
+        return self.most_frequent()
+
+    def merge(self, other: "LossyCounter"):
+        """
+        Fold another counter into this one, the frequencies of the items tracked
+        by either are summed and the most frequent max_items are kept
+        """
+        self.bucket.extend(other.bucket)
+        tracked = dict(self.tracked_items)
+        for item, frequency in other.tracked_items.items():
+            tracked[item] = tracked.get(item, 0) + frequency
+        kept = heapq.nlargest(self.max_items, tracked, key=tracked.get)
+        self.tracked_items = {item: tracked[item] for item in kept}
+        if len(self.bucket) > self.max_items:
+            self.empty_bucket()
+        return self
+
+    def to_bytes(self) -> bytes:
+        return orjson.dumps(
+            {"max_items": self.max_items, "tracked": self.tracked_items, "bucket": self.bucket}
+        )
+
+    @classmethod
+    def from_bytes(cls, data) -> "LossyCounter":
+        state = orjson.loads(bytes(data))
+        counter = cls(state["max_items"])
+        counter.tracked_items = state["tracked"]
+        counter.bucket = state["bucket"]
+        return counter
@@ -0,0 +1,153 @@
+"""
+MinHash
+
+A fixed size signature of a set of values from which the Jaccard similarity of
+two sets (|A ∩ B| / |A ∪ B|) can be estimated - the chance that two sets have the
+same minimum hash under a random hash function is their Jaccard similarity, so
+the fraction of the signature's minimums two sets share estimates it.
+
+https://en.wikipedia.org/wiki/MinHash
+
+Rather than `size` hash functions, each value is hashed once (with CityHash64, as
+the rest of the sketches do, then mixed with a seed) and the hash both picks one
+of `size` bins and is the value whose minimum the bin keeps - one permutation
+hashing (Li, Owen and Zhang), which costs one hash per value rather than `size`.
+Bins no value fell in are filled from the next bin which isn't empty when
+signatures are compared (Shrivastava and Li, Densifying One Permutation Hashing).
+
+Signatures of the same size and seed can be merged (the minimum of each) and
+compared wherever they were created.
+"""
+import math
+import struct
+
+import numpy
+from cityhash import CityHash64
+
+from base_sketch import BaseSketch
+
+SIGNATURE_SIZE = 128
+SEED = 0x5EED
+# added to the minimum a bin is filled from for each bin it's away from it, so
+# filled bins only match filled bins filled from as far away
+FILL_OFFSET = numpy.uint64(0x9E3779B97F4A7C15)
+EMPTY = numpy.iinfo(numpy.uint64).max
+# signature size and seed
+HEADER = struct.Struct("<IQ")
+
+
+def _mix(x: numpy.ndarray) -> numpy.ndarray:
+    # the SplitMix64 finalizer, each bit of the input affects every bit of the output
+    x = x ^ (x >> numpy.uint64(30))
+    x = x * numpy.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> numpy.uint64(27))
+    x = x * numpy.uint64(0x94D049BB133111EB)
+    return x ^ (x >> numpy.uint64(31))
+
+
+class MinHash(BaseSketch):
+
+    __slots__ = ("seed", "minimums")
+
+    def __init__(self, size: int = SIGNATURE_SIZE, seed: int = SEED):
+        """
+        Parameters:
+            size: integer (optional)
+                The number of minimums in the signature, the standard error of
+                the similarity estimate is about 1 / sqrt(size)
+            seed: integer (optional)
+                Signatures can only be compared with signatures of the same seed
+        """
+        self.seed = seed
+        self.minimums = numpy.full(size, EMPTY, dtype=numpy.uint64)
+
+    @property
+    def size(self) -> int:
+        return self.minimums.size
+
+    def add(self, val):
+        self.add_hashes(numpy.array([CityHash64(str(val))], dtype=numpy.uint64))
+
+    def bulk_add(self, vals):
+        self.add_hashes(numpy.fromiter(map(CityHash64, map(str, vals)), dtype=numpy.uint64))
+
+    def add_hashes(self, hashes: numpy.ndarray):
+        """
+        Add a batch of values which have already been hashed (as uint64)
+        """
+        with numpy.errstate(over="ignore"):
+            mixed = _mix(hashes.astype(numpy.uint64, copy=False) ^ numpy.uint64(self.seed))
+        size = numpy.uint64(self.size)
+        numpy.minimum.at(self.minimums, (mixed % size).astype(numpy.intp), mixed // size)
+
+    def signature(self) -> numpy.ndarray:
+        """
+        The minimums, with the empty bins filled from the next bin to their right
+        (wrapping around) which isn't empty
+        """
+        filled = numpy.flatnonzero(self.minimums != EMPTY)
+        if filled.size in (0, self.size):
+            return self.minimums.copy()
+        bins = numpy.arange(self.size)
+        nearest = numpy.searchsorted(filled, bins) % filled.size
+        source = filled[nearest]
+        distance = ((source - bins) % self.size).astype(numpy.uint64)
+        with numpy.errstate(over="ignore"):
+            return self.minimums[source] + distance * FILL_OFFSET
+
+    def _check_compatible(self, other: "MinHash"):
+        if (self.size, self.seed) != (other.size, other.seed):
+            raise ValueError("MinHash signatures must have the same size and seed")
+
+    def jaccard(self, other: "MinHash") -> float:
+        """
+        Estimate the Jaccard similarity of the sets the signatures are of
+        """
+        self._check_compatible(other)
+        if self.is_empty() or other.is_empty():
+            return 0.0
+        return float(numpy.mean(self.signature() == other.signature()))
+
+    def is_empty(self) -> bool:
+        return bool((self.minimums == EMPTY).all())
+
+    def cardinality(self) -> float:
+        """
+        Estimate the number of distinct values added; from the number of empty
+        bins while there are some (linear counting), otherwise from how small
+        the minimums are (each is the minimum of about n / size uniform values)
+        """
+        empty = int((self.minimums == EMPTY).sum())
+        if empty:
+            return self.size * math.log(self.size / empty)
+        fractions = self.minimums / (float(EMPTY) / self.size)
+        return self.size * (self.size - 1) / float(fractions.sum())
+
+    def result(self) -> numpy.ndarray:
+        return self.signature()
+
+    def merge(self, other: "MinHash"):
+        """
+        The signature of the union of the sets
+        """
+        self._check_compatible(other)
+        numpy.minimum(self.minimums, other.minimums, out=self.minimums)
+        return self
+
+    def to_bytes(self) -> bytes:
+        return HEADER.pack(self.size, self.seed) + self.minimums.astype("<u8").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data) -> "MinHash":
+        size, seed = HEADER.unpack_from(data)
+        if len(data) != HEADER.size + 8 * size:
+            raise ValueError("Data is not a serialized MinHash")
+        signature = cls(size, seed)
+        signature.minimums = numpy.frombuffer(data, "<u8", size, HEADER.size).astype(numpy.uint64)
+        return signature
+
+    def memory_usage(self) -> int:
+        return self.minimums.nbytes
+
+    def __repr__(self):  # pragma: no cover
+        return f"MinHash <size:{self.size}, seed:{self.seed}>"
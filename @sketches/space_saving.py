@@ -0,0 +1,197 @@
+"""
+Space Saving
+
+Find the most frequent items in an infinite (i.e. larger than will fit in memory)
+dataset.
+
+This is a probabilistic algorithm, it saves memory and/or time to give you an
+approximation of the correct answer. It doesn't claim to be 100% correct 100% of the
+time.
+
+This is the Space-Saving algorithm by Metwally, Agrawal and El Abbadi; a fixed
+number of items are tracked, when a new item arrives and the tracked set is full,
+the least frequent item is replaced and the new item inherits its count as its
+error. Counts are never underestimated, and are overestimated by at most the
+recorded error, which is never more than total / capacity.
+
+https://www.cs.ucsb.edu/sites/default/files/documents/2005-23.pdf
+
+Summaries can be merged (Agarwal et al, Mergeable Summaries), add_many uses this
+to add a batch as a summary of its own.
+"""
+import heapq
+import struct
+import sys
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Tuple, Union
+
+import numpy
+import orjson
+
+from base_sketch import BaseSketch
+
+TRACKED_ITEM_COUNT = 100
+# capacity, total and number of items tracked
+HEADER = struct.Struct("<IQI")
+
+
+class SpaceSaving(BaseSketch):
+
+    __slots__ = ("capacity", "counts", "errors", "total", "_heap", "_sequence")
+
+    def __init__(self, capacity: int = TRACKED_ITEM_COUNT):
+        if capacity < 1:
+            raise ValueError("capacity must be at least one")
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+        self.errors: Dict[Any, int] = {}
+        self.total = 0
+        # (count, sequence, item), entries go stale as counts increase and are
+        # refreshed when they reach the top of the heap
+        self._heap: List[Tuple[int, int, Any]] = []
+        self._sequence = 0
+
+    def _push(self, item):
+        self._sequence += 1
+        heapq.heappush(self._heap, (self.counts[item], self._sequence, item))
+
+    def _pop_minimum(self):
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self.counts[item] == count:
+                return item
+            self._push(item)
+
+    def add(self, item, count: int = 1):
+        """
+        Add an item, this is O(log capacity)
+        """
+        if count <= 0:
+            raise ValueError("count must be strictly positive")
+        self.total += count
+
+        if item in self.counts:
+            self.counts[item] += count
+            return
+
+        error = 0
+        if len(self.counts) >= self.capacity:
+            evicted = self._pop_minimum()
+            error = self.counts.pop(evicted)
+            self.errors.pop(evicted)
+
+        self.counts[item] = error + count
+        self.errors[item] = error
+        self._push(item)
+
+    def add_many(self, items: Union[Iterable, Mapping[Any, int]]):
+        """
+        Add a batch of items (or a mapping of items to their counts), the batch
+        is counted exactly and merged in as a summary of its own
+        """
+        counter = Counter(items)
+        batch = SpaceSaving(self.capacity)
+        batch.total = sum(counter.values())
+        batch.counts = dict(counter.most_common(self.capacity))
+        batch.errors = dict.fromkeys(batch.counts, 0)
+        self.merge(batch)
+
+    bulk_add = add_many
+
+    def _absent_bound(self) -> int:
+        # the most an untracked item can have been seen
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other: "SpaceSaving"):
+        """
+        Fold another summary into this one, items missing from one summary are
+        taken to have been seen as often as anything it doesn't track could have.
+        """
+        own_bound = self._absent_bound()
+        other_bound = other._absent_bound()
+
+        # items are visited in the order they were first seen (this summary's,
+        # then the other's new items), so which of tied items are kept doesn't
+        # depend on set ordering (and so on PYTHONHASHSEED)
+        counts, errors = {}, {}
+        for item in [*self.counts, *(item for item in other.counts if item not in self.counts)]:
+            counts[item] = self.counts.get(item, own_bound) + other.counts.get(item, other_bound)
+            errors[item] = self.errors.get(item, own_bound) + other.errors.get(item, other_bound)
+
+        # nlargest is stable, of tied items the first seen are kept
+        kept = set(heapq.nlargest(self.capacity, counts, key=counts.get))
+        self.counts = {item: count for item, count in counts.items() if item in kept}
+        self.errors = {item: errors[item] for item in self.counts}
+        self.total += other.total
+
+        self._sequence = len(self.counts)
+        self._heap = [(count, i, item) for i, (item, count) in enumerate(self.counts.items())]
+        heapq.heapify(self._heap)
+        return self
+
+    def top(self, k: int = None) -> List[Tuple[Any, int, int]]:
+        """
+        The k most frequent items, most frequent first.
+
+        Returns:
+            list of (item, count, error) tuples, the true count of each item is
+            between count - error and count
+        """
+        items = heapq.nlargest(k or self.capacity, self.counts, key=self.counts.get)
+        return [(item, self.counts[item], self.errors[item]) for item in items]
+
+    def result(self, k: int = None) -> List[Tuple[Any, int, int]]:
+        return self.top(k)
+
+    def memory_usage(self) -> int:
+        return (
+            sys.getsizeof(self.counts)
+            + sys.getsizeof(self.errors)
+            + sys.getsizeof(self._heap)
+            + sum(sys.getsizeof(entry) for entry in self._heap)
+            + sum(sys.getsizeof(item) for item in self.counts)
+        )
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the summary, the capacity and total followed by the counts and
+        errors of the tracked items and the items as JSON (so items must be JSON
+        values)
+        """
+        items = list(self.counts)
+        return b"".join(
+            (
+                HEADER.pack(self.capacity, self.total, len(items)),
+                numpy.array([self.counts[item] for item in items], dtype="<i8").tobytes(),
+                numpy.array([self.errors[item] for item in items], dtype="<i8").tobytes(),
+                orjson.dumps(items),
+            )
+        )
+
+    @classmethod
+    def from_bytes(cls, data) -> "SpaceSaving":
+        """
+        Deserialize a summary created with to_bytes
+        """
+        capacity, total, size = HEADER.unpack_from(data)
+        offset = HEADER.size
+        counts = numpy.frombuffer(data, dtype="<i8", count=size, offset=offset)
+        errors = numpy.frombuffer(data, dtype="<i8", count=size, offset=offset + 8 * size)
+        items = orjson.loads(bytes(data[offset + 16 * size :]))
+        if len(items) != size:
+            raise ValueError("Data is not a serialized SpaceSaving")
+
+        summary = cls(capacity)
+        summary.total = total
+        summary.counts = dict(zip(items, counts.tolist()))
+        summary.errors = dict(zip(items, errors.tolist()))
+        summary._sequence = size
+        summary._heap = [(count, i, item) for i, (item, count) in enumerate(summary.counts.items())]
+        heapq.heapify(summary._heap)
+        return summary
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __repr__(self):  # pragma: no cover
+        return f"SpaceSaving <capacity:{self.capacity}, tracked:{len(self)}, total:{self.total}>"
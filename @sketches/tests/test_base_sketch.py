@@ -0,0 +1,86 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import random
+
+import pytest
+from adapters import DistogramSketch, HyperLogLogSketch, TDigestSketch
+from base_sketch import BaseSketch
+from bloom_filter import BloomFilter
+from lossy_counter import LossyCounter
+from minhash import MinHash
+from space_saving import SpaceSaving
+
+rng = random.Random(7)
+NUMBERS = [rng.gauss(0, 1) for _ in range(20000)]
+WORDS = [f"w{int(rng.paretovariate(1.2))}" for _ in range(20000)]
+
+# each sketch, the values to add and a tolerance for comparing results
+SKETCHES = [
+    (lambda: BloomFilter(5000, 0.01), WORDS, 0.05),
+    (lambda: LossyCounter(), WORDS, 0),
+    (lambda: SpaceSaving(50), WORDS, 0),
+    (lambda: HyperLogLogSketch(0.01), WORDS, 0),
+    (lambda: MinHash(), WORDS, 0),
+    (lambda: DistogramSketch(), NUMBERS, 0.05),
+    (lambda: TDigestSketch(), NUMBERS, 0.05),
+]
+
+
+def _same(a, b, tolerance):
+    if isinstance(a, float):
+        return a == pytest.approx(b, rel=tolerance, abs=tolerance)
+    if hasattr(a, "shape"):
+        return (a == b).all()
+    if isinstance(a, list):
+        # the tail of the most frequent values is approximate
+        return [item for item, *_ in a[:5]] == [item for item, *_ in b[:5]]
+    return a == b
+
+
+@pytest.mark.parametrize("create, values, tolerance", SKETCHES)
+def test_bulk_add_matches_add(create, values, tolerance):
+    one_at_a_time, batched = create(), create()
+    assert isinstance(batched, BaseSketch)
+    for value in values[:5000]:
+        one_at_a_time.add(value)
+    batched.bulk_add(values[:5000])
+
+    assert _same(batched.result(), one_at_a_time.result(), tolerance)
+
+
+@pytest.mark.parametrize("create, values, tolerance", SKETCHES)
+def test_merge(create, values, tolerance):
+    whole, first, second = create(), create(), create()
+    whole.bulk_add(values)
+    first.bulk_add(values[:10000])
+    second.bulk_add(values[10000:])
+
+    assert first.merge(second) is first
+    assert _same(first.result(), whole.result(), tolerance)
+
+
+@pytest.mark.parametrize("create, values, tolerance", SKETCHES)
+def test_to_bytes(create, values, tolerance):
+    sketch = create()
+    sketch.bulk_add(values)
+    restored = type(sketch).from_bytes(sketch.to_bytes())
+
+    assert _same(restored.result(), sketch.result(), 0)
+    assert 0 < sketch.memory_usage()
+
+
+def test_bloom_filter_estimates_distinct():
+    bf = BloomFilter(5000, 0.01)
+    bf.bulk_add(str(i) for i in range(3000))
+    assert bf.result() == pytest.approx(3000, rel=0.05)
+
+
+def test_quantile_results():
+    for create in (DistogramSketch, TDigestSketch):
+        sketch = create()
+        sketch.bulk_add(NUMBERS)
+        assert sketch.result(0.5) == pytest.approx(0, abs=0.05)
+        assert sketch.result(0.975) == pytest.approx(1.96, abs=0.1)
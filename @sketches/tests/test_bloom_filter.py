@@ -0,0 +1,75 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import pytest
+from bloom_filter import BloomFilter
+
+
+def test_add_and_contains():
+    bf = BloomFilter(1000, 0.01)
+
+    assert bf.add("apple")
+    assert not bf.add("apple")
+    assert "apple" in bf
+    assert "banana" not in bf
+
+
+def test_add_many_matches_add():
+    terms = [f"term{i}" for i in range(5000)]
+    a = BloomFilter(5000, 0.01)
+    b = BloomFilter(5000, 0.01)
+
+    for term in terms:
+        a.add(term)
+    b.add_many(terms)
+
+    assert a.bits == b.bits
+    assert all(term in b for term in terms)
+
+
+def test_contains_many():
+    bf = BloomFilter(10000, 0.01)
+    bf.add_many(range(10000))
+
+    assert bf.contains_many(range(10000)).all()
+    false_positives = bf.contains_many(range(10000, 30000)).mean()
+    assert false_positives < 0.02
+    assert list(bf.contains_many([5, -5])) == [5 in bf, -5 in bf]
+
+
+def test_more_hashes_than_seeds():
+    bf = BloomFilter(100, 0.0000001)
+    assert bf.hash_count > 11
+    bf.add_many(range(100))
+    assert all(i in bf for i in range(100))
+
+
+def test_bytes_round_trip():
+    bf = BloomFilter(1000, 0.05)
+    bf.add_many(range(500))
+
+    copy = BloomFilter.from_bytes(bf.to_bytes())
+    assert (copy.filter_size, copy.hash_count) == (bf.filter_size, bf.hash_count)
+    assert copy.bits == bf.bits
+    assert copy.contains_many(range(500)).all()
+
+
+def test_union_and_intersection():
+    a = BloomFilter(1000, 0.01)
+    b = BloomFilter(1000, 0.01)
+    a.add_many(range(0, 600))
+    b.add_many(range(400, 1000))
+
+    union = a | b
+    assert union.contains_many(range(1000)).all()
+
+    intersection = a.intersection(b)
+    assert intersection.contains_many(range(400, 600)).all()
+    assert intersection.contains_many(range(0, 400)).mean() < 0.1
+
+
+def test_incompatible_filters():
+    with pytest.raises(ValueError):
+        BloomFilter(1000, 0.01) | BloomFilter(2000, 0.01)
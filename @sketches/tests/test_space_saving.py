@@ -0,0 +1,139 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import random
+import subprocess
+from collections import Counter
+
+import pytest
+from space_saving import SpaceSaving
+
+
+def _zipf_stream(n, seed=1):
+    rng = random.Random(seed)
+    return [int(rng.paretovariate(1.2)) for _ in range(n)]
+
+
+def _check_bounds(sketch, stream):
+    exact = Counter(stream)
+    for item, count, error in sketch.top():
+        assert count - error <= exact[item] <= count
+
+
+def test_exact_when_under_capacity():
+    s = SpaceSaving(10)
+    for i in "abracadabra":
+        s.add(i)
+
+    assert s.top(1) == [("a", 5, 0)]
+    assert len(s.top()) == 5
+    assert s.total == 11
+
+
+def test_bounded():
+    s = SpaceSaving(5)
+    for i in range(1000):
+        s.add(i)
+
+    assert len(s) == 5
+    assert s.total == 1000
+
+
+def test_add_bounds():
+    stream = _zipf_stream(20000)
+    s = SpaceSaving(50)
+    for i in stream:
+        s.add(i)
+
+    _check_bounds(s, stream)
+    exact = Counter(stream).most_common(3)
+    assert [item for item, _, _ in s.top(3)] == [item for item, _ in exact]
+
+
+def test_add_many_bounds():
+    stream = _zipf_stream(20000)
+    s = SpaceSaving(50)
+    for i in range(0, len(stream), 1000):
+        s.add_many(stream[i : i + 1000])
+
+    assert s.total == len(stream)
+    _check_bounds(s, stream)
+    exact = Counter(stream).most_common(3)
+    assert [item for item, _, _ in s.top(3)] == [item for item, _ in exact]
+
+
+def test_merge():
+    stream = _zipf_stream(20000)
+    a, b = SpaceSaving(50), SpaceSaving(50)
+    for i in stream[:10000]:
+        a.add(i)
+    b.add_many(stream[10000:])
+
+    a.merge(b)
+    assert len(a) <= 50
+    assert a.total == len(stream)
+    _check_bounds(a, stream)
+
+    # the merged sketch can still be added to
+    for i in range(100):
+        a.add(-1)
+    assert a.top(1)[0][0] in (-1, 1)
+
+
+MERGE_TIES = """
+import sys
+sys.path.insert(1, sys.argv[1])
+from space_saving import SpaceSaving
+a, b = SpaceSaving(3), SpaceSaving(3)
+a.add_many(["x", "x", "w"])
+b.add_many(["x", "z", "y", "v"])
+print(a.merge(b).top())
+"""
+
+
+def test_merge_keeps_the_first_seen_of_tied_items():
+    a, b = SpaceSaving(3), SpaceSaving(3)
+    a.add_many(["x", "x", "w"])
+    b.add_many(["x", "z", "y", "v"])
+    a.merge(b)
+    # w, z, y and v are tied, w was seen first then z
+    assert [item for item, _, _ in a.top()] == ["x", "w", "z"]
+
+    # nor does it depend on the order of sets
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", MERGE_TIES, folder],
+            env=dict(os.environ, PYTHONHASHSEED=str(seed)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in range(6)
+    }
+    assert len(outputs) == 1
+
+
+def test_add_invalid_count():
+    with pytest.raises(ValueError):
+        SpaceSaving().add("a", count=0)
+
+
+def test_to_bytes():
+    s = SpaceSaving(10)
+    s.add_many(_zipf_stream(2000))
+    s.add_many(["a", "b", "a"])
+
+    restored = SpaceSaving.from_bytes(s.to_bytes())
+    assert restored.capacity == 10
+    assert restored.total == s.total
+    assert restored.top() == s.top()
+
+    # the restored sketch evicts the same item
+    s.add("new")
+    restored.add("new")
+    assert restored.top() == s.top()
+
+    assert SpaceSaving.from_bytes(SpaceSaving().to_bytes()).top() == []
@@ -0,0 +1,20 @@
+"""
+The vendored sketches live in directories which aren't importable as packages
+(e.g. `third_party/@distogram`); as their tests do, we put those directories on
+the path and import the modules by name.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VENDORED_PATHS = (
+    "third_party/@distogram",
+    "third_party/@hyperloglog",
+    "third_party/@tdigest",
+)
+
+for path in VENDORED_PATHS:
+    path = os.path.join(ROOT, path)
+    if path not in sys.path:
+        sys.path.append(path)
@@ -0,0 +1,62 @@
+"""
+Compares adding values to a Distogram one at a time with update against adding
+them as a batch with bulk_update, and the quantiles each gives.
+
+    python benchmarks/bench_distogram.py --values 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "third_party", "@distogram"))
+import distogram
+
+QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+
+def per_value(data):
+    h = distogram.Distogram()
+    for value in data.tolist():
+        distogram.update(h, value)
+    return h
+
+
+def bulk(data):
+    return distogram.bulk_update(distogram.NumpyDistogram(), data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--values", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = numpy.random.default_rng(42)
+    distributions = {
+        "uniform": rng.random(args.values),
+        "normal": rng.normal(size=args.values),
+        "lognormal": rng.lognormal(size=args.values),
+        "integers": rng.integers(0, 1000, args.values).astype(float),
+    }
+
+    for name, data in distributions.items():
+        exact = numpy.quantile(data, QUANTILES)
+        timings = {}
+        for method in (per_value, bulk):
+            start = time.perf_counter()
+            h = method(data)
+            timings[method] = time.perf_counter() - start
+            error = max(
+                abs(distogram.quantile(h, q) - e) for q, e in zip(QUANTILES, exact)
+            ) / (data.max() - data.min())
+            print(
+                f"{name:10} {method.__name__:10} {args.values / timings[method]:>14,.0f} values/s"
+                f"  max quantile error {error:.3%} of range"
+            )
+        print(f"{name:10} speed up   {timings[per_value] / timings[bulk]:>14.1f}x")
+
+
+if __name__ == "__main__":
+    main()
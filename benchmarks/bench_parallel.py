@@ -0,0 +1,45 @@
+"""
+Measures how profiling a JSONL file scales with the number of worker processes.
+
+    python benchmarks/bench_parallel.py --rows 1000000 --workers 1 2 4 8 16 32
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import orjson
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "@profiler"))
+from bench_profiler import TYPES, generate_rows
+from parallel import profile_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    parser.add_argument("--no-dates", action="store_true", help="exclude the date column")
+    args = parser.parse_args()
+
+    types = {k: v for k, v in TYPES.items() if not (args.no_dates and v == "date")}
+    with tempfile.NamedTemporaryFile(suffix=".jsonl") as f:
+        for row in generate_rows(args.rows):
+            f.write(orjson.dumps(row) + b"\n")
+        f.flush()
+
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            profile_parallel(types, f.name, workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed * workers
+            print(
+                f"{workers:>3} workers {args.rows / elapsed:>12,.0f} rows/s"
+                f"  ({elapsed:.2f}s, {baseline / elapsed / workers:.0%} efficiency)"
+            )
+
+
+if __name__ == "__main__":
+    main()
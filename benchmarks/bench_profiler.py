@@ -0,0 +1,154 @@
+"""
+Compares the rows per second of the batched Profiler against the row-by-row loop
+basic.py used before it.
+
+    python benchmarks/bench_profiler.py --rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "@profiler"))
+from profiler import Profiler
+
+TYPES = {
+    "id": "string",
+    "kind": "enum",
+    "title": "string",
+    "added": "date",
+    "year": "numeric",
+    "score": "numeric",
+}
+
+MONTHS = (
+    "January February March April May June July August September October November December"
+).split()
+
+
+def generate_rows(count, seed=42):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "id": f"s{i}",
+            "kind": rng.choice(("Movie", "TV Show", "Special")),
+            "title": rng.choice(("", "   ", None)) if rng.random() < 0.1 else f"title {rng.randint(0, count // 2)}",
+            "added": f"{rng.choice(MONTHS)} {rng.randint(1, 28)}, {rng.randint(2008, 2021)}",
+            "year": rng.randint(1925, 2021),
+            "score": None if rng.random() < 0.05 else rng.gauss(50, 15),
+        }
+
+
+def _redistribute_bins(bins, number_of_bins=100):
+    mn = min([l for l, h in bins])
+    mx = max([h for l, h in bins])
+    bin_size = (mx - mn) // number_of_bins
+    new_bins = {}
+    for counter in range(number_of_bins - 1):
+        new_bins[(mn + (bin_size * counter), mn + (bin_size * (counter + 1)) - 1)] = 0
+    new_bins[(mn + (bin_size * (counter + 1)), mx)] = 0
+    for old_bounds in bins:
+        old_lower, old_upper = old_bounds
+        old_mid = (old_lower + old_upper) // 2
+        for new_bounds in new_bins:
+            new_lower, new_upper = new_bounds
+            if old_mid >= new_lower and old_mid <= new_upper:
+                new_bins[new_bounds] += bins[old_bounds]
+                break
+    return new_bins
+
+
+def _bin(field_summary, field_value):
+    if field_summary.get("bins") is None:
+        field_summary["bins"] = {}
+    binned = False
+    for bounds in field_summary["bins"]:
+        bottom, top = bounds
+        if field_value >= bottom and field_value <= top:
+            field_summary["bins"][bounds] += 1
+            binned = True
+    if not binned:
+        field_summary["bins"][(field_value, field_value)] = 1
+    if len(field_summary["bins"]) > 1000:
+        field_summary["bins"] = _redistribute_bins(field_summary["bins"], 100)
+
+
+def legacy_profile(data, types):
+    """
+    The row-by-row loop from basic.py, kept as the baseline
+    """
+    from dateutil import parser
+
+    summary = {field: {"nulls": 0, "items": 0, "type": kind} for field, kind in types.items()}
+    for row in data:
+        for field in types:
+            field_summary = summary[field]
+            field_summary["items"] += 1
+            field_type = field_summary["type"]
+            field_value = row.get(field)
+            if field_value is None:
+                field_summary["nulls"] += 1
+            elif field_type == "numeric":
+                field_value = float(field_value)
+                if field_summary.get("max", field_value) <= field_value:
+                    field_summary["max"] = field_value
+                if field_summary.get("min", field_value) >= field_value:
+                    field_summary["min"] = field_value
+                field_summary["cumsum"] = field_summary.get("cumsum", 0) + field_value
+                field_summary["mean"] = field_summary["cumsum"] / field_summary["items"]
+                _bin(field_summary, field_value)
+            elif field_type == "date":
+                if len(field_value.strip()) == 0:
+                    field_summary["nulls"] += 1
+                else:
+                    field_value = int(parser.parse(field_value).timestamp())
+                    if field_summary.get("max", field_value) <= field_value:
+                        field_summary["max"] = field_value
+                    if field_summary.get("min", field_value) >= field_value:
+                        field_summary["min"] = field_value
+                    _bin(field_summary, field_value)
+            elif field_type == "string":
+                if len(field_value.strip()) == 0:
+                    field_summary["nulls"] += 1
+                else:
+                    if field_summary.get("unique_value_list") is None:
+                        field_summary["unique_value_list"] = {hash(field_value)}
+                    elif len(field_summary["unique_value_list"]) < 100000:
+                        field_summary["unique_value_list"].add(hash(field_value))
+            elif field_type == "enum":
+                if field_summary.get("values") is None:
+                    field_summary["values"] = {}
+                field_summary["values"][field_value] = field_summary["values"].get(field_value, 0) + 1
+    for field_summary in summary.values():
+        if "bins" in field_summary:
+            field_summary["bins"] = _redistribute_bins(field_summary["bins"], 10)
+    return summary
+
+
+def profile(data, types):
+    return Profiler(types).profile(data).summary()
+
+
+def time_it(function, data, types):
+    start = time.perf_counter()
+    function(data, types)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--no-dates", action="store_true", help="exclude the date column")
+    args = parser.parse_args()
+
+    types = {k: v for k, v in TYPES.items() if not (args.no_dates and v == "date")}
+    data = list(generate_rows(args.rows))
+
+    for name, function in (("legacy loop", legacy_profile), ("profiler", profile)):
+        elapsed = time_it(function, data, types)
+        print(f"{name:12} {args.rows / elapsed:>12,.0f} rows/s  ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares the rows per second of the memory mapped JSONL reader against the text
+mode reader it replaced, and of reading gzip and zstd compressed files.
+
+    python benchmarks/bench_readers.py --rows 1000000
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+import orjson
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "@profiler"))
+from bench_profiler import generate_rows
+from readers import read_jsonl_batches
+
+
+def legacy_read_jsonl(filename, chunk_size=32 * 1024 * 1024, delimiter="\n"):
+    """
+    The text mode reader from before, kept as the baseline
+    """
+    with open(filename, "r", encoding="utf8") as f:
+        carry_forward = ""
+        chunk = "INITIALIZED"
+        while len(chunk) > 0:
+            chunk = f.read(chunk_size)
+            lines = (carry_forward + chunk).split(delimiter)
+            carry_forward = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield orjson.loads(line)
+        if carry_forward.strip():
+            yield orjson.loads(carry_forward)
+
+
+def count_rows(filename):
+    return sum(len(batch) for batch in read_jsonl_batches(filename))
+
+
+def count_legacy_rows(filename):
+    return sum(1 for _ in legacy_read_jsonl(filename))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        plain = os.path.join(folder, "data.jsonl")
+        with open(plain, "wb") as f:
+            for row in generate_rows(args.rows):
+                f.write(orjson.dumps(row) + b"\n")
+        with open(plain, "rb") as f:
+            data = f.read()
+        files = [("text mode", count_legacy_rows, plain), ("mmap", count_rows, plain)]
+
+        compressed = os.path.join(folder, "data.jsonl.gz")
+        with gzip.open(compressed, "wb", compresslevel=6) as f:
+            f.write(data)
+        files.append(("gzip", count_rows, compressed))
+        try:
+            import zstandard
+
+            compressed = os.path.join(folder, "data.jsonl.zst")
+            with open(compressed, "wb") as f:
+                f.write(zstandard.ZstdCompressor().compress(data))
+            files.append(("zstd", count_rows, compressed))
+        except ImportError:
+            print("zstandard isn't installed, skipping zstd")
+
+        for name, function, filename in files:
+            start = time.perf_counter()
+            assert function(filename) == args.rows
+            elapsed = time.perf_counter() - start
+            print(f"{name:10} {args.rows / elapsed:>12,.0f} rows/s  ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares profiling a random sample of a JSONL file's blocks against profiling
+the whole file.
+
+    python benchmarks/bench_sampling.py --rows 300000 --tolerance 0.01 0.05 0.1
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import orjson
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "@profiler"))
+from bench_profiler import TYPES, generate_rows
+from profiler import Profiler
+from readers import read_jsonl_batches
+from sampling import BLOCK_SIZE, profile_sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--tolerance", type=float, nargs="+", default=[0.01, 0.05, 0.1])
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-dates", action="store_true", help="exclude the date column")
+    args = parser.parse_args()
+
+    types = {k: v for k, v in TYPES.items() if not (args.no_dates and v == "date")}
+    with tempfile.NamedTemporaryFile(suffix=".jsonl") as f:
+        for row in generate_rows(args.rows):
+            f.write(orjson.dumps(row) + b"\n")
+        f.flush()
+
+        start = time.perf_counter()
+        Profiler(types).profile_batches(read_jsonl_batches(f.name))
+        whole = time.perf_counter() - start
+        print(f"{'whole file':16} {os.path.getsize(f.name) / 1e6:6.1f} MB  {whole:.2f}s")
+
+        for tolerance in args.tolerance:
+            start = time.perf_counter()
+            sample = profile_sample(
+                types, f.name, args.confidence, tolerance, args.block_size, seed=args.seed
+            )
+            elapsed = time.perf_counter() - start
+            summary = sample.summary()
+            print(
+                f"tolerance {tolerance:<6} {summary['fraction']:6.1%} read  {elapsed:.2f}s"
+                f"  ({whole / elapsed:.1f}x faster"
+                f"{'' if summary['converged'] else ', not converged'})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Measures the throughput (items/s), memory and accuracy against the exact answer of
+each sketch, across data sizes and distributions.
+
+    python benchmarks/bench_sketches.py --sizes 10000 100000 1000000 --output sketches.json
+    python benchmarks/bench_sketches.py --baseline sketches.json
+
+The data is generated from a fixed seed so runs are comparable; the results are
+printed, and written as JSON with --output. --baseline compares the throughput
+and accuracy of this run with an earlier one.
+"""
+import argparse
+import os
+import platform
+import sys
+import time
+from collections import Counter
+
+import numpy
+import orjson
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "@sketches"))
+from adapters import DistogramSketch, HyperLogLogSketch, TDigestSketch
+from bloom_filter import BloomFilter
+from lossy_counter import LossyCounter
+from space_saving import SpaceSaving
+
+QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+TOP_K = 10
+# values which were never added, to measure the false positive rate of filters
+ABSENT = [f"absent{i}" for i in range(10000)]
+
+# the sketches of each family, created for the number of values to be added
+SKETCHES = {
+    "distinct": {
+        "hyperloglog(0.05)": lambda size: HyperLogLogSketch(0.05),
+        "hyperloglog(0.01)": lambda size: HyperLogLogSketch(0.01),
+        "bloom_filter(0.01)": lambda size: BloomFilter(size, 0.01),
+    },
+    "frequent": {
+        "space_saving(100)": lambda size: SpaceSaving(100),
+        "space_saving(1000)": lambda size: SpaceSaving(1000),
+        "lossy_counter(100)": lambda size: LossyCounter(100),
+    },
+    "quantiles": {
+        "distogram(100)": lambda size: DistogramSketch(100),
+        "tdigest(0.01)": lambda size: TDigestSketch(0.01),
+        "tdigest(0.005)": lambda size: TDigestSketch(0.005),
+    },
+}
+
+
+DISTRIBUTIONS = {
+    "distinct": ("uniform", "zipf", "unique"),
+    "frequent": ("uniform", "zipf", "unique"),
+    "quantiles": ("uniform", "normal", "lognormal"),
+}
+
+
+def generate(family, distribution, size, rng):
+    if family == "quantiles":
+        if distribution == "uniform":
+            return rng.random(size)
+        if distribution == "normal":
+            return rng.normal(size=size)
+        return rng.lognormal(size=size)
+    if distribution == "uniform":
+        values = rng.integers(0, max(1, size // 10), size)
+    elif distribution == "zipf":
+        values = rng.zipf(1.3, size)
+    else:
+        values = numpy.arange(size)
+    return [f"v{value}" for value in values.tolist()]
+
+
+def accuracy(family, sketch, values):
+    """
+    How far the sketch's answer is from the exact answer, lower is better
+    """
+    if family == "distinct":
+        exact = len(set(values))
+        result = {"relative_error": abs(float(sketch.result()) - exact) / exact}
+        if isinstance(sketch, BloomFilter):
+            result["false_positive_rate"] = float(sketch.contains_many(ABSENT).mean())
+        return result
+    if family == "frequent":
+        exact = Counter(values)
+        counts = sorted(exact.values(), reverse=True)
+        if isinstance(sketch, LossyCounter):
+            reported = [sketch.result()]
+        else:
+            reported = [item for item, _, _ in sketch.result(TOP_K)]
+        # with ties there's more than one right answer, a reported item is missed
+        # when it's less frequent than the k-th most frequent item
+        kth = counts[min(TOP_K, len(counts)) - 1]
+        return {
+            "top_1_miss": float(exact[reported[0]] < counts[0]),
+            f"top_{TOP_K}_missed": sum(exact[item] < kth for item in reported) / len(reported),
+        }
+    ordered = numpy.sort(values)
+    estimates = [sketch.result(q) for q in QUANTILES]
+    ranks = numpy.searchsorted(ordered, estimates) / len(ordered)
+    return {"max_rank_error": float(numpy.max(numpy.abs(ranks - QUANTILES)))}
+
+
+def measure(family, create, values, batch_size, repeat):
+    best = None
+    for _ in range(repeat):
+        sketch = create(len(values))
+        start = time.perf_counter()
+        for i in range(0, len(values), batch_size):
+            sketch.bulk_add(values[i : i + batch_size])
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "items_per_second": len(values) / best,
+        "memory_bytes": sketch.memory_usage(),
+        "serialized_bytes": len(sketch.to_bytes()),
+        "accuracy": accuracy(family, sketch, values),
+    }
+
+
+def compare(results, baseline):
+    earlier = {(r["sketch"], r["distribution"], r["size"]): r for r in baseline["results"]}
+    for result in results:
+        before = earlier.get((result["sketch"], result["distribution"], result["size"]))
+        if before is None:
+            continue
+        speed_up = result["items_per_second"] / before["items_per_second"]
+        changes = " ".join(
+            f"{metric} {before['accuracy'][metric]:.4f}->{value:.4f}"
+            for metric, value in result["accuracy"].items()
+            if metric in before["accuracy"]
+        )
+        print(
+            f"{result['sketch']:20} {result['distribution']:10} {result['size']:>9}"
+            f"  {speed_up:5.2f}x  {changes}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--families", nargs="+", choices=list(SKETCHES), default=list(SKETCHES))
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3, help="the fastest run is reported")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="file to write the results to as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    results = []
+    for family in args.families:
+        for distribution in DISTRIBUTIONS[family]:
+            for size in args.sizes:
+                values = generate(family, distribution, size, numpy.random.default_rng(args.seed))
+                for name, create in SKETCHES[family].items():
+                    result = {
+                        "family": family,
+                        "sketch": name,
+                        "distribution": distribution,
+                        "size": size,
+                        **measure(family, create, values, args.batch_size, args.repeat),
+                    }
+                    results.append(result)
+                    errors = " ".join(f"{k} {v:.4f}" for k, v in result["accuracy"].items())
+                    print(
+                        f"{name:20} {distribution:10} {size:>9} "
+                        f"{result['items_per_second']:>14,.0f} items/s "
+                        f"{result['memory_bytes']:>10,} bytes  {errors}"
+                    )
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "batch_size": args.batch_size,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "rb") as f:
+            compare(results, orjson.loads(f.read()))
+
+
+if __name__ == "__main__":
+    main()
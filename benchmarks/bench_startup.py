@@ -0,0 +1,111 @@
+"""
+Measures how long the profiler's modules take to import, each in a fresh
+interpreter so nothing is already cached in the process.
+
+    python benchmarks/bench_startup.py --repeat 20 --output startup.json
+    python benchmarks/bench_startup.py --baseline startup.json
+
+The time of starting an interpreter which imports nothing is reported first and
+taken off the others; -X importtime lists the slowest modules each one imports.
+"""
+import argparse
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import orjson
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PATHS = [os.path.join(ROOT, folder) for folder in ("@profiler", "@sketches", "@indexes")]
+
+# what the CLI imports before it parses its arguments, then what profiling imports
+MODULES = ("readers", "columns", "profiler", "state", "parallel", "block_index", "lsh_index")
+
+
+def run(module, importtime=False):
+    code = f"import {module}" if module else "pass"
+    options = ["-X", "importtime"] if importtime else []
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(PATHS))
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, *options, "-c", code],
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, completed.stderr
+
+
+def slowest_imports(module, count):
+    """
+    The modules with the largest cumulative import time (in microseconds) which
+    importing the module imports, from -X importtime
+    """
+    _, report = run(module, importtime=True)
+    times = []
+    for line in report.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        times.append((int(cumulative), name.strip()))
+    return sorted(times, reverse=True)[1 : count + 1]
+
+
+def compare(results, baseline):
+    earlier = {r["module"]: r for r in baseline["results"]}
+    for result in results:
+        before = earlier.get(result["module"])
+        if before is None:
+            continue
+        print(
+            f"{result['module']:12} {before['milliseconds']:8.1f} ms ->"
+            f" {result['milliseconds']:8.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--repeat", type=int, default=10, help="the median run is reported")
+    parser.add_argument("--top", type=int, default=5, help="slowest imports listed per module")
+    parser.add_argument("--output", help="file to write the results to as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    interpreter = statistics.median(run(None)[0] for _ in range(args.repeat))
+    print(f"{'(python)':12} {interpreter * 1000:8.1f} ms")
+
+    results = []
+    for module in args.modules:
+        elapsed = statistics.median(run(module)[0] for _ in range(args.repeat))
+        slowest = slowest_imports(module, args.top)
+        results.append(
+            {
+                "module": module,
+                "milliseconds": (elapsed - interpreter) * 1000,
+                "slowest": [{"module": name, "microseconds": us} for us, name in slowest],
+            }
+        )
+        names = ", ".join(f"{name} {us / 1000:.1f}" for us, name in slowest)
+        print(f"{module:12} {(elapsed - interpreter) * 1000:8.1f} ms  ({names})")
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "interpreter_milliseconds": interpreter * 1000,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "rb") as f:
+            compare(results, orjson.loads(f.read()))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ __email__ = "romain.picard@oakbits.com"
 __version__ = "2.0.0"
 
 import math
+import struct
 from bisect import bisect_left
 from functools import reduce
 from itertools import accumulate
@@ -12,9 +13,14 @@ from typing import List
 from typing import Optional
 from typing import Tuple
 
-from numpy.lib.histograms import _hist_bin_auto
+import numpy as np
 
 EPSILON = 1e-5
+PRE_MERGE_FACTOR = 32
+# single updates to a NumpyDistogram are buffered and added in bulk
+UPDATE_BUFFER = 1024
+# bin count, weighted diff, min and max (NaN when empty)
+HEADER = struct.Struct("<I?dd")
 Bin = Tuple[float, int]
 
 
@@ -43,6 +49,53 @@ class Distogram(object):
         self.weighted_diff: bool = weighted_diff
 
 
+class NumpyDistogram(Distogram):
+    """Distogram with the bins held in NumPy arrays, for use with bulk_update.
+
+    The bins property presents the arrays as the list of (cut point, count)
+    tuples the rest of this module reads, so the query functions (count,
+    quantile, histogram...) work on either class. Values added with update
+    are buffered and added with bulk_update when the bins are next read.
+    """
+
+    __slots__ = "_values", "_counts", "_pending"
+
+    @property
+    def values(self) -> np.ndarray:
+        self._flush()
+        return self._values
+
+    @values.setter
+    def values(self, values: np.ndarray) -> None:
+        self._values = values
+
+    @property
+    def counts(self) -> np.ndarray:
+        self._flush()
+        return self._counts
+
+    @counts.setter
+    def counts(self, counts: np.ndarray) -> None:
+        self._counts = counts
+
+    @property
+    def bins(self) -> List[Bin]:
+        return list(zip(self.values.tolist(), self.counts.tolist()))
+
+    @bins.setter
+    def bins(self, bins: List[Bin]) -> None:
+        values, counts = zip(*bins) if bins else ((), ())
+        self._values = np.array(values, dtype=np.float64)
+        self._counts = np.array(counts, dtype=np.int64)
+        self._pending = []
+
+    def _flush(self) -> None:
+        if self._pending:
+            values, counts = zip(*self._pending)
+            self._pending = []
+            bulk_update(self, values, counts)
+
+
 def _linspace(start: float, stop: float, num: int) -> List[float]:
     if num == 1:
         return [stop]
@@ -165,6 +218,16 @@ def update(h: Distogram, value: float, count: int = 1) -> Distogram:
     if count <= 0:
         raise ValueError("count must be strictly positive")
 
+    if isinstance(h, NumpyDistogram):
+        h._pending.append((value, count))
+        if (h.min is None) or (h.min > value):
+            h.min = float(value)
+        if (h.max is None) or (h.max < value):
+            h.max = float(value)
+        if len(h._pending) >= UPDATE_BUFFER:
+            h._flush()
+        return h
+
     index = 0
     if len(h.bins) > 0:
         if value <= h.bins[0][0]:
@@ -205,6 +268,113 @@ def update(h: Distogram, value: float, count: int = 1) -> Distogram:
     return _trim(h)
 
 
+def _merge_closest(
+    values: np.ndarray, counts: np.ndarray, bin_count: int, weighted_diff: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Merges the closest neighbouring bins until there are bin_count bins, as
+    # _trim does, but each pass merges up to half of the bins at once.
+    if len(values) > bin_count * PRE_MERGE_FACTOR * 2:
+        # very large batches are first cut into runs of adjacent values
+        starts = np.linspace(0, len(values), bin_count * PRE_MERGE_FACTOR, endpoint=False)
+        starts = starts.astype(np.int64)
+        weights = np.add.reduceat(values * counts, starts)
+        counts = np.add.reduceat(counts, starts)
+        values = weights / counts
+
+    while len(values) > bin_count:
+        diffs = np.diff(values)
+        if weighted_diff is True:
+            diffs *= np.log(EPSILON + np.minimum(counts[:-1], counts[1:]))
+
+        excess = len(values) - bin_count
+        k = max(min(excess, len(diffs) // 2), 1)
+        selected = diffs <= np.partition(diffs, k - 1)[k - 1]
+
+        # neighbouring pairs share a bin, keep every other pair of each run
+        index = np.arange(len(selected))
+        starts = selected & ~np.concatenate(([False], selected[:-1]))
+        run_start = np.maximum.accumulate(np.where(starts, index, 0))
+        selected &= (index - run_start) % 2 == 0
+
+        if np.count_nonzero(selected) > excess:
+            selected[np.flatnonzero(selected)[excess:]] = False
+
+        # each bin starts a group unless it is the right hand side of a pair
+        starts = np.flatnonzero(np.concatenate(([True], ~selected)))
+        weights = np.add.reduceat(values * counts, starts)
+        counts = np.add.reduceat(counts, starts)
+        values = weights / counts
+
+    return values, counts
+
+
+def _group_equal(values: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # equal values (which are adjacent once sorted) share a bin
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    return values[starts], np.add.reduceat(counts, starts)
+
+
+def bulk_update(h: Distogram, values, counts=None) -> Distogram:
+    """Adds a batch of elements to the distribution.
+
+    The batch is sorted once and its closest values merged until there are
+    at most bin_count bins, these are then merged with the existing bins in
+    the same way (as Ben-Haim merges histograms). This is much faster than
+    calling update for each value of a large batch.
+
+    Args:
+        h: A Distogram object, a NumpyDistogram avoids converting the bins.
+        values: The values to add on the histogram.
+        counts: [Optional] The number of times each value must be added.
+
+    Returns:
+        A Distogram object where the values have been processed.
+
+    Raises:
+        ValueError if any count is not strictly positive.
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if counts is not None:
+        counts = np.asarray(counts, dtype=np.int64).ravel()
+        if (counts <= 0).any():
+            raise ValueError("count must be strictly positive")
+    if len(values) == 0:
+        return h
+
+    low, high = values.min(), values.max()
+    if (h.min is None) or (h.min > low):
+        h.min = float(low)
+    if (h.max is None) or (h.max < high):
+        h.max = float(high)
+
+    # the batch is reduced to bins on its own, then merged with the existing bins
+    if counts is None:
+        values = np.sort(values)
+        counts = np.ones(len(values), dtype=np.int64)
+    else:
+        order = np.argsort(values)
+        values, counts = values[order], counts[order]
+    values, counts = _merge_closest(*_group_equal(values, counts), h.bin_count, h.weighted_diff)
+
+    if isinstance(h, NumpyDistogram):
+        bin_values, bin_counts = h.values, h.counts
+    else:
+        bin_values = np.array([v for v, _ in h.bins], dtype=np.float64)
+        bin_counts = np.array([f for _, f in h.bins], dtype=np.int64)
+    values = np.concatenate((bin_values, values))
+    counts = np.concatenate((bin_counts, counts))
+    order = np.argsort(values, kind="stable")
+    values, counts = _group_equal(values[order], counts[order])
+    values, counts = _merge_closest(values, counts, h.bin_count, h.weighted_diff)
+
+    if isinstance(h, NumpyDistogram):
+        h.values, h.counts = values, counts
+    else:
+        h.bins = list(zip(values.tolist(), counts.tolist()))
+        h.diffs = None
+    return h
+
+
 def merge(h1: Distogram, h2: Distogram) -> Distogram:
     """Merges two Distogram objects
 
@@ -216,6 +386,15 @@ def merge(h1: Distogram, h2: Distogram) -> Distogram:
         A Distogram object being the composition of h1 and h2. The number of
         bins in this Distogram is equal to the number of bins in h1.
     """
+    if isinstance(h1, NumpyDistogram):
+        if len(h2.bins) == 0:
+            return h1
+        values, counts = zip(*h2.bins)
+        h = bulk_update(h1, values, counts)
+        h.min = h2.min if h.min is None else min(h.min, h2.min)
+        h.max = h2.max if h.max is None else max(h.max, h2.max)
+        return h
+
     h = reduce(
         lambda residual, b: update(residual, *b),
         h2.bins,
@@ -224,6 +403,54 @@ def merge(h1: Distogram, h2: Distogram) -> Distogram:
     return h
 
 
+def to_bytes(h: Distogram) -> bytes:
+    """Serializes a Distogram.
+
+    Args:
+        h: A Distogram object.
+
+    Returns:
+        The bin count, weighted_diff flag, min and max followed by the cut
+        points and counts of the bins.
+    """
+    values, counts = zip(*h.bins) if h.bins else ((), ())
+    return b"".join(
+        (
+            HEADER.pack(
+                h.bin_count,
+                h.weighted_diff,
+                math.nan if h.min is None else h.min,
+                math.nan if h.max is None else h.max,
+            ),
+            np.array(values, dtype="<f8").tobytes(),
+            np.array(counts, dtype="<i8").tobytes(),
+        )
+    )
+
+
+def from_bytes(data: bytes) -> "NumpyDistogram":
+    """Deserializes a Distogram created with to_bytes.
+
+    Args:
+        data: The serialized Distogram.
+
+    Returns:
+        A NumpyDistogram object.
+    """
+    bin_count, weighted_diff, low, high = HEADER.unpack_from(data)
+    size, remainder = divmod(len(data) - HEADER.size, 16)
+    if remainder:
+        raise ValueError("Data is not a serialized Distogram")
+    h = NumpyDistogram(bin_count=bin_count, weighted_diff=weighted_diff)
+    h.min = None if math.isnan(low) else low
+    h.max = None if math.isnan(high) else high
+    h.values = np.frombuffer(data, dtype="<f8", count=size, offset=HEADER.size).astype(np.float64)
+    h.counts = np.frombuffer(
+        data, dtype="<i8", count=size, offset=HEADER.size + 8 * size
+    ).astype(np.int64)
+    return h
+
+
 def count_at(h: Distogram, value: float):
     """Counts the number of elements present in the distribution up to value.
 
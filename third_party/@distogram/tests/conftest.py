@@ -0,0 +1,12 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import pytest
+import distogram
+
+
+@pytest.fixture(params=[distogram.Distogram, distogram.NumpyDistogram])
+def new_distogram(request):
+    return request.param
@@ -6,9 +6,9 @@ import distogram
 import random
 
 
-def test_bounds():
+def test_bounds(new_distogram):
     normal = [random.normalvariate(0.0, 1.0) for _ in range(10000)]
-    h = distogram.Distogram()
+    h = new_distogram()
 
     for i in normal:
         h = distogram.update(h, i)
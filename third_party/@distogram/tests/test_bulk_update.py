@@ -0,0 +1,92 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import pytest
+from pytest import approx
+import distogram
+
+import numpy as np
+
+
+def test_bulk_update(new_distogram):
+    h = new_distogram(bin_count=3)
+
+    h = distogram.bulk_update(h, [23, 28, 16])
+    assert h.bins == [(16, 1), (23, 1), (28, 1)]
+    h = distogram.bulk_update(h, [23, 28, 16])
+    assert h.bins == [(16, 2), (23, 2), (28, 2)]
+
+    # merge values
+    h = distogram.bulk_update(h, [26])
+    assert h.bins[0] == (16, 2)
+    assert h.bins[1] == (23, 2)
+    assert h.bins[2][0] == approx(27.33333)
+    assert h.bins[2][1] == 3
+    assert distogram.bounds(h) == (16, 28)
+
+
+def test_bulk_update_with_counts(new_distogram):
+    h = new_distogram(bin_count=3)
+    h = distogram.bulk_update(h, [16, 23, 28], counts=[4, 3, 5])
+
+    assert distogram.count(h) == 12
+    assert distogram.quantile(h, 0.5) == approx(23.625)
+
+
+def test_bulk_update_with_invalid_count(new_distogram):
+    h = new_distogram(bin_count=3)
+
+    with pytest.raises(ValueError):
+        distogram.bulk_update(h, [23, 24], counts=[1, 0])
+
+
+def test_bulk_update_matches_update():
+    data = np.random.default_rng(1).normal(size=100000)
+    h = distogram.Distogram()
+    for i in data:
+        h = distogram.update(h, i)
+    b = distogram.bulk_update(distogram.NumpyDistogram(), data)
+
+    assert len(b.bins) == b.bin_count
+    assert distogram.count(b) == distogram.count(h)
+    assert distogram.bounds(b) == distogram.bounds(h)
+    for q in (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99):
+        assert distogram.quantile(b, q) == approx(np.quantile(data, q), abs=0.05)
+        assert distogram.quantile(b, q) == approx(distogram.quantile(h, q), abs=0.05)
+    assert distogram.mean(b) == approx(np.mean(data), abs=0.01)
+    assert distogram.stddev(b) == approx(np.std(data), abs=0.05)
+
+
+def test_bulk_update_in_batches():
+    data = np.random.default_rng(1).uniform(size=100000)
+    h = distogram.NumpyDistogram()
+    for batch in np.array_split(data, 50):
+        h = distogram.bulk_update(h, batch)
+
+    assert distogram.count(h) == 100000
+    for q in (0.1, 0.5, 0.9):
+        assert distogram.quantile(h, q) == approx(q, abs=0.01)
+
+
+def test_update_numpy_distogram():
+    h = distogram.NumpyDistogram(bin_count=3)
+    for i in [23, 28, 16, 23]:
+        h = distogram.update(h, i)
+
+    assert h.bins == [(16, 1), (23, 2), (28, 1)]
+
+
+def test_merge_numpy_distogram():
+    rng = np.random.default_rng(1)
+    data1 = rng.normal(size=10000)
+    data2 = rng.normal(loc=5, size=10000)
+    h1 = distogram.bulk_update(distogram.NumpyDistogram(), data1)
+    h2 = distogram.bulk_update(distogram.NumpyDistogram(), data2)
+
+    h = distogram.merge(h1, h2)
+    data = np.concatenate((data1, data2))
+    assert distogram.count(h) == 20000
+    assert distogram.bounds(h) == (data.min(), data.max())
+    assert distogram.quantile(h, 0.5) == approx(np.quantile(data, 0.5), abs=0.2)
@@ -5,8 +5,8 @@ sys.path.insert(1, os.path.join(sys.path[0], ".."))
 import distogram
 
 
-def test_count():
-    h = distogram.Distogram(bin_count=3)
+def test_count(new_distogram):
+    h = new_distogram(bin_count=3)
     assert distogram.count(h) == 0
 
     h = distogram.update(h, 16, count=4)
@@ -8,8 +8,8 @@ import random
 import distogram
 
 
-def test_count_at():
-    h = distogram.Distogram(bin_count=3)
+def test_count_at(new_distogram):
+    h = new_distogram(bin_count=3)
     print(h)
 
     # fill histogram
@@ -22,10 +22,10 @@ def test_count_at():
     assert actual_result == approx(6.859999999)
 
 
-def test_count_at_normal():
+def test_count_at_normal(new_distogram):
     points = 10000
     normal = [random.normalvariate(0.0, 1.0) for _ in range(points)]
-    h = distogram.Distogram()
+    h = new_distogram()
 
     for i in normal:
         h = distogram.update(h, i)
@@ -33,8 +33,8 @@ def test_count_at_normal():
     assert distogram.count_at(h, 0) == approx(points / 2, rel=0.05)
 
 
-def test_count_at_not_enough_elements():
-    h = distogram.Distogram()
+def test_count_at_not_enough_elements(new_distogram):
+    h = new_distogram()
 
     h = distogram.update(h, 1)
     h = distogram.update(h, 2)
@@ -43,8 +43,8 @@ def test_count_at_not_enough_elements():
     assert distogram.count_at(h, 2.5) == 2
 
 
-def test_count_at_left():
-    h = distogram.Distogram(bin_count=6)
+def test_count_at_left(new_distogram):
+    h = new_distogram(bin_count=6)
 
     for i in [1, 2, 3, 4, 5, 6, 0.7, 1.1]:
         h = distogram.update(h, i)
@@ -52,8 +52,8 @@ def test_count_at_left():
     assert distogram.count_at(h, 0.77) == approx(0.14)
 
 
-def test_count_at_right():
-    h = distogram.Distogram(bin_count=6)
+def test_count_at_right(new_distogram):
+    h = new_distogram(bin_count=6)
 
     for i in [1, 2, 3, 4, 5, 6, 6.7, 6.1]:
         h = distogram.update(h, i)
@@ -61,14 +61,14 @@ def test_count_at_right():
     assert distogram.count_at(h, 6.5) == approx(7.307692307692308)
 
 
-def test_count_at_empty():
-    h = distogram.Distogram()
+def test_count_at_empty(new_distogram):
+    h = new_distogram()
 
     assert distogram.count_at(h, 6.5) is None
 
 
-def test_count_at_out_of_bouns():
-    h = distogram.Distogram()
+def test_count_at_out_of_bouns(new_distogram):
+    h = new_distogram()
 
     for i in [1, 2, 3, 4, 5, 6, 6.7, 6.1]:
         h = distogram.update(h, i)
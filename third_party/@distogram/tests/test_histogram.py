@@ -9,9 +9,9 @@ from pytest import approx
 import distogram
 
 
-def test_histogram():
+def test_histogram(new_distogram):
     normal = [random.normalvariate(0.0, 1.0) for _ in range(10000)]
-    h = distogram.Distogram(bin_count=64)
+    h = new_distogram(bin_count=64)
 
     for i in normal:
         h = distogram.update(h, i)
@@ -24,8 +24,8 @@ def test_histogram():
     # assert np_edges == approx(d_edges, abs=0.2)
 
 
-def test_histogram_on_too_small_distribution():
-    h = distogram.Distogram(bin_count=64)
+def test_histogram_on_too_small_distribution(new_distogram):
+    h = new_distogram(bin_count=64)
 
     for i in range(5):
         h = distogram.update(h, i)
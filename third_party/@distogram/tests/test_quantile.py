@@ -10,8 +10,8 @@ import numpy as np
 import random
 
 
-def test_quantile():
-    h = distogram.Distogram(bin_count=3)
+def test_quantile(new_distogram):
+    h = new_distogram(bin_count=3)
     h = distogram.update(h, 16, count=4)
     h = distogram.update(h, 23, count=3)
     h = distogram.update(h, 28, count=5)
@@ -19,8 +19,8 @@ def test_quantile():
     assert distogram.quantile(h, 0.5) == approx(23.625)
 
 
-def test_quantile_not_enough_elemnts():
-    h = distogram.Distogram(bin_count=10)
+def test_quantile_not_enough_elemnts(new_distogram):
+    h = new_distogram(bin_count=10)
 
     for i in [12.3, 5.4, 8.2, 100.53, 23.5, 13.98]:
         h = distogram.update(h, i)
@@ -28,8 +28,8 @@ def test_quantile_not_enough_elemnts():
     assert distogram.quantile(h, 0.5) == approx(13.14)
 
 
-def test_quantile_on_left():
-    h = distogram.Distogram(bin_count=6)
+def test_quantile_on_left(new_distogram):
+    h = new_distogram(bin_count=6)
 
     data = [12.3, 5.2, 5.4, 4.9, 5.5, 5.6, 8.2, 30.53, 23.5, 13.98]
     for i in data:
@@ -40,8 +40,8 @@ def test_quantile_on_left():
     assert distogram.quantile(h, 0.25) == approx(np.quantile(data, 0.25), rel=0.05)
 
 
-def test_quantile_on_right():
-    h = distogram.Distogram(bin_count=6)
+def test_quantile_on_right(new_distogram):
+    h = new_distogram(bin_count=6)
 
     data = [12.3, 8.2, 100.53, 23.5, 13.98, 200, 200.2, 200.8, 200.4, 200.1]
     for i in data:
@@ -51,10 +51,10 @@ def test_quantile_on_right():
     assert distogram.quantile(h, 0.85) == approx(np.quantile(data, 0.85), rel=0.01)
 
 
-def test_normal():
+def test_normal(new_distogram):
     # normal = np.random.normal(0,1, 1000)
     normal = [random.normalvariate(0.0, 1.0) for _ in range(10000)]
-    h = distogram.Distogram(bin_count=64)
+    h = new_distogram(bin_count=64)
 
     for i in normal:
         h = distogram.update(h, i)
@@ -63,14 +63,14 @@ def test_normal():
     assert distogram.quantile(h, 0.95) == approx(np.quantile(normal, 0.95), abs=0.2)
 
 
-def test_quantile_empty():
-    h = distogram.Distogram()
+def test_quantile_empty(new_distogram):
+    h = new_distogram()
 
     assert distogram.quantile(h, 0.3) is None
 
 
-def test_quantile_out_of_bouns():
-    h = distogram.Distogram()
+def test_quantile_out_of_bouns(new_distogram):
+    h = new_distogram()
 
     for i in [1, 2, 3, 4, 5, 6, 6.7, 6.1]:
         h = distogram.update(h, i)
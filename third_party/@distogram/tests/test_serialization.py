@@ -0,0 +1,33 @@
+# type:ignore
+import sys
+import os
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import pytest
+import distogram
+
+import numpy as np
+
+
+@pytest.mark.parametrize("cls", [distogram.Distogram, distogram.NumpyDistogram])
+def test_round_trip(cls):
+    h = cls(bin_count=10)
+    h = distogram.bulk_update(h, np.random.default_rng(1).normal(size=1000))
+
+    h2 = distogram.from_bytes(distogram.to_bytes(h))
+    assert isinstance(h2, distogram.NumpyDistogram)
+    assert h2.bins == h.bins
+    assert (h2.min, h2.max, h2.bin_count) == (h.min, h.max, 10)
+
+    # the deserialized distogram can still be updated
+    distogram.bulk_update(h2, [100.0])
+    assert h2.max == 100.0
+
+
+def test_empty(new_distogram):
+    h = distogram.from_bytes(distogram.to_bytes(new_distogram()))
+    assert h.bins == []
+    assert h.min is None and h.max is None
+
+    with pytest.raises(ValueError):
+        distogram.from_bytes(distogram.to_bytes(new_distogram()) + b"\x00")
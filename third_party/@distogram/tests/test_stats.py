@@ -10,9 +10,9 @@ import numpy as np
 import random
 
 
-def test_stats():
+def test_stats(new_distogram):
     normal = [random.normalvariate(0.0, 1.0) for _ in range(10000)]
-    h = distogram.Distogram()
+    h = new_distogram()
 
     for i in normal:
         h = distogram.update(h, i)
@@ -8,8 +8,8 @@ from pytest import approx
 import distogram
 
 
-def test_update():
-    h = distogram.Distogram(bin_count=3)
+def test_update(new_distogram):
+    h = new_distogram(bin_count=3)
 
     # fill histogram
     h = distogram.update(h, 23)
@@ -35,8 +35,18 @@ def test_update():
     assert h.bins[2][1] == 3
 
 
-def test_update_with_invalid_count():
-    h = distogram.Distogram(bin_count=3)
+def test_update_with_invalid_count(new_distogram):
+    h = new_distogram(bin_count=3)
 
     with pytest.raises(ValueError):
         distogram.update(h, 23, count=0)
+
+
+def test_numpy_updates_are_buffered():
+    h = distogram.NumpyDistogram(bin_count=10)
+    for x in range(5000):
+        distogram.update(h, x)
+    assert len(h._pending) < distogram.UPDATE_BUFFER
+    assert (h.min, h.max) == (0, 4999)
+    assert distogram.count(h) == 5000
+    assert h._pending == []
@@ -1,3 +0,0 @@
-import pyximport
-
-pyximport.install()
@@ -84,6 +84,8 @@ biasData = [
 # fmt:on
 
 import math
+
+import numpy
 from cityhash import CityHash64
 
 
@@ -100,11 +102,9 @@ def estimate_bias(E, p):
 
 
 def get_nearest_neighbors(E, estimate_vector):
-    distance_map = [
-        ((E - float(val)) ** 2, idx) for idx, val in enumerate(estimate_vector)
-    ]
-    distance_map.sort()
-    return [idx for dist, idx in distance_map[:6]]
+    distances = (E - numpy.asarray(estimate_vector, dtype=numpy.float64)) ** 2
+    # a stable sort breaks ties on the index, as sorting (distance, index) did
+    return numpy.argsort(distances, kind="stable")[:6].tolist()
 
 
 def get_alpha(p):
@@ -123,9 +123,26 @@ def get_alpha(p):
     return 0.7213 / (1.0 + 1.079 / (1 << p))
 
 
+def _bit_length(x):
+    """
+    int.bit_length for an array of uint64, as a binary search over the bits
+    """
+    length = numpy.zeros(x.shape, dtype=numpy.uint8)
+    x = x.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = x >= numpy.uint64(1 << shift)
+        length[wide] += shift
+        x[wide] >>= numpy.uint64(shift)
+    return length + (x > 0)
+
+
 class HyperLogLog(object):
     """
     HyperLogLog cardinality counter
+
+    The registers are a bytearray, one byte per register, which is fast to index
+    from Python (for add) and which NumPy can view without copying (for add_many,
+    update and card).
     """
 
     __slots__ = ("alpha", "p", "m", "M")
@@ -145,10 +162,17 @@ class HyperLogLog(object):
 
         p = int(math.ceil(math.log((1.04 / error_rate) ** 2, 2)))
 
+        self._set_precision(p)
+        self.M = bytearray(self.m)
+
+    def _set_precision(self, p):
         self.alpha = get_alpha(p)
         self.p = p
         self.m = 1 << p
-        self.M = [0 for i in range(self.m)]
+
+    def _registers(self):
+        # a writable view of the registers, shares memory with M
+        return numpy.frombuffer(self.M, dtype=numpy.uint8)
 
     def add(self, value, hash_func=CityHash64):
         """
@@ -177,6 +201,38 @@ class HyperLogLog(object):
         mj = self.M[j]
         self.M[j] = mj if mj >= rho else rho
 
+    def add_many(self, values, hash_func=CityHash64):
+        """
+        Adds a batch of items to the HyperLogLog
+
+        The items are hashed in one pass and the register maxima are scattered
+        with NumPy, this is much faster than calling add for each item.
+
+        Paramters:
+            values:  Iterable
+                The values to add to the counter
+            hash_func: Callable (optional)
+                The hashing algorithm to apply to the data, see add
+        """
+        self.add_hashes(numpy.fromiter(map(hash_func, values), dtype=numpy.uint64))
+
+    def add_hashes(self, x):
+        """
+        Adds a batch of items which have already been hashed
+
+        Paramters:
+            x:  numpy.ndarray
+                The 64 bit hashes of the items, as uint64
+        """
+        if x.size == 0:
+            return
+
+        j = (x & numpy.uint64(self.m - 1)).astype(numpy.intp)
+        w = x >> numpy.uint64(self.p)
+
+        rho = (64 - self.p) - _bit_length(w) + 1
+        numpy.maximum.at(self._registers(), j, rho.astype(numpy.uint8))
+
     def update(self, *others):
         """
         Merge other counters
@@ -186,9 +242,35 @@ class HyperLogLog(object):
             if self.m != item.m:
                 raise ValueError("Counters precisions should be equal")
 
-        self.M = [
-            max(*items) for items in zip(*([item.M for item in others] + [self.M]))
-        ]
+        registers = self._registers()
+        for item in others:
+            numpy.maximum(registers, item._registers(), out=registers)
+
+    def to_bytes(self):
+        """
+        Serialize the counter, the precision followed by the registers
+        """
+        return bytes((self.p,)) + bytes(self.M)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Deserialize a counter created with to_bytes
+        """
+        p = data[0]
+        counter = cls.__new__(cls)
+        counter._set_precision(p)
+        if len(data) != counter.m + 1:
+            raise ValueError("Data is not a serialized HyperLogLog")
+        counter.M = bytearray(data[1:])
+        return counter
+
+    @property
+    def error_rate(self):
+        """
+        The standard error of the cardinality estimate, relative to the cardinality
+        """
+        return 1.04 / math.sqrt(self.m)
 
     def __eq__(self, other):
         if self.m != other.m:
@@ -203,7 +285,8 @@ class HyperLogLog(object):
         return round(self.card())
 
     def _Ep(self):
-        E = self.alpha * float(self.m ** 2) / sum(math.pow(2.0, -x) for x in self.M)
+        inverse_powers = numpy.ldexp(1.0, -self._registers().astype(numpy.int32))
+        E = self.alpha * float(self.m ** 2) / inverse_powers.sum()
         return (E - estimate_bias(E, self.p)) if E <= 5 * self.m else E
 
     def card(self):
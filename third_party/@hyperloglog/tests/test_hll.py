@@ -129,3 +129,55 @@ def test_update_err():
 
     with pytest.raises(ValueError):
         a.update(b)
+
+
+def test_add_many_matches_add():
+    from cityhash import CityHash32
+
+    values = [str(i) for i in range(5000)]
+    a = HyperLogLog(0.01)
+    b = HyperLogLog(0.01)
+
+    for value in values:
+        a.add(value)
+    b.add_many(values)
+    assert a == b
+
+    # 32 bit hashes exercise the high registers
+    a = HyperLogLog(0.05)
+    b = HyperLogLog(0.05)
+    for value in values:
+        a.add(value, hash_func=CityHash32)
+    b.add_many(iter(values), hash_func=CityHash32)
+    assert a == b
+
+
+def test_add_many_empty():
+    a = HyperLogLog(0.05)
+    a.add_many([])
+    assert len(a) == 0
+
+
+def test_card_add_many():
+    a = HyperLogLog(0.01)
+    a.add_many(os.urandom(16) for _ in range(100000))
+
+    assert 97000 < a.card() < 103000
+
+
+def test_bytes_round_trip():
+    a = HyperLogLog(0.01)
+    a.add_many(str(i) for i in range(1000))
+
+    data = a.to_bytes()
+    assert len(data) == a.m + 1
+
+    b = HyperLogLog.from_bytes(data)
+    assert b == a
+    assert b.p == a.p
+    assert b.card() == a.card()
+
+
+def test_from_bytes_bad_data():
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(bytes((9,)) + bytes(10))
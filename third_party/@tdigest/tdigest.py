@@ -1,14 +1,26 @@
-from random import choice
-from itertools import chain
-from opteryx.externals.accumulation_tree.accumulation_tree import AccumulationTree
-from opteryx.externals.pyudorandom import pyudorandom
+"""
+t-digest
 
+This is a merging t-digest (Dunning, Computing Extremely Accurate Quantiles Using
+t-Digests); rather than finding the closest centroid for each value in a tree,
+values are buffered and merged into the centroids in bulk. A merge sorts the
+centroids and new values together and groups them so that no centroid spans
+more than one unit of the k1 scale function (scaled to span 1/delta units),
+which keeps the centroids at the tails small (so extreme percentiles are
+accurate) and those in the middle large.
 
-def _centroid_count(centroid):
-    # this is defined at the top level because
-    # pyspark needs to pickle these functions properly
-    # See https://github.com/CamDavidsonPilon/tdigest/issues/42
-    return centroid.count
+The centroids are held as NumPy arrays of means and counts, so merging a batch
+of values or another digest is a handful of array operations.
+
+https://arxiv.org/abs/1902.04023
+"""
+import math
+import struct
+
+import numpy
+
+# delta, K, n, min and max (NaN when empty)
+HEADER = struct.Struct("<dIddd")
 
 
 class Centroid(object):
@@ -30,24 +42,32 @@ class Centroid(object):
 
 class TDigest(object):
     def __init__(self, delta=0.01, K=25):
-
-        self.C = AccumulationTree(_centroid_count)
+        """
+        Parameters:
+            delta: float
+                The compression, the digest holds about 1/delta centroids
+            K: integer
+                Values added one at a time are buffered, the buffer is merged when
+                it holds K/delta values
+        """
         self.n = 0
         self.delta = delta
         self.K = K
+        self.min = None
+        self.max = None
+        self._means = numpy.empty(0, dtype=numpy.float64)
+        self._counts = numpy.empty(0, dtype=numpy.float64)
+        self._buffer = []
 
     def __add__(self, other_digest):
-        data = list(chain(self.C.values(), other_digest.C.values()))
         new_digest = TDigest(self.delta, self.K)
-
-        if len(data) > 0:
-            for c in pyudorandom.items(data):
-                new_digest.update(c.mean, c.count)
-
+        new_digest.merge(self)
+        new_digest.merge(other_digest)
         return new_digest
 
     def __len__(self):
-        return len(self.C)
+        self._flush()
+        return len(self._means)
 
     def __repr__(self):
         return """<T-Digest: n=%d, centroids=%d>""" % (self.n, len(self))
@@ -58,156 +78,153 @@ class TDigest(object):
         """
         return iter(self.centroids_to_list())
 
-    def _add_centroid(self, centroid):
-        if centroid.mean not in self.C:
-            self.C.insert(centroid.mean, centroid)
-        else:
-            self.C[centroid.mean].update(centroid.mean, centroid.count)
-
-    def _compute_centroid_quantile(self, centroid):
-        denom = self.n
-        cumulative_sum = self.C.get_left_accumulation(centroid.mean)
-        return (centroid.count / 2.0 + cumulative_sum) / denom
-
-    def _update_centroid(self, centroid, x, w):
-        self.C.pop(centroid.mean)
-        centroid.update(x, w)
-        self._add_centroid(centroid)
-
-    def _find_closest_centroids(self, x):
-        try:
-            ceil_key = self.C.ceiling_key(x)
-        except KeyError:
-            floor_key = self.C.floor_key(x)
-            return [self.C[floor_key]]
-
-        try:
-            floor_key = self.C.floor_key(x)
-        except KeyError:
-            ceil_key = self.C.ceiling_key(x)
-            return [self.C[ceil_key]]
-
-        if abs(floor_key - x) < abs(ceil_key - x):
-            return [self.C[floor_key]]
-        elif abs(floor_key - x) == abs(ceil_key - x) and (ceil_key != floor_key):
-            return [self.C[ceil_key], self.C[floor_key]]
-        else:
-            return [self.C[ceil_key]]
-
-    def _threshold(self, q):
-        return 4 * self.n * self.delta * q * (1 - q)
-
-    def add(self, x, w=1):
+    def _flush(self):
+        if self._buffer:
+            values, weights = zip(*self._buffer)
+            self._buffer = []
+            self._merge_centroids(
+                numpy.array(values, dtype=numpy.float64),
+                numpy.array(weights, dtype=numpy.float64),
+            )
+
+    def _merge_centroids(self, means, counts):
+        """
+        Merge new (unsorted) centroids into the digest.
+        """
+        if means.size == 0:
+            return
+        low, high = means.min(), means.max()
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+        means = numpy.concatenate((self._means, means))
+        counts = numpy.concatenate((self._counts, counts))
+        order = numpy.argsort(means, kind="stable")
+        means, counts = means[order], counts[order]
+
+        # equal values are always one centroid, they are never split
+        starts = numpy.flatnonzero(numpy.concatenate(([True], numpy.diff(means) != 0)))
+        means = means[starts]
+        counts = numpy.add.reduceat(counts, starts)
+
+        # group the centroids on the k1 scale of the quantile at their centres
+        n = counts.sum()
+        centres = (numpy.cumsum(counts) - counts / 2) / n
+        k = (1 / self.delta) / numpy.pi * numpy.arcsin(2 * centres - 1)
+        buckets = numpy.floor(k)
+        starts = numpy.flatnonzero(numpy.concatenate(([True], numpy.diff(buckets) != 0)))
+        totals = numpy.add.reduceat(counts, starts)
+        self._means = numpy.add.reduceat(means * counts, starts) / totals
+        self._counts = totals
+        self.n = float(n)
+
+    def update(self, x, w=1):
         """
         Update the t-digest with value x and weight w.
 
         """
+        if w <= 0:
+            raise ValueError("w must be strictly positive.")
         self.n += w
+        self._buffer.append((x, w))
+        if len(self._buffer) >= self.K / self.delta:
+            self._flush()
 
-        if len(self) == 0:
-            self._add_centroid(Centroid(x, w))
-            return
-
-        S = self._find_closest_centroids(x)
-
-        while len(S) != 0 and w > 0:
-            j = choice(list(range(len(S))))
-            c_j = S[j]
-
-            q = self._compute_centroid_quantile(c_j)
-
-            # This filters the out centroids that do not satisfy the second part
-            # of the definition of S. See original paper by Dunning.
-            if c_j.count + w > self._threshold(q):
-                S.pop(j)
-                continue
-
-            delta_w = min(self._threshold(q) - c_j.count, w)
-            self._update_centroid(c_j, x, delta_w)
-            w -= delta_w
-            S.pop(j)
-
-        if w > 0:
-            self._add_centroid(Centroid(x, w))
-
-        if len(self) > self.K / self.delta:
-            self.compress()
-
-        return
+    add = update
 
     def batch_update(self, values, w=1):
         """
         Update the t-digest with an iterable of values. This assumes all points have the
         same weight.
         """
-        for x in values:
-            self.update(x, w)
-        self.compress()
+        if w <= 0:
+            raise ValueError("w must be strictly positive.")
+        if not isinstance(values, numpy.ndarray):
+            values = numpy.fromiter(values, dtype=numpy.float64)
+        values = values.astype(numpy.float64, copy=False)
+        values = values[~numpy.isnan(values)]
+        self._flush()
+        self._merge_centroids(values, numpy.full(values.size, w, dtype=numpy.float64))
         return
 
+    def merge(self, other_digest):
+        """
+        Fold the centroids of another digest into this one.
+        """
+        other_digest._flush()
+        self._flush()
+        self._merge_centroids(other_digest._means, other_digest._counts)
+        # the extremes of the other digest aren't necessarily centroid means
+        for value in (other_digest.min, other_digest.max):
+            if value is not None:
+                self.min = min(self.min, value)
+                self.max = max(self.max, value)
+        return self
+
     def compress(self):
-        T = TDigest(self.delta, self.K)
-        C = list(self.C.values())
-        for c_i in pyudorandom.items(C):
-            T.update(c_i.mean, c_i.count)
-        self.C = T.C
+        self._flush()
+        means, counts = self._means, self._counts
+        self._means = self._means[:0]
+        self._counts = self._counts[:0]
+        self._merge_centroids(means, counts)
 
     def percentile(self, p):
         """
         Computes the percentile of a specific value in [0,100].
+
+        Each centroid is taken to sit at the middle of its count, between the
+        centroids (and the minimum and maximum) the value is interpolated.
         """
 
         if not (0 <= p <= 100):
             raise ValueError("p must be between 0 and 100, inclusive.")
 
-        p = float(p) / 100.0
-        p *= self.n
-        c_i = None
-        t = 0
-
-        if p == 0:
-            return self.C.min_item()[1].mean
+        self._flush()
+        if self.n == 0:
+            return None
+        return float(self.percentiles([p])[0])
 
-        for i, key in enumerate(self.C.keys()):
-            c_i_plus_one = self.C[key]
-            if i == 0:
-                k = c_i_plus_one.count / 2
+    def percentiles(self, ps):
+        """
+        As percentile, for an array of percentiles in one call
+        """
+        ps = numpy.asarray(ps, dtype=numpy.float64)
+        if ((ps < 0) | (ps > 100)).any():
+            raise ValueError("p must be between 0 and 100, inclusive.")
 
-            else:
-                k = (c_i_plus_one.count + c_i.count) / 2.0
-                if p <= t + k:
-                    z1 = p - t
-                    z2 = t + k - p
-                    return (c_i.mean * z2 + c_i_plus_one.mean * z1) / k
-            c_i = c_i_plus_one
-            t += k
+        self._flush()
+        if self.n == 0:
+            return numpy.full(ps.shape, numpy.nan)
 
-        return self.C.max_item()[1].mean
+        centres = numpy.cumsum(self._counts) - self._counts / 2
+        positions = numpy.concatenate(([0], centres, [self.n]))
+        values = numpy.concatenate(([self.min], self._means, [self.max]))
+        return numpy.interp(ps / 100.0 * self.n, positions, values)
 
     def cdf(self, x):
         """
         Computes the cdf of a specific value, ie. computes F(x) where F denotes
         the CDF of the distribution.
         """
-        t = 0
-        N = float(self.n)
-
-        if len(self) == 1:  # only one centroid
-            return int(x >= self.C.min_key())
-
-        for i, key in enumerate(self.C.keys()):
-            c_i = self.C[key]
-            if i == len(self) - 1:
-                delta = (c_i.mean - self.C.prev_item(key)[1].mean) / 2.0
-            else:
-                delta = (self.C.succ_item(key)[1].mean - c_i.mean) / 2.0
-            z = max(-1, (x - c_i.mean) / delta)
-
-            if z < 1:
-                return t / N + c_i.count / N * (z + 1) / 2
-
-            t += c_i.count
-        return 1
+        self._flush()
+        means, counts = self._means, self._counts
+
+        if len(means) == 0:  # as the tree-based digest, 1 when empty
+            return 1
+        if len(means) == 1:  # only one centroid
+            return int(x >= means[0])
+
+        # each centroid covers half of the gap to its neighbours
+        deltas = numpy.diff(means) / 2.0
+        deltas = numpy.append(deltas, deltas[-1])
+        z = numpy.maximum(-1, (x - means) / deltas)
+
+        inside = numpy.flatnonzero(z < 1)
+        if inside.size == 0:
+            return 1
+        i = inside[0]
+        t = counts[:i].sum()
+        return float(t / self.n + counts[i] / self.n * (z[i] + 1) / 2)
 
     def trimmed_mean(self, p1, p2):
         """
@@ -218,43 +235,69 @@ class TDigest(object):
         if not (p1 < p2):
             raise ValueError("p1 must be between 0 and 100 and less than p2.")
 
+        self._flush()
         min_count = p1 / 100.0 * self.n
         max_count = p2 / 100.0 * self.n
 
-        trimmed_sum = trimmed_count = curr_count = 0
-        for i, c in enumerate(self.C.values()):
-            next_count = curr_count + c.count
-            if next_count <= min_count:
-                curr_count = next_count
-                continue
-
-            count = c.count
-            if curr_count < min_count:
-                count = next_count - min_count
-            if next_count > max_count:
-                count -= next_count - max_count
-
-            trimmed_sum += count * c.mean
-            trimmed_count += count
-
-            if next_count >= max_count:
-                break
-            curr_count = next_count
+        # the part of each centroid's count between the two percentiles
+        next_counts = numpy.cumsum(self._counts)
+        curr_counts = next_counts - self._counts
+        counts = numpy.minimum(next_counts, max_count) - numpy.maximum(curr_counts, min_count)
+        counts = numpy.maximum(counts, 0)
 
+        trimmed_count = counts.sum()
         if trimmed_count == 0:
             return 0
-        return trimmed_sum / trimmed_count
+        return float((counts * self._means).sum() / trimmed_count)
+
+    def to_bytes(self):
+        """
+        Serialize the digest, its parameters followed by the centroid means and counts
+        """
+        self._flush()
+        return b"".join(
+            (
+                HEADER.pack(
+                    self.delta,
+                    self.K,
+                    self.n,
+                    math.nan if self.min is None else self.min,
+                    math.nan if self.max is None else self.max,
+                ),
+                self._means.astype("<f8").tobytes(),
+                self._counts.astype("<f8").tobytes(),
+            )
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Deserialize a digest created with to_bytes
+        """
+        delta, K, n, low, high = HEADER.unpack_from(data)
+        size, remainder = divmod(len(data) - HEADER.size, 16)
+        if remainder:
+            raise ValueError("Data is not a serialized TDigest")
+        digest = cls(delta, K)
+        digest.n = n
+        digest.min = None if math.isnan(low) else low
+        digest.max = None if math.isnan(high) else high
+        digest._means = numpy.frombuffer(data, "<f8", size, HEADER.size).astype(numpy.float64)
+        digest._counts = numpy.frombuffer(
+            data, "<f8", size, HEADER.size + 8 * size
+        ).astype(numpy.float64)
+        return digest
 
     def centroids_to_list(self):
         """
         Returns a Python list of the TDigest object's Centroid values.
 
         """
-        centroids = []
-        for key in self.C.keys():
-            tree_values = self.C.get_value(key)
-            centroids.append({"m": tree_values.mean, "c": tree_values.count})
-        return centroids
+        self._flush()
+        return [
+            {"m": mean, "c": count}
+            for mean, count in zip(self._means.tolist(), self._counts.tolist())
+        ]
 
     def to_dict(self):
         """
@@ -262,6 +305,7 @@ class TDigest(object):
         Or use centroids_to_list() for a list of only the Centroid values.
 
         """
+        self._flush()
         return {
             "n": self.n,
             "delta": self.delta,
@@ -308,7 +352,11 @@ class TDigest(object):
             digest.update_centroids([{'c': 1.0, 'm': 1.0}, {'c': 1.0, 'm': 2.0}, {'c': 1.0, 'm': 3.0}])
 
         """
-        [self.update(value["m"], value["c"]) for value in list_values]
+        self._flush()
+        self._merge_centroids(
+            numpy.array([value["m"] for value in list_values], dtype=numpy.float64),
+            numpy.array([value["c"] for value in list_values], dtype=numpy.float64),
+        )
         return self
 
 
@@ -9,15 +9,14 @@ from numpy import random
 from numpy import percentile
 from numpy import bitwise_and
 from numpy import testing
-from accumulation_tree import AccumulationTree
-from tdigest.tdigest import TDigest, Centroid
+from tdigest import TDigest, Centroid
 
 
-def RBTree(data):
-    t = AccumulationTree(lambda centroid: centroid.count)
-    for k, v in data:
-        t.insert(k, v)
-    return t
+@pytest.fixture(autouse=True)
+def seed():
+    # the statistical tests compare with the true quantiles, which an unlucky
+    # sample misses
+    random.seed(1)
 
 
 @pytest.fixture()
@@ -25,29 +24,6 @@ def empty_tdigest():
     return TDigest()
 
 
-@pytest.fixture()
-def example_positive_centroids():
-    return RBTree(
-        [
-            (0.5, Centroid(0.5, 1)),
-            (1.1, Centroid(1.1, 1)),
-            (1.5, Centroid(1.5, 1)),
-        ]
-    )
-
-
-@pytest.fixture()
-def example_centroids():
-    return RBTree(
-        [
-            (-1.1, Centroid(-1.1, 1)),
-            (-0.5, Centroid(-0.5, 1)),
-            (0.1, Centroid(0.1, 1)),
-            (1.5, Centroid(1.5, 1)),
-        ]
-    )
-
-
 @pytest.fixture()
 def example_random_data():
     return random.randn(100)
@@ -74,108 +50,6 @@ def sample_centroid_list():
 
 
 class TestTDigest:
-    def test_add_centroid(self, empty_tdigest, example_positive_centroids):
-        empty_tdigest.C = example_positive_centroids
-        new_centroid = Centroid(0.9, 1)
-        empty_tdigest._add_centroid(new_centroid)
-        assert (
-            empty_tdigest.C
-            - RBTree(
-                [
-                    (0.5, Centroid(0.5, 1)),
-                    (new_centroid.mean, new_centroid),
-                    (1.1, Centroid(1.1, 1)),
-                    (1.5, Centroid(1.5, 1)),
-                ]
-            )
-        ).is_empty()
-
-        last_centroid = Centroid(10.0, 1)
-        empty_tdigest._add_centroid(last_centroid)
-        assert (
-            empty_tdigest.C
-            - RBTree(
-                [
-                    (0.5, Centroid(0.5, 1)),
-                    (new_centroid.mean, new_centroid),
-                    (1.1, Centroid(1.1, 1)),
-                    (1.5, Centroid(1.5, 1)),
-                    (last_centroid.mean, last_centroid),
-                ]
-            )
-        ).is_empty()
-
-    def test_add_centroid_if_key_already_present(
-        self, empty_tdigest, example_positive_centroids
-    ):
-        empty_tdigest.C = example_positive_centroids
-        new_centroid = Centroid(1.1, 5)
-        empty_tdigest._add_centroid(new_centroid)
-        assert (
-            empty_tdigest.C
-            - RBTree(
-                [
-                    (0.5, Centroid(0.5, 1)),
-                    (1.1, Centroid(1.1, 1 + 5)),
-                    (1.5, Centroid(1.5, 1)),
-                ]
-            )
-        ).is_empty()
-
-    def test_compute_centroid_quantile(self, empty_tdigest, example_centroids):
-        empty_tdigest.C = example_centroids
-        empty_tdigest.n = 4
-
-        assert (
-            empty_tdigest._compute_centroid_quantile(example_centroids[-1.1])
-            == (1 / 2.0 + 0) / 4
-        )
-        assert (
-            empty_tdigest._compute_centroid_quantile(example_centroids[-0.5])
-            == (1 / 2.0 + 1) / 4
-        )
-        assert (
-            empty_tdigest._compute_centroid_quantile(example_centroids[0.1])
-            == (1 / 2.0 + 2) / 4
-        )
-        assert (
-            empty_tdigest._compute_centroid_quantile(example_centroids[1.5])
-            == (1 / 2.0 + 3) / 4
-        )
-
-    def test_find_closest_centroids_works_with_positive_values(
-        self, empty_tdigest, example_positive_centroids
-    ):
-        empty_tdigest.C = example_positive_centroids
-        assert empty_tdigest._find_closest_centroids(0.0) == [
-            example_positive_centroids[0.5]
-        ]
-        assert empty_tdigest._find_closest_centroids(2.0) == [
-            example_positive_centroids[1.5]
-        ]
-        assert empty_tdigest._find_closest_centroids(1.1) == [
-            example_positive_centroids[1.1]
-        ]
-        assert empty_tdigest._find_closest_centroids(1.2) == [
-            example_positive_centroids[1.1]
-        ]
-        assert empty_tdigest._find_closest_centroids(1.4) == [
-            example_positive_centroids[1.5]
-        ]
-        assert empty_tdigest._find_closest_centroids(1.3) == [
-            example_positive_centroids[1.5],
-            example_positive_centroids[1.1],
-        ]
-
-    def test_get_closest_centroids_works_with_negative_values(
-        self, empty_tdigest, example_centroids
-    ):
-        empty_tdigest.C = example_centroids
-        assert empty_tdigest._find_closest_centroids(0.0) == [example_centroids[0.1]]
-        assert empty_tdigest._find_closest_centroids(-2.0) == [example_centroids[-1.1]]
-        assert empty_tdigest._find_closest_centroids(-0.6) == [example_centroids[-0.5]]
-        assert empty_tdigest._find_closest_centroids(-0.4) == [example_centroids[-0.5]]
-
     def test_compress(self, empty_tdigest, example_random_data):
         empty_tdigest.batch_update(example_random_data)
         precompress_n, precompress_len = empty_tdigest.n, len(empty_tdigest)
@@ -222,14 +96,64 @@ class TestTDigest:
         t.batch_update(data)
         assert t.percentile(40) == 32.5
 
-    def test_adding_centroid_with_existing_key_does_not_break_synchronicity(
-        self, empty_tdigest, example_centroids
-    ):
-        td = empty_tdigest
-        td.C = example_centroids
-        assert -1.1 in td.C
-        td._add_centroid(Centroid(-1.1, 10))
-        assert all([k == centroid.mean for k, centroid in td.C.items()])
+    def test_percentiles_match_percentile(self, empty_tdigest):
+        t = TDigest()
+        t.batch_update(random.randn(10000))
+        ps = [0, 0.5, 25, 50, 99.9, 100]
+        assert t.percentiles(ps).tolist() == [t.percentile(p) for p in ps]
+        assert all(p != p for p in TDigest().percentiles([50]))
+
+    def test_batch_update_matches_update(self):
+        data = random.randn(1000)
+        batched, single = TDigest(), TDigest()
+        batched.batch_update(data)
+        for x in data:
+            single.update(x)
+        assert single.n == batched.n == 1000
+        assert single.centroids_to_list() == batched.centroids_to_list()
+
+    def test_buffer_is_bounded(self):
+        t = TDigest()
+        for x in range(10000):
+            t.update(x)
+        assert len(t._buffer) < t.K / t.delta
+        assert t.n == 10000
+
+    def test_merge(self):
+        data = random.randn(20000)
+        t1, t2, whole = TDigest(), TDigest(), TDigest()
+        t1.batch_update(data[:5000])
+        t2.batch_update(data[5000:])
+        whole.batch_update(data)
+
+        merged = t1 + t2
+        assert merged.n == 20000
+        assert merged.percentile(0) == data.min()
+        assert merged.percentile(100) == data.max()
+        for p in (1, 50, 95, 99):
+            assert abs(merged.percentile(p) - percentile(data, p)) < 0.05
+        assert t1.n == 5000  # + leaves the operands alone
+
+        t1.merge(t2)
+        assert t1.centroids_to_list() == merged.centroids_to_list()
+
+    def test_to_bytes(self, empty_tdigest):
+        assert TDigest.from_bytes(empty_tdigest.to_bytes()).to_dict() == empty_tdigest.to_dict()
+
+        t = TDigest(delta=0.05)
+        t.batch_update(random.randn(1000))
+        t.update(100)
+        restored = TDigest.from_bytes(t.to_bytes())
+        assert restored.to_dict() == t.to_dict()
+        assert (restored.min, restored.max) == (t.min, t.max)
+        assert restored.percentile(50) == t.percentile(50)
+
+        with pytest.raises(ValueError):
+            TDigest.from_bytes(t.to_bytes()[:-1])
+
+    def test_nan_is_ignored(self, empty_tdigest):
+        empty_tdigest.batch_update([1.0, float("nan"), 3.0])
+        assert empty_tdigest.n == 2
 
     def test_cdf_with_single_centroid(self, empty_tdigest):
         td = empty_tdigest
@@ -241,6 +165,9 @@ class TestTDigest:
         td.update(0)
         assert td.cdf(0) == 1
 
+    def test_cdf_of_empty_digest(self, empty_tdigest):
+        assert empty_tdigest.cdf(0) == 1
+
     def test_to_dict(self, empty_tdigest, sample_dict):
         td = empty_tdigest
         td.update(0)
@@ -291,7 +218,7 @@ class TestStatisticalTests:
         x = [1, 2, 2, 2, 2, 2, 2, 2, 3]
         t.batch_update(x)
         assert t.percentile(50) == 2
-        assert sum([c.count for c in t.C.values()]) == len(x)
+        assert sum([c["c"] for c in t]) == len(x)
 
         t = TDigest()
         t.batch_update([1, 1, 2, 2, 3, 4, 4, 4, 5, 5])
@@ -261,3 +261,57 @@ def test_pop_all():
         got.append(s.pop())
         assert len(s) == (len(want) - len(got))
     assert got == want
+
+
+def test_dense_and_sparse_chunks():
+    # a sparse chunk, a chunk which becomes dense and one beyond 32 bits
+    elements = [3, 70000] + list(range(2 ** 17, 2 ** 17 + 5000)) + [2 ** 40 + 1]
+    s = UintSet(elements)
+    assert len(s) == len(elements)
+    assert list(s) == elements
+    assert 2 ** 17 + 4999 in s and 2 ** 17 + 5000 not in s
+
+    for e in range(2 ** 17, 2 ** 17 + 1000):
+        s.remove(e)
+    # the chunk is back to an array, which is equal to one built directly
+    assert s == UintSet(elements[:2] + elements[1002:])
+
+    s.add(2 ** 17)
+    assert s.pop() == 3
+    assert s.to_array().tolist() == [70000, 2 ** 17] + elements[1002:]
+
+
+def test_operations_match_set():
+    import random
+
+    rng = random.Random(1)
+    for _ in range(5):
+        a = {rng.randrange(300000) for _ in range(rng.choice((100, 20000)))}
+        b = {rng.randrange(300000) for _ in range(rng.choice((100, 20000)))}
+        ua, ub = UintSet(a), UintSet(b)
+        assert list(ua | ub) == sorted(a | b)
+        assert list(ua & ub) == sorted(a & b)
+        assert list(ua - ub) == sorted(a - b)
+        assert list(ua ^ ub) == sorted(a ^ b)
+        assert len(ua ^ ub) == len(a ^ b)
+
+
+def test_serialization():
+    for s in (UintSet(), UintSet([1, 100]), UintSet(range(0, 300000, 3))):
+        data = s.to_bytes()
+        assert UintSet.from_bytes(data) == s
+    with pytest.raises(ValueError):
+        UintSet.from_bytes(data + b"\x00")
+
+
+def test_bits():
+    assert list(UintSet(bits=0b1_0101)) == [0, 2, 4]
+
+
+def test_invalid_elements():
+    with pytest.raises(TypeError):
+        UintSet([1.5])
+    with pytest.raises(TypeError):
+        UintSet().union(5)
+    with pytest.raises(ValueError):
+        UintSet([1, -1])
@@ -1,18 +1,42 @@
-## Note: cythonizing this module has less than a 10% impact on
-## performance from testing
+"""
+UintSet is a compressed bitmap in the style of Roaring bitmaps (Chambi, Lemire et
+al, Better bitmap performance with Roaring bitmaps).
+
+The elements are split into chunks of 65536 by their high bits, each chunk is
+held in the container which suits how many elements it has: a sorted array of
+the low 16 bits of each element when there are no more than 4096 (which is
+smaller than a bitset), otherwise a bitset of 1024 64 bit words. Set operations
+work chunk by chunk with NumPy, so their cost depends on the number of elements
+rather than the size of the largest.
+
+https://arxiv.org/abs/1402.6407
+"""
+import operator
+import struct
+
+import numpy
 
 INVALID_ELEMENT_MSG = "'UintSet' elements must be integers >= 0"
 INVALID_ITER_ARG_MSG = "expected UintSet or iterable argument"
 NOT_IN_SET_MSG = "element not in UintSet"
 POP_EMPTY_MSG = "pop from an empty set"
 
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+LOW_MASK = CHUNK_SIZE - 1
+# chunks with more elements than this are bitsets, an array of this many
+# uint16s is the size of a bitset
+ARRAY_LIMIT = 4096
+BITSET_WORDS = CHUNK_SIZE // 64
+MAX_ELEMENT = 2**64 - 1
+
+HEADER = struct.Struct("<I")
+
+POPCOUNT = numpy.array([bin(i).count("1") for i in range(256)], dtype=numpy.uint16)
+
 
 def count_ones(bigint):
-    count = 0
-    while bigint:
-        count += bigint & 1
-        bigint >>= 1
-    return count
+    return bin(bigint).count("1")
 
 
 def get_bit(bigint, index):
@@ -30,50 +54,217 @@ def unset_bit(bigint, index):
 
 
 def find_ones(bigint):
-    index = 0
-    while True:
-        if bigint & 1:
-            yield index
-        bigint >>= 1
-        if bigint == 0:
-            break
-        index += 1
+    data = bigint.to_bytes((bigint.bit_length() + 7) // 8, "little")
+    bits = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8), bitorder="little")
+    yield from numpy.flatnonzero(bits).tolist()
+
+
+def _is_bitset(container):
+    return container.dtype == numpy.uint64
+
+
+def _cardinality(container):
+    if _is_bitset(container):
+        return int(POPCOUNT[container.view(numpy.uint8)].sum(dtype=numpy.int64))
+    return container.size
+
+
+def _to_bitset(container):
+    if _is_bitset(container):
+        return container
+    bits = numpy.zeros(CHUNK_SIZE, dtype=bool)
+    bits[container] = True
+    return numpy.packbits(bits, bitorder="little").view(numpy.uint64)
+
+
+def _to_array(container):
+    if not _is_bitset(container):
+        return container
+    bits = numpy.unpackbits(container.view(numpy.uint8), bitorder="little")
+    return numpy.flatnonzero(bits).astype(numpy.uint16)
+
+
+def _in_bitset(bitset, lows):
+    # which of the (uint16) lows are set in the bitset
+    words = bitset[lows >> 6]
+    return (words >> (lows & 63).astype(numpy.uint64)) & numpy.uint64(1) != 0
+
+
+def _normalize(container):
+    """
+    The container in the form which suits its cardinality, None if it is empty
+    """
+    if _is_bitset(container):
+        if _cardinality(container) > ARRAY_LIMIT:
+            return container
+        container = _to_array(container)
+    if container.size == 0:
+        return None
+    if container.size > ARRAY_LIMIT:
+        return _to_bitset(container)
+    return container
+
+
+def _union(a, b):
+    if not _is_bitset(a) and not _is_bitset(b):
+        return _normalize(numpy.union1d(a, b))
+    return _to_bitset(a) | _to_bitset(b)
+
+
+def _intersection(a, b):
+    if _is_bitset(a) and _is_bitset(b):
+        return _normalize(a & b)
+    if _is_bitset(a):
+        a, b = b, a
+    if _is_bitset(b):
+        return _normalize(a[_in_bitset(b, a)])
+    return _normalize(numpy.intersect1d(a, b, assume_unique=True))
+
+
+def _difference(a, b):
+    if not _is_bitset(a):
+        if _is_bitset(b):
+            return _normalize(a[~_in_bitset(b, a)])
+        return _normalize(numpy.setdiff1d(a, b, assume_unique=True))
+    return _normalize(a & ~_to_bitset(b))
+
+
+def _symmetric_difference(a, b):
+    if not _is_bitset(a) and not _is_bitset(b):
+        return _normalize(numpy.setxor1d(a, b, assume_unique=True))
+    return _normalize(_to_bitset(a) ^ _to_bitset(b))
+
+
+def _check_element(elem):
+    try:
+        elem = operator.index(elem)
+    except TypeError:
+        raise TypeError(INVALID_ELEMENT_MSG)
+    if not 0 <= elem <= MAX_ELEMENT:
+        raise ValueError(INVALID_ELEMENT_MSG)
+    return elem
+
+
+def _to_elements(elements):
+    """
+    An iterable (or array) of elements as a uint64 array
+    """
+    if not isinstance(elements, numpy.ndarray):
+        elements = list(elements)
+    values = numpy.asarray(elements)
+    if values.size == 0:
+        return numpy.empty(0, dtype=numpy.uint64)
+    if values.ndim != 1 or values.dtype.kind not in "biuO":
+        raise TypeError(INVALID_ELEMENT_MSG)
+    if values.dtype.kind == "O":
+        # ints too big for int64, or a mix of types
+        elements = [_check_element(elem) for elem in values.tolist()]
+        return numpy.array(elements, dtype=numpy.uint64)
+    if values.dtype.kind == "i" and values.min() < 0:
+        raise ValueError(INVALID_ELEMENT_MSG)
+    return values.astype(numpy.uint64)
 
 
 class UintSet:
     def __init__(self, elements=None, bits=0):
-        self._bits = bits
-        if elements:
-            for e in elements:
-                self.add(e)
+        # the high bits of the elements of each chunk to the chunk's container
+        self._chunks = {}
+        if bits:
+            self._add_array(numpy.fromiter(find_ones(bits), dtype=numpy.uint64))
+        if elements is not None:
+            self._add_array(_to_elements(elements))
+
+    def _add_array(self, values):
+        if values.size == 0:
+            return
+        # row ids usually arrive in order, which doesn't need sorting
+        if not (values[1:] > values[:-1]).all():
+            values = numpy.unique(values)
+        keys = values >> numpy.uint64(CHUNK_BITS)
+        lows = (values & numpy.uint64(LOW_MASK)).astype(numpy.uint16)
+        starts = numpy.flatnonzero(numpy.concatenate(([True], keys[1:] != keys[:-1])))
+        ends = numpy.append(starts[1:], values.size)
+        for key, start, end in zip(keys[starts].tolist(), starts.tolist(), ends.tolist()):
+            container = _normalize(lows[start:end].copy())
+            if key in self._chunks:
+                container = _union(self._chunks[key], container)
+            self._chunks[key] = container
+
+    def _combine(self, other, operation, keys):
+        res = self.__class__()
+        for key in keys:
+            container = operation(
+                self._chunks.get(key, numpy.empty(0, dtype=numpy.uint16)),
+                other._chunks.get(key, numpy.empty(0, dtype=numpy.uint16)),
+            )
+            if container is not None:
+                res._chunks[key] = container
+        return res
 
     def __getitem__(self, index):
-        return get_bit(self._bits, index)
+        return index in self
 
     def __len__(self):
-        return count_ones(self._bits)
+        return sum(_cardinality(container) for container in self._chunks.values())
+
+    def __bool__(self):
+        return bool(self._chunks)
 
     def copy(self):
-        return UintSet(bits=self._bits)
+        res = self.__class__()
+        res._chunks = {key: container.copy() for key, container in self._chunks.items()}
+        return res
 
     def add(self, elem):
-        try:
-            self._bits = set_bit(self._bits, elem)
-        except TypeError:
-            raise TypeError(INVALID_ELEMENT_MSG)
-        except ValueError:
-            raise ValueError(INVALID_ELEMENT_MSG)
+        key, low = divmod(_check_element(elem), CHUNK_SIZE)
+        container = self._chunks.get(key)
+        if container is None:
+            self._chunks[key] = numpy.array([low], dtype=numpy.uint16)
+        elif _is_bitset(container):
+            container[low >> 6] |= numpy.uint64(1 << (low & 63))
+        else:
+            i = numpy.searchsorted(container, low)
+            if i == container.size or container[i] != low:
+                self._chunks[key] = _normalize(numpy.insert(container, i, low))
+
+    def update(self, *others):
+        """
+        Add the elements of UintSets or iterables
+        """
+        for other in others:
+            if isinstance(other, self.__class__):
+                for key, container in other._chunks.items():
+                    mine = self._chunks.get(key)
+                    self._chunks[key] = (
+                        container.copy() if mine is None else _union(mine, container)
+                    )
+            else:
+                self._add_array(_to_elements(other))
 
     def __contains__(self, elem):
-        try:
-            return get_bit(self._bits, elem)
-        except TypeError:
-            raise TypeError(INVALID_ELEMENT_MSG)
-        except ValueError:
-            raise ValueError(INVALID_ELEMENT_MSG)
+        key, low = divmod(_check_element(elem), CHUNK_SIZE)
+        container = self._chunks.get(key)
+        if container is None:
+            return False
+        if _is_bitset(container):
+            return bool(int(container[low >> 6]) >> (low & 63) & 1)
+        i = numpy.searchsorted(container, low)
+        return bool(i < container.size and container[i] == low)
 
     def __iter__(self):
-        return find_ones(self._bits)
+        for key in sorted(self._chunks):
+            lows = _to_array(self._chunks[key]).astype(numpy.uint64)
+            yield from (lows + numpy.uint64(key << CHUNK_BITS)).tolist()
+
+    def to_array(self):
+        """
+        The elements, in order, as a uint64 array
+        """
+        arrays = [
+            _to_array(self._chunks[key]).astype(numpy.uint64) + numpy.uint64(key << CHUNK_BITS)
+            for key in sorted(self._chunks)
+        ]
+        return numpy.concatenate(arrays) if arrays else numpy.empty(0, dtype=numpy.uint64)
 
     def __repr__(self):
         elements = ", ".join(str(e) for e in self)
@@ -82,103 +273,127 @@ class UintSet:
         return f"UintSet({elements})"
 
     def __eq__(self, other):
-        return isinstance(other, self.__class__) and self._bits == other._bits
+        if not isinstance(other, self.__class__) or self._chunks.keys() != other._chunks.keys():
+            return False
+        # containers are always in the form which suits their cardinality
+        return all(
+            container.dtype == other._chunks[key].dtype
+            and numpy.array_equal(container, other._chunks[key])
+            for key, container in self._chunks.items()
+        )
+
+    def _coerce(self, other):
+        if isinstance(other, self.__class__):
+            return other
+        try:
+            return self.__class__(other)
+        except TypeError:
+            raise TypeError(INVALID_ITER_ARG_MSG)
 
     def __or__(self, other):
-        cls = self.__class__
-        if isinstance(other, cls):
-            res = cls()
-            res._bits = self._bits | other._bits
-            return res
+        if isinstance(other, self.__class__):
+            return self.union(other)
         return NotImplemented
 
     def union(self, *others):
-        cls = self.__class__
-        res = cls()
-        res._bits = self._bits
+        res = self.copy()
         for other in others:
-            if isinstance(other, cls):
-                res._bits |= other._bits
-            else:
-                try:
-                    second = cls(other)
-                except TypeError:
-                    raise TypeError(INVALID_ITER_ARG_MSG)
-                else:
-                    res._bits |= second._bits
+            res.update(self._coerce(other))
         return res
 
     def __and__(self, other):
-        cls = self.__class__
-        if isinstance(other, cls):
-            res = cls()
-            res._bits = self._bits & other._bits
-            return res
+        if isinstance(other, self.__class__):
+            return self._combine(other, _intersection, self._chunks.keys() & other._chunks.keys())
         return NotImplemented
 
     def intersection(self, *others):
-        cls = self.__class__
-        res = cls()
-        res._bits = self._bits
+        res = self
         for other in others:
-            if isinstance(other, cls):
-                res._bits &= other._bits
-            try:
-                second = cls(other)
-            except TypeError:
-                raise TypeError(INVALID_ITER_ARG_MSG)
-            else:
-                res._bits &= second._bits
-        return res
+            res = res & self._coerce(other)
+        return res.copy() if res is self else res
 
     def __xor__(self, other):
-        cls = self.__class__
-        if isinstance(other, cls):
-            res = cls()
-            res._bits = self._bits ^ other._bits
-            return res
+        if isinstance(other, self.__class__):
+            return self._combine(
+                other, _symmetric_difference, self._chunks.keys() | other._chunks.keys()
+            )
         return NotImplemented
 
     def symmetric_difference(self, other):
         return self ^ other
 
     def __sub__(self, other):
-        cls = self.__class__
-        if isinstance(other, cls):
-            res = self.copy()
-            res._bits ^= self._bits & other._bits
-            return res
+        if isinstance(other, self.__class__):
+            return self._combine(other, _difference, self._chunks.keys())
         return NotImplemented
 
     def difference(self, *others):
-        cls = self.__class__
-        res = cls()
-        res._bits = self._bits
+        res = self
         for other in others:
-            if isinstance(other, cls):
-                res._bits ^= self._bits & other._bits
-            else:
-                try:
-                    second = cls(other)
-                except TypeError:
-                    raise TypeError(INVALID_ITER_ARG_MSG)
-                else:
-                    res._bits ^= self._bits & second._bits
-        return res
+            res = res - self._coerce(other)
+        return res.copy() if res is self else res
 
     def remove(self, elem):
-        try:
-            if elem not in self:
-                raise KeyError(elem)
-            self._bits = unset_bit(self._bits, elem)
-        except TypeError:
-            raise TypeError(INVALID_ELEMENT_MSG)
-        except ValueError:
-            raise ValueError(INVALID_ELEMENT_MSG)
+        if elem not in self:
+            raise KeyError(elem)
+        key, low = divmod(elem, CHUNK_SIZE)
+        container = self._chunks[key]
+        if _is_bitset(container):
+            container = container.copy()
+            container[low >> 6] ^= numpy.uint64(1 << (low & 63))
+        else:
+            container = container[container != low]
+        container = _normalize(container)
+        if container is None:
+            del self._chunks[key]
+        else:
+            self._chunks[key] = container
 
     def pop(self):
-        if self._bits == 0:
+        if not self._chunks:
             raise KeyError(POP_EMPTY_MSG)
-        elem = next(iter(self))
+        key = min(self._chunks)
+        elem = (key << CHUNK_BITS) + int(_to_array(self._chunks[key])[0])
         self.remove(elem)
         return elem
+
+    def to_bytes(self):
+        """
+        Serialize the set: the number of chunks, the high bits and cardinality of
+        each chunk, then the containers
+        """
+        keys = sorted(self._chunks)
+        containers = [self._chunks[key] for key in keys]
+        return b"".join(
+            [
+                HEADER.pack(len(keys)),
+                numpy.array(keys, dtype="<u8").tobytes(),
+                numpy.array([_cardinality(c) for c in containers], dtype="<u4").tobytes(),
+            ]
+            + [c.astype(c.dtype.newbyteorder("<")).tobytes() for c in containers]
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Deserialize a set created with to_bytes
+        """
+        (count,) = HEADER.unpack_from(data)
+        offset = HEADER.size
+        keys = numpy.frombuffer(data, dtype="<u8", count=count, offset=offset)
+        offset += keys.nbytes
+        sizes = numpy.frombuffer(data, dtype="<u4", count=count, offset=offset)
+        offset += sizes.nbytes
+        res = cls()
+        for key, size in zip(keys.tolist(), sizes.tolist()):
+            if size > ARRAY_LIMIT:
+                container = numpy.frombuffer(data, dtype="<u8", count=BITSET_WORDS, offset=offset)
+                container = container.astype(numpy.uint64)
+            else:
+                container = numpy.frombuffer(data, dtype="<u2", count=size, offset=offset)
+                container = container.astype(numpy.uint16)
+            offset += container.nbytes
+            res._chunks[key] = container
+        if offset != len(data):
+            raise ValueError("Data is not a serialized UintSet")
+        return res